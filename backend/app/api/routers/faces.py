@@ -1,37 +1,74 @@
-from fastapi import APIRouter, HTTPException, Query, Path, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Query, Path, Depends, BackgroundTasks, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from app.services.srv_users import UserService
 from app.core.supabase import supabase_anon, supabase_service
+from app.core.scheduler import QueueFullError
+from app.core.admission import OverloadedError, search_limiter, enrollment_limiter
+from app.core.http_client import http_client
+from app.core.task_events import task_event_stream
+from app.core.task_queue import task_queue
 from app.schemas.sche_user import *
 
 router = APIRouter()
 def get_user_service() -> UserService:
     return UserService()
 
+def queue_full_exception(e: QueueFullError) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+
+def overloaded_exception(e: OverloadedError) -> HTTPException:
+    return HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+async def fetch_request_image(image_url: str) -> Optional[bytes]:
+    """Download the image on the shared async HTTP client, so no threadpool worker waits on the network"""
+    if not image_url.startswith(('http://', 'https://')):
+        return None
+    return await http_client.aget_bytes(image_url)
+
 @router.post("/search")
-def face_search(request: UserFaceSearchRequest, service: UserService = Depends(
+async def face_search(request: UserFaceSearchRequest, service: UserService = Depends(
     get_user_service
 )):
     try:
-        return service.face_search(request)
+        # Shed load before downloading, but only hold an inference slot once the image is here
+        async with search_limiter.admit() as acquire_slot:
+            image_bytes = await fetch_request_image(request.image_url)
+            await acquire_slot()
+            return await run_in_threadpool(service.face_search, request, image_bytes)
+    except OverloadedError as e:
+        raise overloaded_exception(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
     
 @router.post("/register")
-def face_register(request: UserFaceRegisterRequest, service: UserService = Depends(
+async def face_register(request: UserFaceRegisterRequest, service: UserService = Depends(
     get_user_service
 )):
     try:
-        return service.face_register(request)
+        # Shed load before downloading, but only hold an inference slot once the image is here
+        async with enrollment_limiter.admit() as acquire_slot:
+            image_bytes = await fetch_request_image(request.avatar_image_url)
+            await acquire_slot()
+            return await run_in_threadpool(service.face_register, request, image_bytes)
+    except OverloadedError as e:
+        raise overloaded_exception(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.post("/update")
-def face_update(request: UserFaceUpdateRequest, service: UserService = Depends(
+async def face_update(request: UserFaceUpdateRequest, service: UserService = Depends(
     get_user_service
 )):
     try:
-        return service.face_update(request)
+        # Shed load before downloading, but only hold an inference slot once the image is here
+        async with enrollment_limiter.admit() as acquire_slot:
+            image_bytes = await fetch_request_image(request.avatar_image_url)
+            await acquire_slot()
+            return await run_in_threadpool(service.face_update, request, image_bytes)
+    except OverloadedError as e:
+        raise overloaded_exception(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
@@ -59,6 +96,8 @@ def batch_face_register(request: BatchFaceRegisterRequest, service: UserService
             message="Batch face registration started in background",
             total_users=len(request.users)
         )
+    except QueueFullError as e:
+        raise queue_full_exception(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
@@ -74,6 +113,8 @@ def batch_face_delete(request: BatchFaceDeleteRequest, service: UserService = De
             message="Batch face deletion started in background",
             total_users=len(request.user_ids)
         )
+    except QueueFullError as e:
+        raise queue_full_exception(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
@@ -89,21 +130,57 @@ def batch_face_update(request: BatchFaceUpdateRequest, service: UserService = De
             message="Batch face update started in background",
             total_users=len(request.users)
         )
+    except QueueFullError as e:
+        raise queue_full_exception(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.get("/task-status/{task_id}")
-def get_task_status(task_id: str, service: UserService = Depends(
-    get_user_service
-)):
+def get_task_status(
+    task_id: str,
+    include_results: bool = Query(False, description="Also return every per-item result (use /results to page through them)"),
+    service: UserService = Depends(get_user_service)
+):
     """Get status of a background task"""
     try:
-        return service.get_background_task_status(task_id)
+        return service.get_background_task_status(task_id, include_results)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.get("/task-status/{task_id}/results", response_model=TaskResultsPage)
+def get_task_results(
+    task_id: str,
+    since: int = Query(0, ge=0, description="Cursor: only return results recorded after this seq"),
+    limit: int = Query(500, ge=1, le=5000),
+    service: UserService = Depends(get_user_service)
+):
+    """Page through the per-item results of a background task, oldest first"""
+    try:
+        return service.get_background_task_results(task_id, since, limit)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@router.get("/task-status/{task_id}/stream")
+async def stream_task_status(
+    task_id: str,
+    since: int = Query(0, ge=0, description="Only send results recorded after this seq"),
+    last_event_id: Optional[str] = Header(None)
+):
+    """Stream progress and per-item results of a background task as Server-Sent Events until it finishes"""
+    if last_event_id and last_event_id.isdigit():
+        since = max(since, int(last_event_id))
+    if await run_in_threadpool(task_queue.get_task_summary, task_id) is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return StreamingResponse(
+        task_event_stream(task_id, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/face-tagging")
 def face_tagging(request: FaceTaggingRequest, service: UserService = Depends(
     get_user_service
@@ -115,5 +192,28 @@ def face_tagging(request: FaceTaggingRequest, service: UserService = Depends(
             message="Face tagging started in background",
             image_id=request.image_id
         )
+    except QueueFullError as e:
+        raise queue_full_exception(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.post("/face-tagging/bulk")
+def bulk_face_tagging(request: BulkFaceTaggingRequest, service: UserService = Depends(
+    get_user_service
+)):
+    """Tag all images of an event, or a list of event_images IDs, in one background task"""
+    if request.event_id is None and not request.image_ids:
+        raise HTTPException(status_code=400, detail="Either event_id or image_ids is required")
+    try:
+        task_id, total_images = service.bulk_face_tagging_background(request)
+        return BulkFaceTaggingResponse(
+            task_id=task_id,
+            message="Bulk face tagging started in background",
+            total_images=total_images
+        )
+    except QueueFullError as e:
+        raise queue_full_exception(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
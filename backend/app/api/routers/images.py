@@ -1,7 +1,11 @@
 from fastapi import APIRouter, HTTPException
-from app.schemas.sche_images import DriveUrlRequest, UploadResponse, ErrorResponse
-from app.utils.drive_utils import download_file_from_drive
-from app.utils.storage_utils import upload_file_to_supabase
+from fastapi.concurrency import run_in_threadpool
+from app.schemas.sche_images import (
+    DriveUrlRequest, UploadResponse, ErrorResponse, DriveFolderIngestRequest, DriveFolderIngestResponse
+)
+from app.core.scheduler import QueueFullError
+from app.services.srv_event_image import EventImageService
+from app.utils.drive_utils import list_drive_folder, transfer_drive_file_to_supabase
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -15,15 +19,10 @@ async def process_drive_url(request: DriveUrlRequest):
     try:
         logger.info(f"Processing Google Drive URL: {request.drive_url}")
         
-        file_content, filename, mime_type = await download_file_from_drive(request.drive_url)
-        
-        logger.info(f"Downloaded file: {filename} ({mime_type}) - {len(file_content)} bytes")
-        
-        public_url = await upload_file_to_supabase(
-            file_content=file_content,
-            filename=filename,
-            bucket_name="images",
-            mime_type=mime_type
+        # The file is streamed from Drive into Storage; only images are kept, to make their thumbnail and detection copy
+        public_url, filename, mime_type, derivatives = await transfer_drive_file_to_supabase(
+            request.drive_url,
+            bucket_name="images"
         )
         
         logger.info(f"Successfully uploaded to Supabase: {public_url}")
@@ -33,7 +32,9 @@ async def process_drive_url(request: DriveUrlRequest):
             public_url=public_url,
             filename=filename,
             mime_type=mime_type,
-            message="File successfully processed and uploaded to Supabase"
+            message="File successfully processed and uploaded to Supabase",
+            thumbnail_url=derivatives["thumbnail_url"] if derivatives else None,
+            detection_url=derivatives["detection_url"] if derivatives else None
         )
         
     except ValueError as e:
@@ -47,3 +48,37 @@ async def process_drive_url(request: DriveUrlRequest):
             detail=f"Failed to process Google Drive URL: {str(e)}"
         )
 
+
+@router.post("/ingest-drive-folder", response_model=DriveFolderIngestResponse)
+async def ingest_drive_folder(request: DriveFolderIngestRequest):
+    """Copy every file of a shared Drive folder into Storage in one background task, optionally tagging faces"""
+    if request.tag_faces and request.event_id is None:
+        raise HTTPException(status_code=400, detail="event_id is required to tag faces")
+    try:
+        files = await list_drive_folder(request.folder_url)
+        logger.info(f"Ingesting {len(files)} files from Google Drive folder: {request.folder_url}")
+        
+        task_id, tagging_task_id = await run_in_threadpool(
+            EventImageService().drive_folder_ingest_background, request, files
+        )
+        
+        return DriveFolderIngestResponse(
+            task_id=task_id,
+            message="Drive folder ingestion started in background",
+            total_files=len(files),
+            tagging_task_id=tagging_task_id
+        )
+        
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    
+    except ValueError as e:
+        logger.error(f"Invalid input: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    except Exception as e:
+        logger.error(f"Error ingesting drive folder: {str(e)}")
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Failed to ingest Google Drive folder: {str(e)}"
+        )
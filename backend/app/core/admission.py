@@ -0,0 +1,136 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
+from app.core.config import settings
+from app.core.metrics import admission_requests, admission_shed
+
+
+class OverloadedError(Exception):
+    """Raised when a request is shed instead of admitted, with the HTTP status and Retry-After to answer with."""
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """
+    Concurrency limit with a bounded, deadline-limited wait queue for one kind of interactive request.
+
+    At most `max_concurrent` requests run at once. Up to `max_waiting` more hold a
+    place in the queue, while they download their input and then wait for a slot
+    (first come, first served) for at most `wait_timeout` seconds. A request arriving
+    while the queue is full is rejected at once with 429, before it downloads anything.
+    One that waited past its deadline is rejected with 503. In both cases Retry-After is
+    estimated from the queue depth and the average time a request holds a slot.
+    Overload therefore costs at most one wait deadline plus one request, rather than
+    every request queueing on the threadpool until it times out.
+
+    Limits apply per process and on the event loop, before any threadpool worker is used.
+    `label` names the limiter in metrics.
+    """
+
+    def __init__(self, name: str, label: str, max_concurrent: int, max_waiting: int, wait_timeout: float):
+        self.name = name
+        self.label = label
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._active = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._mean_seconds = 1.0
+        self._active_gauge = admission_requests.labels(limiter=label, state="active")
+        self._waiting_gauge = admission_requests.labels(limiter=label, state="waiting")
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self._mean_seconds * (self._waiting + 1) / self.max_concurrent))
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[Callable[[], Awaitable[None]]]:
+        """
+        Hold a place in the queue for the body of the `async with` block, and yield the coroutine
+        function that takes a slot from it. Work done before awaiting it (downloading the input)
+        holds no slot; the slot is held from then until the block exits:
+
+            async with limiter.admit() as acquire_slot:
+                data = await download()
+                await acquire_slot()
+                return await run_in_threadpool(infer, data)
+
+        Raises:
+            OverloadedError: 429 on entry if the queue is full, 503 from acquire_slot() if no slot
+                freed up within wait_timeout
+        """
+        if self._active + self._waiting >= self.max_concurrent + self.max_waiting:
+            self._rejected += 1
+            admission_shed.labels(limiter=self.label, reason="rejected").inc()
+            raise OverloadedError(
+                f"Too many {self.name} requests waiting ({self.max_waiting}), try again later",
+                429,
+                self._retry_after()
+            )
+
+        self._waiting += 1
+        self._waiting_gauge.inc()
+        started = None
+
+        async def acquire_slot() -> None:
+            nonlocal started
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.wait_timeout)
+            except asyncio.TimeoutError:
+                self._timed_out += 1
+                admission_shed.labels(limiter=self.label, reason="timed_out").inc()
+                raise OverloadedError(
+                    f"No {self.name} capacity freed up within {self.wait_timeout:g}s, try again later",
+                    503,
+                    self._retry_after()
+                )
+            self._waiting -= 1
+            self._waiting_gauge.dec()
+            self._active += 1
+            self._active_gauge.inc()
+            self._admitted += 1
+            started = time.monotonic()
+
+        try:
+            yield acquire_slot
+        finally:
+            if started is None:
+                self._waiting -= 1
+                self._waiting_gauge.dec()
+            else:
+                self._active -= 1
+                self._active_gauge.dec()
+                self._semaphore.release()
+                self._mean_seconds = 0.9 * self._mean_seconds + 0.1 * (time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_waiting": self.max_waiting,
+            "active": self._active,
+            "waiting": self._waiting,
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "timed_out": self._timed_out,
+            "mean_seconds": round(self._mean_seconds, 3)
+        }
+
+
+# Interactive inference, per endpoint. Background work is limited separately by the
+# task scheduler (INFERENCE_WORKERS), so a burst of searches never starves it and an
+# import never blocks check-in searches beyond these limits.
+search_limiter = AdmissionLimiter(
+    "search", "search", settings.SEARCH_MAX_CONCURRENCY, settings.SEARCH_MAX_WAITING, settings.SEARCH_WAIT_SECONDS
+)
+enrollment_limiter = AdmissionLimiter(
+    "face enrollment", "enrollment", settings.ENROLLMENT_MAX_CONCURRENCY, settings.ENROLLMENT_MAX_WAITING, settings.ENROLLMENT_WAIT_SECONDS
+)
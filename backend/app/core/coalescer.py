@@ -0,0 +1,68 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+class CoalescingWorker:
+    """
+    Low-priority worker that runs `handler(keys)` once for keys submitted in bursts.
+
+    Keys submitted within `delay` seconds of each other are merged (deduplicated, in
+    order) into one call, made at most `max_delay` seconds after the first of them,
+    so a burst of single-face registrations triggers one pass instead of one job each.
+    Calls run one at a time on the worker's own thread, outside the task scheduler:
+    they never take a slot of its bounded queue or one of its inference workers.
+    Keys submitted while a call runs go into the next one. Pending keys are kept
+    in memory only.
+    """
+
+    def __init__(self, name: str, handler: Callable[[List[str]], None], delay: float = 5.0, max_delay: float = 60.0):
+        self.name = name
+        self.handler = handler
+        self.delay = delay
+        self.max_delay = max_delay
+        self._pending: Dict[str, None] = {}
+        self._first_at = 0.0
+        self._last_at = 0.0
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def submit(self, keys: Sequence[str]) -> None:
+        if not keys:
+            return
+        with self._condition:
+            now = time.monotonic()
+            if not self._pending:
+                self._first_at = now
+            self._last_at = now
+            self._pending.update(dict.fromkeys(keys))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _next_batch(self) -> List[str]:
+        with self._condition:
+            while True:
+                if not self._pending:
+                    self._condition.wait()
+                    continue
+                due = min(self._last_at + self.delay, self._first_at + self.max_delay)
+                remaining = due - time.monotonic()
+                if remaining <= 0:
+                    keys = list(self._pending)
+                    self._pending.clear()
+                    return keys
+                self._condition.wait(remaining)
+
+    def _run(self) -> None:
+        while True:
+            keys = self._next_batch()
+            try:
+                self.handler(keys)
+            except Exception as e:
+                print(f"{self.name} failed for {len(keys)} keys: {e}")
@@ -8,6 +8,37 @@ class Settings:
     SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
     SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
     DEBUG = os.getenv("DEBUG", "False") == "True"
+    INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+    TASK_QUEUE_SIZE = int(os.getenv("TASK_QUEUE_SIZE", "100"))
+    TASK_DB_PATH = os.getenv("TASK_DB_PATH", "data/tasks.sqlite3")
+    RETAG_DELAY_SECONDS = float(os.getenv("RETAG_DELAY_SECONDS", "5"))
+    RETAG_MAX_DELAY_SECONDS = float(os.getenv("RETAG_MAX_DELAY_SECONDS", "60"))
+    SEARCH_MAX_CONCURRENCY = int(os.getenv("SEARCH_MAX_CONCURRENCY", "2"))
+    SEARCH_MAX_WAITING = int(os.getenv("SEARCH_MAX_WAITING", "16"))
+    SEARCH_WAIT_SECONDS = float(os.getenv("SEARCH_WAIT_SECONDS", "5"))
+    ENROLLMENT_MAX_CONCURRENCY = int(os.getenv("ENROLLMENT_MAX_CONCURRENCY", "1"))
+    ENROLLMENT_MAX_WAITING = int(os.getenv("ENROLLMENT_MAX_WAITING", "8"))
+    ENROLLMENT_WAIT_SECONDS = float(os.getenv("ENROLLMENT_WAIT_SECONDS", "10"))
+    FACE_INDEX_ENABLED = os.getenv("FACE_INDEX_ENABLED", "True") == "True"
+    FACE_INDEX_BACKEND = os.getenv("FACE_INDEX_BACKEND", "exact")
+    FACE_INDEX_REFRESH_SECONDS = int(os.getenv("FACE_INDEX_REFRESH_SECONDS", "600"))
+    EMBEDDING_PRECISION = os.getenv("EMBEDDING_PRECISION", "float32")
+    FACE_STORE_PATH = os.getenv("FACE_STORE_PATH", "data/event_faces.sqlite3")
+    EMBEDDING_CACHE_MEMORY_ITEMS = int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "2048"))
+    EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "data/embedding_cache")
+    EMBEDDING_CACHE_DISK_MB = int(os.getenv("EMBEDDING_CACHE_DISK_MB", "512"))
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+    HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "30"))
+    MAX_DOWNLOAD_MB = int(os.getenv("MAX_DOWNLOAD_MB", "25"))
+    GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+    DRIVE_INGEST_CONCURRENCY = int(os.getenv("DRIVE_INGEST_CONCURRENCY", "8"))
+    THUMBNAIL_MAX_SIDE = int(os.getenv("THUMBNAIL_MAX_SIDE", "400"))
+    DETECTION_IMAGE_MAX_SIDE = int(os.getenv("DETECTION_IMAGE_MAX_SIDE", "1600"))
+    DETECTION_MAX_SIDE = int(os.getenv("DETECTION_MAX_SIDE", "1600"))
+    DETECTION_TILED = os.getenv("DETECTION_TILED", "False") == "True"
+    DETECTION_TILE_SIZE = int(os.getenv("DETECTION_TILE_SIZE", "1600"))
+    DETECTION_TILE_OVERLAP = float(os.getenv("DETECTION_TILE_OVERLAP", "0.25"))
+    DETECTION_TILE_WORKERS = int(os.getenv("DETECTION_TILE_WORKERS", "4"))
     ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000,http://localhost:8000").split(",")
 
 settings = Settings()
\ No newline at end of file
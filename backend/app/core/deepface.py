@@ -3,14 +3,34 @@ import json
 import os
 from pathlib import Path
 import cv2
-import requests
 import numpy as np
-import uuid
-from typing import List, Dict, Any, Union, Optional
+from typing import List, Dict, Any, Union, Optional, Sequence, Tuple
 from datetime import datetime
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from app.core.config import settings
+from app.core.embedding_cache import embedding_cache
+from app.core.http_client import http_client
+from app.core.metrics import observe_stage
 
 EMBEDDING_MODEL: str = "Facenet512"
 DETECTOR_BACKEND: str = "fastmtcnn"
+EMBEDDING_BATCH_SIZE: int = 32
+# Long side the detector runs at (0 = full resolution), and context kept around a face when it is refined
+DETECTION_MAX_SIDE: int = settings.DETECTION_MAX_SIDE
+REFINE_MARGIN: float = 0.5
+# Overlap a face found on the crop needs with the coarse box to be taken as the same face
+REFINE_MIN_IOU: float = 0.3
+# Tiled detection: tile long side, share of a tile overlapping its neighbours, and box IoU above which duplicates are merged
+DETECTION_TILED: bool = settings.DETECTION_TILED
+DETECTION_TILE_SIZE: int = settings.DETECTION_TILE_SIZE
+DETECTION_TILE_OVERLAP: float = settings.DETECTION_TILE_OVERLAP
+NMS_IOU_THRESHOLD: float = 0.4
+
+# The detector's native code releases the GIL, so tiles run in parallel on threads sharing one loaded model
+_tile_pool = ThreadPoolExecutor(max_workers=max(1, settings.DETECTION_TILE_WORKERS), thread_name_prefix="detect-tile")
+
 
 def dict_structure(d):
     if isinstance(d, dict):
@@ -68,124 +88,685 @@ def save_image_with_bounding_boxes(image: np.ndarray, face_objs: List[Dict[str,
     
     return log_filepath
 
-def process_faces_image(
-    image_path: str, 
-    include_embedding: bool = True, 
-    single_face_only: bool = False
-) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+def fetch_image_bytes(image_path: str) -> bytes:
     """
-    Process faces in an image and optionally extract embeddings.
+    Download (for URLs) or read the encoded bytes of an image.
     
     Args:
         image_path: Path or URL to the image
-        include_embedding: Whether to include face embeddings in the result
-        single_face_only: If True, processes only the first face when multiple faces detected
         
     Returns:
-        Single face dict if single_face_only=True, otherwise list of face dicts
+        Encoded image bytes
+        
+    Raises:
+        ValueError: If the file could not be read
+    """
+    if image_path.startswith(('http://', 'https://')):
+        return http_client.get_bytes(image_path)
+    try:
+        with open(image_path, "rb") as f:
+            return f.read()
+    except OSError:
+        raise ValueError(f"Could not load image from: {image_path}")
+
+def prefetch_images(image_paths: Sequence[str]) -> List["Future[bytes]"]:
+    """
+    Start fetching several images concurrently through the shared HTTP client.
+    
+    Returns:
+        One future per path, resolving to the encoded bytes (or raising what fetch_image_bytes would)
+    """
+    futures: List["Future[bytes]"] = []
+    for image_path in image_paths:
+        if image_path.startswith(('http://', 'https://')):
+            futures.append(http_client.fetch(image_path))
+            continue
+        future: "Future[bytes]" = Future()
+        try:
+            future.set_result(fetch_image_bytes(image_path))
+        except Exception as e:
+            future.set_exception(e)
+        futures.append(future)
+    return futures
+
+def decode_image(data: bytes, image_path: str = "image bytes") -> np.ndarray:
+    """
+    Decode encoded image bytes into a BGR array.
+    
+    Raises:
+        ValueError: If the image could not be decoded
+    """
+    with observe_stage("decode"):
+        image: Optional[np.ndarray] = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError(f"Could not load image from: {image_path}")
+    return image
+
+def load_image(image_path: str) -> np.ndarray:
+    """
+    Fetch (for URLs) and decode an image into a BGR array.
+    
+    Args:
+        image_path: Path or URL to the image
+        
+    Returns:
+        Decoded image as numpy array
+        
+    Raises:
+        ValueError: If the image could not be decoded
+    """
+    return decode_image(fetch_image_bytes(image_path), image_path)
+
+def _downscale(image: np.ndarray, max_side: int) -> Tuple[np.ndarray, float]:
+    """
+    Shrink an image so that its long side is at most max_side.
+    
+    Returns:
+        The (possibly unchanged) image and the original pixels per returned pixel
+    """
+    height, width = image.shape[:2]
+    if max_side <= 0 or max(height, width) <= max_side:
+        return image, 1.0
+    scale: float = max(height, width) / max_side
+    size: Tuple[int, int] = (max(1, round(width / scale)), max(1, round(height / scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA), scale
+
+def box_iou(a: Dict[str, Any], b: Dict[str, Any]) -> float:
+    """Intersection over union of two boxes with "x", "y", "w" and "h"."""
+    width: int = max(0, min(a["x"] + a["w"], b["x"] + b["w"]) - max(a["x"], b["x"]))
+    height: int = max(0, min(a["y"] + a["h"], b["y"] + b["h"]) - max(a["y"], b["y"]))
+    intersection: int = width * height
+    union: int = a["w"] * a["h"] + b["w"] * b["h"] - intersection
+    return intersection / union if union > 0 else 0.0
+
+def _refine_face(image: np.ndarray, box: Dict[str, int], confidence: Optional[float]) -> Dict[str, Any]:
+    """
+    Re-detect and align one face on a full-resolution crop around a box found at low resolution.
+    
+    Args:
+        image: Full-resolution BGR image
+        box: Face box mapped to full-resolution coordinates
+        confidence: Detector confidence of the low-resolution detection
+        
+    Returns:
+        DeepFace face object in full-resolution coordinates; if the detector misses the face
+        on the crop (no face overlapping the box by REFINE_MIN_IOU, a neighbouring face in the
+        margin does not count), the box is cropped from the full-resolution image without alignment
+    """
+    height, width = image.shape[:2]
+    margin: int = int(REFINE_MARGIN * max(box["w"], box["h"]))
+    x0: int = max(0, box["x"] - margin)
+    y0: int = max(0, box["y"] - margin)
+    x1: int = min(width, box["x"] + box["w"] + margin)
+    y1: int = min(height, box["y"] + box["h"] + margin)
+    
+    # Without enforce_detection a miss comes back as the whole crop with confidence 0
+    candidates: List[Dict[str, Any]] = [
+        face_obj for face_obj in DeepFace.extract_faces(
+            img_path=image[y0:y1, x0:x1], detector_backend=inference_engine.detector_backend,
+            align=True, enforce_detection=False
+        )
+        if face_obj.get("confidence")
+    ]
+    for face_obj in candidates:
+        facial_area: Dict[str, Any] = dict(face_obj["facial_area"])
+        facial_area["x"] += x0
+        facial_area["y"] += y0
+        for eye in ("left_eye", "right_eye"):
+            if facial_area.get(eye) is not None:
+                facial_area[eye] = (facial_area[eye][0] + x0, facial_area[eye][1] + y0)
+        face_obj["facial_area"] = facial_area
+    if candidates:
+        best: Dict[str, Any] = max(candidates, key=lambda face_obj: box_iou(face_obj["facial_area"], box))
+        if box_iou(best["facial_area"], box) >= REFINE_MIN_IOU:
+            return best
+    
+    crop: np.ndarray = image[box["y"]:box["y"] + box["h"], box["x"]:box["x"] + box["w"]]
+    return {
+        "face": cv2.cvtColor(crop, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0,
+        "facial_area": box,
+        "confidence": confidence
+    }
+
+def _tile_origins(length: int, tile_size: int, step: int) -> List[int]:
+    """Start offsets of tiles covering [0, length), the last one flush with the end."""
+    if length <= tile_size:
+        return [0]
+    origins: List[int] = list(range(0, length - tile_size, step))
+    origins.append(length - tile_size)
+    return origins
+
+def _detect_tile(image: np.ndarray, x0: int, y0: int, tile_size: int) -> List[Dict[str, Any]]:
+    """
+    Detect and align the faces of one tile, in full-image coordinates.
+    
+    Faces touching a tile edge that is inside the image are dropped: they are cut by the
+    tile, and the overlap makes sure the neighbouring tile holds them whole.
+    """
+    height, width = image.shape[:2]
+    x1: int = min(width, x0 + tile_size)
+    y1: int = min(height, y0 + tile_size)
+    face_objs: List[Dict[str, Any]] = []
+    for face_obj in DeepFace.extract_faces(
+        img_path=image[y0:y1, x0:x1], detector_backend=inference_engine.detector_backend,
+        align=True, enforce_detection=False
+    ):
+        # Without enforce_detection a tile without faces comes back whole with confidence 0
+        if not face_obj.get("confidence"):
+            continue
+        area: Dict[str, Any] = face_obj["facial_area"]
+        if ((x0 > 0 and area["x"] <= 1) or (y0 > 0 and area["y"] <= 1)
+                or (x1 < width and area["x"] + area["w"] >= x1 - x0 - 1)
+                or (y1 < height and area["y"] + area["h"] >= y1 - y0 - 1)):
+            continue
+        facial_area: Dict[str, Any] = dict(area)
+        facial_area["x"] += x0
+        facial_area["y"] += y0
+        for eye in ("left_eye", "right_eye"):
+            if facial_area.get(eye) is not None:
+                facial_area[eye] = (facial_area[eye][0] + x0, facial_area[eye][1] + y0)
+        face_obj["facial_area"] = facial_area
+        face_objs.append(face_obj)
+    return face_objs
+
+def _detect_large_faces(image: np.ndarray, max_side: int, min_side: int) -> List[Dict[str, Any]]:
+    """
+    Find the faces too large for the tile overlap on a downscaled copy of the whole image.
+    
+    A face no larger than the overlap always lies whole inside some tile; a larger one crossing
+    a seam touches an inner edge of every tile holding it. Faces found here with a side above
+    `min_side` (full-resolution pixels) are refined on a full-resolution crop; smaller ones are
+    left to the tiles.
+    """
+    small, scale = _downscale(image, max_side)
+    face_objs: List[Dict[str, Any]] = []
+    for face_obj in DeepFace.extract_faces(
+        img_path=small, detector_backend=inference_engine.detector_backend,
+        align=scale == 1.0, enforce_detection=False
+    ):
+        if not face_obj.get("confidence"):
+            continue
+        box: Dict[str, int] = scale_facial_area(face_obj["facial_area"], scale)
+        if max(box["w"], box["h"]) <= min_side:
+            continue
+        face_objs.append(_refine_face(image, box, face_obj.get("confidence")) if scale > 1.0 else face_obj)
+    return face_objs
+
+def non_max_suppression(face_objs: List[Dict[str, Any]], iou_threshold: float = NMS_IOU_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Keep the most confident of every group of overlapping faces.
+    
+    Args:
+        face_objs: Face objects with "facial_area" and "confidence"
+        iou_threshold: Overlap above which two boxes are the same face
+        
+    Returns:
+        The kept face objects, most confident first
+    """
+    kept: List[Dict[str, Any]] = []
+    for face_obj in sorted(face_objs, key=lambda face_obj: face_obj.get("confidence") or 0.0, reverse=True):
+        if all(box_iou(face_obj["facial_area"], other["facial_area"]) <= iou_threshold for other in kept):
+            kept.append(face_obj)
+    return kept
+
+def detect_faces_tiled(
+    image: np.ndarray,
+    tile_size: int = DETECTION_TILE_SIZE,
+    overlap: float = DETECTION_TILE_OVERLAP
+) -> List[Dict[str, Any]]:
+    """
+    Detect and align faces at full resolution, one overlapping tile at a time.
+    
+    Tiles are detected in parallel; faces found twice in the overlaps are merged with
+    non-max suppression. Only one tile per worker is in the detector at a time, which
+    bounds peak memory on very large photos while small faces keep all of their pixels.
+    Faces larger than the overlap can cross a seam without fitting in any tile, so a
+    coarse pass over the whole image, downscaled to one tile, finds those in parallel.
+    
+    Args:
+        image: Decoded BGR image
+        tile_size: Long side of a tile
+        overlap: Share of a tile shared with its neighbour
+        
+    Returns:
+        DeepFace face objects ("face", "facial_area", "confidence") in full-image coordinates, most confident first
         
     Raises:
         ValueError: If no faces detected
     """
-    face_objs: List[Dict[str, Any]] = DeepFace.extract_faces(
-        img_path=image_path, detector_backend=DETECTOR_BACKEND, align=True
-    )
+    if not inference_engine.ready:
+        inference_engine.load()
+    height, width = image.shape[:2]
+    step: int = max(1, int(tile_size * (1 - overlap)))
+    tiles: List[Future] = [_tile_pool.submit(_detect_large_faces, image, tile_size, tile_size - step)]
+    tiles += [
+        _tile_pool.submit(_detect_tile, image, x0, y0, tile_size)
+        for y0 in _tile_origins(height, tile_size, step)
+        for x0 in _tile_origins(width, tile_size, step)
+    ]
+    face_objs: List[Dict[str, Any]] = non_max_suppression([face_obj for tile in tiles for face_obj in tile.result()])
     if not face_objs:
         raise ValueError("No face detected in the image")
+    return face_objs
+
+def detect_faces(
+    image: np.ndarray,
+    max_side: Optional[int] = None,
+    tiled: Optional[bool] = None
+) -> List[Dict[str, Any]]:
+    """
+    Detect and align faces in a decoded image.
     
-    image: Optional[np.ndarray]
-    if image_path.startswith(('http://', 'https://')):
-        response: requests.Response = requests.get(image_path)
-        response.raise_for_status()
-        image_array: np.ndarray = np.frombuffer(response.content, dtype=np.uint8)
-        image = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
-    else:
-        image = cv2.imread(image_path)
+    Images larger than max_side are detected on a downscaled copy; each face found there is
+    then refined on a full-resolution crop around it, so faces are aligned (and later embedded)
+    from full-resolution pixels. In tiled mode, images larger than one tile are detected at full
+    resolution with detect_faces_tiled() instead.
     
-    if image is None:
-        raise ValueError(f"Could not load image from: {image_path}")
+    Args:
+        image: Decoded BGR image
+        max_side: Long side to detect at, defaults to the inference engine's (0 = full resolution)
+        tiled: Whether to use tiled detection, defaults to the inference engine's setting
+        
+    Returns:
+        DeepFace face objects ("face", "facial_area", "confidence") in full-resolution coordinates
+        
+    Raises:
+        ValueError: If no faces detected
+    """
+    if not inference_engine.ready:
+        inference_engine.load()
+    if tiled is None:
+        tiled = inference_engine.tiled_detection
+    if tiled and max(image.shape[:2]) > DETECTION_TILE_SIZE:
+        with observe_stage("detect"):
+            return detect_faces_tiled(image)
+    if max_side is None:
+        max_side = inference_engine.detection_max_side
+    # At full resolution the detector aligns faces itself, so "align" only covers refinement
+    with observe_stage("detect"):
+        small, scale = _downscale(image, max_side)
+        face_objs: List[Dict[str, Any]] = DeepFace.extract_faces(
+            img_path=small, detector_backend=inference_engine.detector_backend, align=scale == 1.0
+        )
+    if not face_objs:
+        raise ValueError("No face detected in the image")
+    if scale > 1.0:
+        with observe_stage("align"):
+            # Two coarse boxes must not end up as one face twice
+            face_objs = non_max_suppression([
+                _refine_face(image, scale_facial_area(face_obj["facial_area"], scale), face_obj.get("confidence"))
+                for face_obj in face_objs
+            ])
+    return face_objs
+
+class InferenceEngine:
+    """
+    Owns the detector and embedding models for the whole process.
     
-    # If multiple faces detected and not in single face mode, save image with bounding boxes to logs
-    if len(face_objs) > 1 and not single_face_only:
-        log_filepath = save_image_with_bounding_boxes(image, face_objs, image_path)
-        print(f"Multiple faces detected ({len(face_objs)}). Image with bounding boxes saved to: {log_filepath}")
-    
-    # If single_face_only, only process the first face
-    if single_face_only:
-        if len(face_objs) > 1:
-            print(f"Multiple faces detected ({len(face_objs)}). Processing only the first face as requested.")
-        
-        # Process only the first face
-        first_face_obj = face_objs[0]
-        first_facial_area: Dict[str, int] = first_face_obj["facial_area"]
-        first_x: int = first_facial_area["x"]
-        first_y: int = first_facial_area["y"]
-        first_w: int = first_facial_area["w"]
-        first_h: int = first_facial_area["h"]
-        first_cropped_face: np.ndarray = image[first_y:first_y+first_h, first_x:first_x+first_w]
-        
-        first_face_data: Dict[str, Any] = {
-            "facial_area": first_facial_area,
-            "cropped_face": first_cropped_face,
-            "face_index": 0
-        }
-        
-        if include_embedding:
-            first_temp_crop_path: str = f"temp_crop_{uuid.uuid4()}.jpg"
-            
+    Models are loaded once (normally from the FastAPI lifespan hook) and shared by
+    request handlers and background workers. Callers that arrive while loading is
+    in progress wait on the same lock instead of loading the weights again.
+    """
+    
+    def __init__(
+        self,
+        embedding_model: str = EMBEDDING_MODEL,
+        detector_backend: str = DETECTOR_BACKEND,
+        detection_max_side: int = DETECTION_MAX_SIDE,
+        tiled_detection: bool = DETECTION_TILED
+    ):
+        self.embedding_model_name = embedding_model
+        self.detector_backend = detector_backend
+        self.detection_max_side = detection_max_side
+        self.tiled_detection = tiled_detection
+        self.error: Optional[str] = None
+        self._model: Optional[Any] = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+    
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+    
+    def detection_config(self, tiled: Optional[bool] = None) -> str:
+        """Detector and detection resolution (or tiling), which together decide the faces found in an image."""
+        if tiled is None:
+            tiled = self.tiled_detection
+        if tiled:
+            return f"{self.detector_backend}@tiles{DETECTION_TILE_SIZE}/{DETECTION_TILE_OVERLAP}"
+        return f"{self.detector_backend}@{self.detection_max_side}"
+    
+    @property
+    def embedding_model(self) -> Any:
+        if not self.ready:
+            self.load()
+        return self._model
+    
+    def load(self) -> None:
+        """Load both models and run one warm-up inference through each of them."""
+        with self._lock:
+            if self._ready.is_set():
+                return
             try:
-                cv2.imwrite(first_temp_crop_path, first_cropped_face)
+                started = time.time()
+                model = DeepFace.build_model(self.embedding_model_name)
+                # Newer DeepFace versions wrap the Keras model in a FacialRecognition client
+                self._model = getattr(model, "model", model)
                 
-                first_embedding_result: List[Dict[str, Any]] = DeepFace.represent(img_path=first_temp_crop_path, model_name=EMBEDDING_MODEL)
-                first_embedding_obj: List[float] = first_embedding_result[0]["embedding"] if first_embedding_result and "embedding" in first_embedding_result[0] else []
-                first_face_data["embedding"] = first_embedding_obj
+                # The detector is built lazily by DeepFace on its first call
+                warmup_image: np.ndarray = np.zeros((160, 160, 3), dtype=np.uint8)
+                DeepFace.extract_faces(
+                    img_path=warmup_image, detector_backend=self.detector_backend,
+                    align=True, enforce_detection=False
+                )
+                embed_faces([warmup_image.astype(np.float32)], model=self._model)
                 
-            finally:
-                try:
-                    if os.path.exists(first_temp_crop_path):
-                        os.remove(first_temp_crop_path)
-                except Exception:
-                    pass
+                self.error = None
+                self._ready.set()
+                print(f"Inference engine ready in {time.time() - started:.1f}s "
+                      f"({self.embedding_model_name}, {self.detector_backend})")
+            except Exception as e:
+                self.error = str(e)
+                raise
+
+inference_engine = InferenceEngine()
+
+def _preprocess_face(aligned_face: np.ndarray, target_size: Tuple[int, int]) -> np.ndarray:
+    """
+    Flip to BGR, then resize with aspect ratio kept and zero padding, as DeepFace.represent does.
+    
+    Args:
+        aligned_face: RGB face, float in [0, 1] or uint8
+        target_size: (height, width) expected by the model
         
-        return first_face_data
+    Returns:
+        float32 BGR array of shape (height, width, 3)
+    """
+    # Extracted faces are RGB, the models were trained on BGR (DeepFace.represent flips them too)
+    aligned_face = aligned_face[:, :, ::-1]
+    factor: float = min(target_size[0] / aligned_face.shape[0], target_size[1] / aligned_face.shape[1])
+    dsize: Tuple[int, int] = (
+        max(1, int(aligned_face.shape[1] * factor)),
+        max(1, int(aligned_face.shape[0] * factor))
+    )
+    face: np.ndarray = cv2.resize(aligned_face.astype(np.float32), dsize)
+    diff_0: int = target_size[0] - face.shape[0]
+    diff_1: int = target_size[1] - face.shape[1]
+    face = np.pad(
+        face,
+        ((diff_0 // 2, diff_0 - diff_0 // 2), (diff_1 // 2, diff_1 - diff_1 // 2), (0, 0)),
+        "constant"
+    )
+    if face.shape[0:2] != target_size:
+        face = cv2.resize(face, (target_size[1], target_size[0]))
+    if face.max() > 1:
+        face = face / 255.0
+    return face.astype(np.float32)
+
+def embed_faces(aligned_faces: Sequence[np.ndarray], model: Optional[Any] = None) -> np.ndarray:
+    """
+    Compute embeddings for many aligned faces with batched forward passes.
     
-    # Process all faces (when single_face_only=False)
-    processed_faces: List[Dict[str, Any]] = []
-    for i, face_obj in enumerate(face_objs):
-        facial_area: Dict[str, int] = face_obj["facial_area"]
-        x: int = facial_area["x"]
-        y: int = facial_area["y"]
-        w: int = facial_area["w"]
-        h: int = facial_area["h"]
-        cropped_face: np.ndarray = image[y:y+h, x:x+w]
-        
-        face_data: Dict[str, Any] = {
-            "facial_area": facial_area,
-            "cropped_face": cropped_face,
-            "face_index": i
-        }
-        
-        if include_embedding:
-            temp_crop_path: str = f"temp_crop_{uuid.uuid4()}.jpg"
-            
-            try:
-                cv2.imwrite(temp_crop_path, cropped_face)
-                
-                embedding_result: List[Dict[str, Any]] = DeepFace.represent(img_path=temp_crop_path, model_name=EMBEDDING_MODEL)
-                embedding_obj: List[float] = embedding_result[0]["embedding"] if embedding_result and "embedding" in embedding_result[0] else []
-                face_data["embedding"] = embedding_obj
-                
-            finally:
-                try:
-                    if os.path.exists(temp_crop_path):
-                        os.remove(temp_crop_path)
-                except Exception:
-                    pass
+    Faces may come from one image or from many; they are stacked into tensors of
+    at most EMBEDDING_BATCH_SIZE and run through the model together instead of
+    one DeepFace.represent call per face.
+    
+    Args:
+        aligned_faces: Faces as returned in DeepFace.extract_faces()["face"]
+            (RGB, float in [0, 1])
+        model: Keras model to use, defaults to the shared inference engine's
+        
+    Returns:
+        float32 array of shape (len(aligned_faces), embedding_size)
+    """
+    if model is None:
+        model = inference_engine.embedding_model
+    input_shape = model.input_shape
+    target_size: Tuple[int, int] = (input_shape[1], input_shape[2])
+    
+    if len(aligned_faces) == 0:
+        return np.empty((0, model.output_shape[-1]), dtype=np.float32)
+    
+    embeddings: List[np.ndarray] = []
+    with observe_stage("embed"):
+        for start in range(0, len(aligned_faces), EMBEDDING_BATCH_SIZE):
+            batch: np.ndarray = np.stack([
+                _preprocess_face(face, target_size)
+                for face in aligned_faces[start:start + EMBEDDING_BATCH_SIZE]
+            ])
+            embeddings.append(np.asarray(model(batch, training=False), dtype=np.float32))
+    
+    return np.concatenate(embeddings, axis=0)
+
+def embed_face(aligned_face: np.ndarray) -> np.ndarray:
+    """
+    Compute the embedding of a single aligned face.
+    
+    Args:
+        aligned_face: Face as returned in DeepFace.extract_faces()["face"]
+        
+    Returns:
+        Float32 embedding vector
+    """
+    return embed_faces([aligned_face])[0]
+
+class FaceDetection:
+    """
+    Faces of one image, keyed by its content for the embedding cache.
+    
+    On a cache hit `face_objs` only carry "facial_area" and "confidence" and
+    `embeddings` is already set; otherwise they are DeepFace face objects and
+    embed_detections() fills in `embeddings`.
+    """
+    
+    def __init__(
+        self,
+        key: str,
+        image: Optional[np.ndarray],
+        face_objs: List[Dict[str, Any]],
+        embeddings: Optional[np.ndarray] = None
+    ):
+        self.key = key
+        self.image = image
+        self.face_objs = face_objs
+        self.embeddings = embeddings
+    
+    @property
+    def cached(self) -> bool:
+        return self.embeddings is not None
+
+def detect_image_faces(
+    data: bytes,
+    image_path: str = "image bytes",
+    decode: bool = True,
+    tiled: Optional[bool] = None
+) -> FaceDetection:
+    """
+    Detect the faces of an encoded image, unless the embedding cache already knows them.
+    
+    Args:
+        data: Encoded image bytes
+        image_path: Path or URL of the image, for error messages
+        decode: Whether to decode the image on a cache hit too (for cropping faces)
+        tiled: Whether to use tiled detection, defaults to the inference engine's setting
+        
+    Returns:
+        FaceDetection with every detected face
         
-        processed_faces.append(face_data)
+    Raises:
+        ValueError: If the image could not be decoded or no faces detected
+    """
+    key: str = embedding_cache.key(data, inference_engine.embedding_model_name, inference_engine.detection_config(tiled))
+    cached: Optional[Dict[str, Any]] = embedding_cache.get(key)
+    if cached is not None:
+        if not cached["faces"]:
+            raise ValueError("No face detected in the image")
+        image: Optional[np.ndarray] = decode_image(data, image_path) if decode else None
+        return FaceDetection(key, image, cached["faces"], cached["embeddings"])
     
-    return processed_faces
+    image = decode_image(data, image_path)
+    try:
+        face_objs: List[Dict[str, Any]] = detect_faces(image, tiled=tiled)
+    except ValueError:
+        embedding_cache.put(key, [], np.empty((0, 0), dtype=np.float32))
+        raise
+    return FaceDetection(key, image, face_objs)
 
+def embed_detections(detections: Sequence[FaceDetection]) -> None:
+    """
+    Embed every face of the detections that were not cached in shared batches, and cache the results.
+    """
+    pending: List[FaceDetection] = [detection for detection in detections if not detection.cached]
+    embeddings: np.ndarray = embed_faces([
+        face_obj["face"] for detection in pending for face_obj in detection.face_objs
+    ])
+    offset: int = 0
+    for detection in pending:
+        detection.embeddings = embeddings[offset:offset + len(detection.face_objs)]
+        offset += len(detection.face_objs)
+        embedding_cache.put(
+            detection.key,
+            [
+                {"facial_area": face_obj["facial_area"], "confidence": face_obj.get("confidence")}
+                for face_obj in detection.face_objs
+            ],
+            detection.embeddings
+        )
+
+def scale_facial_area(facial_area: Dict[str, Any], scale: float) -> Dict[str, int]:
+    """
+    Map a face box found on a downscaled copy of an image back to the original's pixels.
+
+    Args:
+        facial_area: Box with "x", "y", "w" and "h" on the downscaled copy
+        scale: Original pixels per downscaled pixel
+
+    Returns:
+        Box in original image coordinates
+    """
+    return {key: int(round(facial_area[key] * scale)) for key in ("x", "y", "w", "h")}
+
+def _build_face_data(
+    image: np.ndarray,
+    face_obj: Dict[str, Any],
+    face_index: int,
+    embedding: Optional[np.ndarray] = None
+) -> Dict[str, Any]:
+    facial_area: Dict[str, int] = face_obj["facial_area"]
+    x: int = facial_area["x"]
+    y: int = facial_area["y"]
+    w: int = facial_area["w"]
+    h: int = facial_area["h"]
+    cropped_face: np.ndarray = image[y:y+h, x:x+w]
+    
+    face_data: Dict[str, Any] = {
+        "facial_area": facial_area,
+        "cropped_face": cropped_face,
+        "face_index": face_index
+    }
+    
+    if embedding is not None:
+        face_data["embedding"] = embedding
+    
+    return face_data
+
+def _detect_selected_faces(
+    image_path: str,
+    single_face_only: bool,
+    image_bytes: Optional[bytes] = None,
+    tiled: Optional[bool] = None
+) -> FaceDetection:
+    if image_bytes is None:
+        image_bytes = fetch_image_bytes(image_path)
+    # Detection runs on the buffer that is cropped later, so the image is fetched and decoded once
+    detection: FaceDetection = detect_image_faces(image_bytes, image_path, tiled=tiled)
+    face_count: int = len(detection.face_objs)
+    
+    # If multiple faces detected and not in single face mode, save image with bounding boxes to logs
+    if face_count > 1 and not single_face_only:
+        log_filepath = save_image_with_bounding_boxes(detection.image, detection.face_objs, image_path)
+        print(f"Multiple faces detected ({face_count}). Image with bounding boxes saved to: {log_filepath}")
+    
+    # If single_face_only, only the first face is returned (all faces are still embedded and cached)
+    if single_face_only and face_count > 1:
+        print(f"Multiple faces detected ({face_count}). Processing only the first face as requested.")
+    
+    return detection
 
+def _selected_face_data(
+    detection: FaceDetection,
+    include_embedding: bool,
+    single_face_only: bool
+) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+    face_objs: List[Dict[str, Any]] = detection.face_objs[:1] if single_face_only else detection.face_objs
+    processed_faces: List[Dict[str, Any]] = [
+        _build_face_data(detection.image, face_obj, i, detection.embeddings[i] if include_embedding else None)
+        for i, face_obj in enumerate(face_objs)
+    ]
+    return processed_faces[0] if single_face_only else processed_faces
 
+def process_faces_images(
+    image_paths: Sequence[str],
+    include_embedding: bool = True,
+    single_face_only: bool = False
+) -> List[Union[Dict[str, Any], List[Dict[str, Any]], Exception]]:
+    """
+    Process faces in several images, embedding all of their faces in shared batches.
+    
+    Args:
+        image_paths: Paths or URLs to the images
+        include_embedding: Whether to include face embeddings in the results
+        single_face_only: If True, processes only the first face of each image
+        
+    Returns:
+        One entry per image, in order: what process_faces_image would return for
+        it, or the exception raised while loading it or detecting its faces
+    """
+    # All images download concurrently while the first ones are being detected
+    fetches: List["Future[bytes]"] = prefetch_images(image_paths)
+    detections: List[Union[FaceDetection, Exception]] = []
+    for image_path, fetched in zip(image_paths, fetches):
+        try:
+            detections.append(_detect_selected_faces(image_path, single_face_only, fetched.result()))
+        except Exception as e:
+            detections.append(e)
+    
+    if include_embedding:
+        embed_detections([detection for detection in detections if not isinstance(detection, Exception)])
+    
+    return [
+        detection if isinstance(detection, Exception)
+        else _selected_face_data(detection, include_embedding, single_face_only)
+        for detection in detections
+    ]
 
+def process_faces_image(
+    image_path: str, 
+    include_embedding: bool = True, 
+    single_face_only: bool = False,
+    image_bytes: Optional[bytes] = None,
+    tiled: Optional[bool] = None
+) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Process faces in an image and optionally extract embeddings.
+    
+    Args:
+        image_path: Path or URL to the image
+        include_embedding: Whether to include face embeddings in the result
+        single_face_only: If True, processes only the first face when multiple faces detected
+        image_bytes: Encoded image already downloaded by the caller, instead of fetching image_path
+        tiled: Whether to detect large images tile by tile (for crowd photos), defaults to DETECTION_TILED
+        
+    Returns:
+        Single face dict if single_face_only=True, otherwise list of face dicts
+        
+    Raises:
+        ValueError: If no faces detected
+    """
+    detection: FaceDetection = _detect_selected_faces(image_path, single_face_only, image_bytes, tiled)
+    
+    # All faces of the image go through the embedding model in one batch, unless they were cached
+    if include_embedding:
+        embed_detections([detection])
+    
+    return _selected_face_data(detection, include_embedding, single_face_only)
@@ -0,0 +1,174 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.core.metrics import cache_lookups
+
+# Part of every key: bump it whenever embeddings computed for the same bytes change
+# (v2: faces are fed to the model as BGR, as DeepFace.represent does)
+KEY_VERSION: int = 2
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache of face detection and embedding results.
+
+    Entries are keyed by the SHA-256 of the image bytes together with the
+    embedding model and detector names, so the same photo submitted again
+    (re-registration, retries, another client uploading it) skips detection
+    and embedding entirely, whatever URL it came from. An entry holds the
+    detected faces (facial areas and confidences) and one embedding per face;
+    images without faces are cached too, as an entry with no faces.
+
+    Two tiers: an in-memory LRU of `memory_items` entries, backed by .npz
+    files under `disk_path` that are evicted least recently used first once
+    they take more than `disk_max_bytes`. Either tier is off when its size is 0.
+    """
+
+    def __init__(self, memory_items: int, disk_path: Optional[str], disk_max_bytes: int):
+        self.memory_items = memory_items
+        self.disk_path = disk_path if disk_path and disk_max_bytes > 0 else None
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.disk_path:
+            self._scan_disk()
+
+    @staticmethod
+    def key(data: bytes, model_name: str, detector_backend: str) -> str:
+        digest = hashlib.sha256(data)
+        digest.update(f"|{model_name}|{detector_backend}|v{KEY_VERSION}".encode())
+        return digest.hexdigest()
+
+    def _file_path(self, key: str) -> str:
+        return os.path.join(self.disk_path, key[:2], f"{key}.npz")
+
+    def _scan_disk(self) -> None:
+        """Index the files left by previous runs, least recently used first."""
+        os.makedirs(self.disk_path, exist_ok=True)
+        files: List[Tuple[float, str, int]] = []
+        for directory, _, names in os.walk(self.disk_path):
+            for name in names:
+                if name.endswith(".npz"):
+                    stat = os.stat(os.path.join(directory, name))
+                    files.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(files):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return {"faces", "embeddings"} for a key, or None on a miss."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                cache_lookups.labels(result="memory_hit").inc()
+                return entry
+            on_disk = key in self._disk
+
+        entry = self._read_disk(key) if on_disk else None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                cache_lookups.labels(result="miss").inc()
+                return None
+            self.disk_hits += 1
+            cache_lookups.labels(result="disk_hit").inc()
+            if key in self._disk:
+                self._disk.move_to_end(key)
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key: str, faces: List[Dict[str, Any]], embeddings: np.ndarray) -> None:
+        entry = {"faces": faces, "embeddings": np.asarray(embeddings, dtype=np.float32)}
+        with self._lock:
+            self._remember(key, entry)
+        if self.disk_path:
+            self._write_disk(key, entry)
+
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        if self.memory_items <= 0:
+            return
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._file_path(key)
+        try:
+            with np.load(path, allow_pickle=False) as stored:
+                entry = {"faces": json.loads(str(stored["faces"])), "embeddings": stored["embeddings"]}
+            now = time.time()
+            os.utime(path, (now, now))
+            return entry
+        except Exception:
+            with self._lock:
+                size = self._disk.pop(key, None)
+                if size is not None:
+                    self._disk_bytes -= size
+            return None
+
+    def _write_disk(self, key: str, entry: Dict[str, Any]) -> None:
+        path = self._file_path(key)
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            faces=np.array(json.dumps(entry["faces"], default=lambda value: value.tolist())),
+            embeddings=entry["embeddings"]
+        )
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(buffer.getvalue())
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Failed to write embedding cache entry: {e}")
+            return
+        with self._lock:
+            self._disk_bytes += buffer.tell() - self._disk.pop(key, 0)
+            self._disk[key] = buffer.tell()
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        while self._disk and self._disk_bytes > self.disk_max_bytes:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(self._file_path(key))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+            }
+
+
+embedding_cache = EmbeddingCache(
+    memory_items=settings.EMBEDDING_CACHE_MEMORY_ITEMS,
+    disk_path=settings.EMBEDDING_CACHE_DIR,
+    disk_max_bytes=settings.EMBEDDING_CACHE_DISK_MB * 1024 * 1024
+)
@@ -0,0 +1,171 @@
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+import numpy as np
+from app.core.config import settings
+from app.core.face_index import EMBEDDING_DIM
+from app.core.quantization import check_precision, decode_embedding, encode_embedding
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tagged_images (
+    image_id INTEGER PRIMARY KEY,
+    event_id INTEGER,
+    raw_image_url TEXT,
+    metadata TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tagged_faces (
+    image_id INTEGER NOT NULL,
+    face_index INTEGER NOT NULL,
+    embedding BLOB NOT NULL,
+    matched_user_id TEXT,
+    PRIMARY KEY (image_id, face_index)
+);
+CREATE INDEX IF NOT EXISTS idx_tagged_faces_user ON tagged_faces (matched_user_id);
+"""
+
+
+class EventFaceStore:
+    """
+    Local store of the face embeddings computed while tagging event images.
+
+    Every tagged image keeps its per-face embeddings and the user each face was
+    matched to. When the face registry changes, only the stored embeddings need
+    to be compared against the new or changed users to find which images must
+    be re-matched - no image is downloaded or run through detection again.
+    Embeddings are written at `precision` (float32, float16 or int8 with a scale),
+    and rows written at any precision are read back.
+    """
+
+    def __init__(self, db_path: str, scan_block_size: int = 10000, precision: str = "float32", dim: int = EMBEDDING_DIM):
+        self.db_path = db_path
+        self.scan_block_size = scan_block_size
+        self.precision = check_precision(precision)
+        self.dim = dim
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def save_images(self, images: Sequence[Dict[str, Any]]) -> None:
+        """
+        Replace the stored faces of the given images.
+
+        Each image is a dict with "image_id", "event_id", "raw_image_url", "metadata",
+        "embeddings" (faces x dim array) and "matched_user_ids" (one per face, or None).
+        """
+        if not images:
+            return
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for image in images:
+                    conn.execute("DELETE FROM tagged_faces WHERE image_id = ?", (image["image_id"],))
+                    conn.execute(
+                        "INSERT OR REPLACE INTO tagged_images (image_id, event_id, raw_image_url, metadata) VALUES (?, ?, ?, ?)",
+                        (image["image_id"], image["event_id"], image["raw_image_url"], json.dumps(image["metadata"]))
+                    )
+                    embeddings = np.asarray(image["embeddings"], dtype=np.float32)
+                    conn.executemany(
+                        "INSERT INTO tagged_faces (image_id, face_index, embedding, matched_user_id) VALUES (?, ?, ?, ?)",
+                        [
+                            (image["image_id"], i, encode_embedding(embedding, self.precision), user_id)
+                            for i, (embedding, user_id) in enumerate(zip(embeddings, image["matched_user_ids"]))
+                        ]
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def delete_images(self, image_ids: Sequence[int]) -> None:
+        """Forget images and their faces (images deleted from event_images since they were tagged)."""
+        if not image_ids:
+            return
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for image_id in image_ids:
+                    conn.execute("DELETE FROM tagged_faces WHERE image_id = ?", (image_id,))
+                    conn.execute("DELETE FROM tagged_images WHERE image_id = ?", (image_id,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def has_faces(self) -> bool:
+        """Whether any tagged face is stored (re-tagging has nothing to do otherwise)."""
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM tagged_faces LIMIT 1").fetchone() is not None
+
+    def find_affected_images(
+        self,
+        user_ids: Sequence[str],
+        user_embeddings: Optional[np.ndarray],
+        match_threshold: float
+    ) -> List[int]:
+        """
+        Images whose tags may change after the given users' faces changed: images with a face
+        currently matched to one of them, and images with a stored face similar enough to one
+        of their (new) embeddings. Stored faces are scanned in blocks, one matrix product each.
+        """
+        affected = set()
+        with self._connect() as conn:
+            for chunk_start in range(0, len(user_ids), 500):
+                chunk = list(user_ids[chunk_start:chunk_start + 500])
+                rows = conn.execute(
+                    f"SELECT DISTINCT image_id FROM tagged_faces WHERE matched_user_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                affected.update(row["image_id"] for row in rows)
+
+            if user_embeddings is not None and len(user_embeddings):
+                users = user_embeddings / np.maximum(np.linalg.norm(user_embeddings, axis=1, keepdims=True), 1e-12)
+                cursor = conn.execute("SELECT image_id, embedding FROM tagged_faces")
+                while True:
+                    rows = cursor.fetchmany(self.scan_block_size)
+                    if not rows:
+                        break
+                    faces = np.stack([decode_embedding(row["embedding"], self.dim) for row in rows])
+                    faces = faces / np.maximum(np.linalg.norm(faces, axis=1, keepdims=True), 1e-12)
+                    hits = np.flatnonzero((faces @ users.T >= match_threshold).any(axis=1))
+                    affected.update(rows[i]["image_id"] for i in hits)
+        return sorted(affected)
+
+    def load_images(self, image_ids: Sequence[int]) -> List[Dict[str, Any]]:
+        """Stored images with their face embeddings, in the save_images format."""
+        images: List[Dict[str, Any]] = []
+        with self._connect() as conn:
+            for image_id in image_ids:
+                row = conn.execute("SELECT * FROM tagged_images WHERE image_id = ?", (image_id,)).fetchone()
+                if row is None:
+                    continue
+                faces = conn.execute(
+                    "SELECT embedding, matched_user_id FROM tagged_faces WHERE image_id = ? ORDER BY face_index",
+                    (image_id,)
+                ).fetchall()
+                images.append({
+                    "image_id": row["image_id"],
+                    "event_id": row["event_id"],
+                    "raw_image_url": row["raw_image_url"],
+                    "metadata": json.loads(row["metadata"]),
+                    "embeddings": np.stack([decode_embedding(face["embedding"], self.dim) for face in faces])
+                    if faces else np.empty((0, 0), dtype=np.float32),
+                    "matched_user_ids": [face["matched_user_id"] for face in faces]
+                })
+        return images
+
+
+event_face_store = EventFaceStore(settings.FACE_STORE_PATH, precision=settings.EMBEDDING_PRECISION)
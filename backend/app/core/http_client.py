@@ -0,0 +1,137 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, List, Optional, Sequence, TypeVar
+import httpx
+from app.core.config import settings
+from app.core.metrics import observe_stage
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+T = TypeVar("T")
+
+
+class HttpClient:
+    """
+    Process-wide pooled HTTP client for downloading images and files.
+
+    A single httpx.AsyncClient runs on its own event loop thread, so its
+    connection pool (keep-alive, HTTP/2 when `h2` is installed) is shared by
+    async endpoints, sync request handlers and background workers alike.
+    Every download has connect/read timeouts and is cut off once it exceeds
+    `max_download_bytes`. At most `max_connections` downloads run at once;
+    `prefetch` starts many of them concurrently and returns their futures.
+    """
+
+    def __init__(self, max_connections: int, timeout: float, max_download_bytes: int):
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_download_bytes = max_download_bytes
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run() -> None:
+                    asyncio.set_event_loop(loop)
+                    self._client = httpx.AsyncClient(
+                        http2=HTTP2_AVAILABLE,
+                        follow_redirects=True,
+                        timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 10.0)),
+                        limits=httpx.Limits(
+                            max_connections=self.max_connections,
+                            max_keepalive_connections=self.max_connections
+                        )
+                    )
+                    self._semaphore = asyncio.Semaphore(self.max_connections)
+                    ready.set()
+                    loop.run_forever()
+
+                threading.Thread(target=run, name="http-client", daemon=True).start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def run(self, fn: Callable[[httpx.AsyncClient], Awaitable[T]]) -> "Future[T]":
+        """Run `fn(client)` on the client's event loop, holding one of the `max_connections` download slots."""
+        loop = self._ensure_started()
+
+        async def limited() -> T:
+            async with self._semaphore:
+                return await fn(self._client)
+
+        return asyncio.run_coroutine_threadsafe(limited(), loop)
+
+    async def arun(self, fn: Callable[[httpx.AsyncClient], Awaitable[T]]) -> T:
+        """Awaitable form of run(), usable from any event loop."""
+        return await asyncio.wrap_future(self.run(fn))
+
+    async def read_limited(self, response: httpx.Response) -> bytes:
+        """
+        Read a streamed response body, enforcing `max_download_bytes`.
+
+        Raises:
+            ValueError: If the body is larger than the limit
+        """
+        content_length = response.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_download_bytes:
+            raise ValueError(f"Download is larger than {self.max_download_bytes} bytes: {response.url}")
+        chunks: List[bytes] = []
+        size = 0
+        async for chunk in response.aiter_bytes():
+            size += len(chunk)
+            if size > self.max_download_bytes:
+                raise ValueError(f"Download is larger than {self.max_download_bytes} bytes: {response.url}")
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    async def _get_bytes(self, client: httpx.AsyncClient, url: str) -> bytes:
+        with observe_stage("fetch"):
+            async with client.stream("GET", url) as response:
+                response.raise_for_status()
+                return await self.read_limited(response)
+
+    def fetch(self, url: str) -> "Future[bytes]":
+        """Start downloading a URL and return a future for its body."""
+        return self.run(lambda client: self._get_bytes(client, url))
+
+    def prefetch(self, urls: Sequence[str]) -> List["Future[bytes]"]:
+        """Start downloading all URLs concurrently."""
+        return [self.fetch(url) for url in urls]
+
+    def get_bytes(self, url: str) -> bytes:
+        """Download a URL from sync code (request handlers, background workers)."""
+        return self.fetch(url).result()
+
+    async def aget_bytes(self, url: str) -> bytes:
+        """Download a URL from async code without blocking its event loop."""
+        return await asyncio.wrap_future(self.fetch(url))
+
+    def close(self) -> None:
+        with self._lock:
+            loop, client = self._loop, self._client
+            self._loop = self._client = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(timeout=5)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+
+
+http_client = HttpClient(
+    max_connections=settings.HTTP_MAX_CONNECTIONS,
+    timeout=settings.HTTP_TIMEOUT_SECONDS,
+    max_download_bytes=settings.MAX_DOWNLOAD_MB * 1024 * 1024
+)
@@ -0,0 +1,144 @@
+import os
+import time
+from typing import Callable, List, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+# Seconds, from a cache hit to a large crowd photo on CPU
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE: str = CONTENT_TYPE_LATEST
+
+# With more than one worker process, PROMETHEUS_MULTIPROC_DIR must point to an empty directory
+# shared by the workers (set before they start). prometheus_client then keeps every value in a
+# file per process there, and a scrape of any worker sums them.
+MULTIPROCESS: bool = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+class ReadingCollector(Collector):
+    """
+    Gauge read at scrape time from state that every worker process sees the same way
+    (the SQLite task queue, the face index loaded from user_faces).
+
+    A failing reading is skipped for that scrape.
+    """
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+
+    def collect(self) -> List[GaugeMetricFamily]:
+        try:
+            value = float(self.read())
+        except Exception:
+            return []
+        return [GaugeMetricFamily(self.name, self.documentation, value=value)]
+
+
+_readings: List[ReadingCollector] = []
+
+
+def register_reading(name: str, documentation: str, read: Callable[[], float]) -> None:
+    reading = ReadingCollector(name, documentation, read)
+    _readings.append(reading)
+    if not MULTIPROCESS:
+        REGISTRY.register(reading)
+
+
+def render() -> bytes:
+    """Every metric in the Prometheus text exposition format, summed over all workers in multiprocess mode."""
+    if not MULTIPROCESS:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    for reading in _readings:
+        registry.register(reading)
+    return generate_latest(registry)
+
+
+# Face pipeline stages: fetch (image download), decode, detect, align (full-resolution
+# refinement of faces found on a downscaled copy), embed, match and db_write (Supabase writes)
+stage_seconds = Histogram(
+    "face_pipeline_stage_seconds", "Time spent in one face pipeline stage", ("stage",), buckets=DEFAULT_BUCKETS
+)
+request_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status"),
+    buckets=DEFAULT_BUCKETS
+)
+supabase_seconds = Histogram(
+    "supabase_request_duration_seconds", "Supabase REST call latency by table or RPC", ("target", "method"),
+    buckets=DEFAULT_BUCKETS
+)
+supabase_errors = Counter(
+    "supabase_request_errors_total", "Supabase REST calls answered with an error status", ("target", "method", "status")
+)
+task_seconds = Histogram(
+    "background_task_duration_seconds", "Run time of one background task attempt", ("kind", "outcome"),
+    buckets=(1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0, 1800.0, 3600.0, 7200.0)
+)
+task_items = Counter(
+    "background_task_items_total", "Items processed by background tasks", ("status",)
+)
+# Per-process state, summed over the live worker processes
+task_workers = Gauge(
+    "task_workers", "Background inference workers", ("state",), multiprocess_mode="livesum"
+)
+admission_requests = Gauge(
+    "admission_requests", "Interactive inference requests running or waiting for a slot", ("limiter", "state"),
+    multiprocess_mode="livesum"
+)
+admission_shed = Counter(
+    "admission_shed_total", "Interactive inference requests rejected by admission control", ("limiter", "reason")
+)
+cache_lookups = Counter(
+    "embedding_cache_lookups_total", "Embedding cache lookups by outcome", ("result",)
+)
+
+
+def observe_stage(stage: str):
+    """Time the `with` block as one pipeline stage."""
+    return stage_seconds.labels(stage=stage).time()
+
+
+def supabase_target(path: str) -> str:
+    """Table or RPC a PostgREST path refers to: /rest/v1/user_faces -> user_faces, /rest/v1/rpc/fn -> rpc:fn."""
+    parts = [part for part in path.split("/") if part]
+    if "v1" in parts:
+        parts = parts[parts.index("v1") + 1:]
+    if len(parts) >= 2 and parts[0] == "rpc":
+        return f"rpc:{parts[1]}"
+    return parts[0] if parts else "unknown"
+
+
+def instrument_httpx_client(client: object) -> bool:
+    """
+    Time every request of a PostgREST httpx.Client (supabase_service.postgrest.session) by table or RPC.
+
+    The duration is measured up to the response headers. Returns False if the client has no
+    event hooks (a different supabase/postgrest version), which leaves it uninstrumented.
+    """
+    try:
+        hooks = client.event_hooks
+    except AttributeError:
+        return False
+
+    def on_request(request) -> None:
+        request.extensions["metrics_started"] = time.perf_counter()
+
+    def on_response(response) -> None:
+        request = response.request
+        started: Optional[float] = request.extensions.get("metrics_started")
+        if started is None:
+            return
+        target = supabase_target(request.url.path)
+        supabase_seconds.labels(target=target, method=request.method).observe(time.perf_counter() - started)
+        if response.status_code >= 400:
+            supabase_errors.labels(target=target, method=request.method, status=str(response.status_code)).inc()
+
+    hooks["request"] = list(hooks.get("request", [])) + [on_request]
+    hooks["response"] = list(hooks.get("response", [])) + [on_response]
+    client.event_hooks = hooks
+    return True
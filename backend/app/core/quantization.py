@@ -0,0 +1,64 @@
+from typing import Optional, Tuple
+import numpy as np
+
+# float32 keeps embeddings exact; float16 halves them; int8 stores one signed byte per
+# dimension plus a float32 scale per vector (symmetric scalar quantization)
+PRECISIONS: Tuple[str, ...] = ("float32", "float16", "int8")
+INT8_LEVELS: int = 127
+
+
+def check_precision(precision: str) -> str:
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown embedding precision {precision!r}, expected one of {', '.join(PRECISIONS)}")
+    return precision
+
+
+def quantize(vectors: np.ndarray, precision: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Encode float vectors (one per row) at the given precision.
+
+    Returns:
+        (codes, scales) - scales holds one float32 per row for int8, and is None otherwise
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if precision == "float32":
+        return vectors, None
+    if precision == "float16":
+        return vectors.astype(np.float16), None
+    scales = np.abs(vectors).max(axis=-1) / INT8_LEVELS
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    codes = np.clip(np.rint(vectors / scales[..., np.newaxis]), -INT8_LEVELS, INT8_LEVELS).astype(np.int8)
+    return codes, scales
+
+
+def dequantize(codes: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+    """Decode vectors made by quantize() back to float32."""
+    vectors = codes.astype(np.float32)
+    if scales is not None:
+        vectors *= scales[..., np.newaxis]
+    return vectors
+
+
+def encode_embedding(embedding: np.ndarray, precision: str) -> bytes:
+    """
+    Serialize one embedding for a snapshot (SQLite BLOB, file).
+
+    The layout follows from the length alone: dim*4 bytes of float32, dim*2 bytes of
+    float16, or a float32 scale followed by dim int8 codes.
+    """
+    codes, scales = quantize(np.asarray(embedding, dtype=np.float32).reshape(1, -1), precision)
+    if scales is None:
+        return codes.tobytes()
+    return scales.tobytes() + codes.tobytes()
+
+
+def decode_embedding(data: bytes, dim: int) -> np.ndarray:
+    """Read an embedding written by encode_embedding() (or a raw float32 buffer) as float32."""
+    if len(data) == dim * 4:
+        return np.frombuffer(data, dtype=np.float32)
+    if len(data) == dim * 2:
+        return np.frombuffer(data, dtype=np.float16).astype(np.float32)
+    if len(data) == dim + 4:
+        scale = np.frombuffer(data[:4], dtype=np.float32)[0]
+        return np.frombuffer(data[4:], dtype=np.int8).astype(np.float32) * scale
+    raise ValueError(f"Embedding of {len(data)} bytes does not match dimension {dim}")
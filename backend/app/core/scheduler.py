@@ -0,0 +1,175 @@
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+from app.core.config import settings
+from app.core.metrics import task_seconds, task_workers
+from app.core.task_queue import TaskQueue, task_queue
+
+TaskHandler = Callable[[str, Dict[str, Any], int], None]
+FailureHandler = Callable[[str, str], None]
+
+
+class QueueFullError(Exception):
+    """Raised when the scheduler cannot accept more background jobs."""
+
+
+class TaskScheduler:
+    """
+    Bounded job queue served by a fixed number of inference workers.
+
+    All heavy background work (face registration, updates, tagging) is submitted
+    here instead of starting one thread per request, so the number of jobs
+    competing for CPU is capped at `max_workers` no matter how many requests
+    arrive. When `max_queue_size` jobs are already waiting, new submissions are
+    rejected with QueueFullError so the API can tell clients to retry later.
+
+    Jobs are persisted in a TaskQueue, so work that was queued or running when
+    the process stopped is picked up again (from its last checkpoint) once the
+    lease of the previous worker expires. Handlers are registered per job kind
+    and called as `handler(task_id, payload, start_index)`.
+
+    Workers are threads rather than processes: they share the loaded models of
+    the inference engine, and TensorFlow releases the GIL during inference.
+    """
+
+    def __init__(
+        self,
+        store: TaskQueue,
+        max_workers: int,
+        max_queue_size: int,
+        lease_seconds: float = 60.0,
+        poll_interval: float = 1.0
+    ):
+        self.store = store
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._owner = f"worker-{uuid.uuid4()}"
+        self._handlers: Dict[str, TaskHandler] = {}
+        self._failure_handlers: Dict[str, FailureHandler] = {}
+        self._workers: List[threading.Thread] = []
+        self._active = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+
+    @property
+    def queue_depth(self) -> int:
+        return self.store.count_pending()
+
+    @property
+    def active_workers(self) -> int:
+        return self._active
+
+    def register(self, kind: str, handler: TaskHandler, on_failed: Optional[FailureHandler] = None) -> None:
+        """Register the handler for a job kind, and optionally a callback for jobs that exhausted their retries."""
+        self._handlers[kind] = handler
+        if on_failed is not None:
+            self._failure_handlers[kind] = on_failed
+
+    def start(self) -> None:
+        with self._lock:
+            if self._workers:
+                return
+            self._stopping.clear()
+            for i in range(self.max_workers):
+                worker = threading.Thread(target=self._run, name=f"inference-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+            task_workers.labels(state="max").set(self.max_workers)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            workers, self._workers = self._workers, []
+        self._stopping.set()
+        self._wakeup.set()
+        for worker in workers:
+            worker.join(timeout=5)
+        task_workers.labels(state="max").set(0)
+
+    def submit(self, kind: str, payload: Dict[str, Any], total_items: int, task_id: Optional[str] = None) -> str:
+        """
+        Persist a job and wake a worker for it.
+
+        Returns:
+            The task ID
+
+        Raises:
+            QueueFullError: If the job queue is at capacity
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for task kind: {kind}")
+        if self.store.count_pending() >= self.max_queue_size:
+            raise QueueFullError(
+                f"Background task queue is full ({self.max_queue_size} jobs waiting), try again later"
+            )
+        task_id = self.store.enqueue(kind, payload, total_items, task_id=task_id)
+        self.start()
+        self._wakeup.set()
+        return task_id
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                task = self.store.claim(self._owner, self.lease_seconds)
+            except Exception as e:
+                print(f"Failed to claim background task: {e}")
+                task = None
+            if task is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            # Recording the outcome can fail too (store locked, failure callback raising); the worker
+            # must survive it. A job left processing is claimed again once its lease expires.
+            try:
+                self._execute(task)
+            except Exception as e:
+                print(f"Failed to record the outcome of background task {task['task_id']} ({task['kind']}): {e}")
+
+    def _execute(self, task: Dict[str, Any]) -> None:
+        task_id: str = task["task_id"]
+        handler = self._handlers.get(task["kind"])
+
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(task_id, done), daemon=True)
+        heartbeat.start()
+        with self._lock:
+            self._active += 1
+        task_workers.labels(state="active").inc()
+        started = time.perf_counter()
+        outcome = "completed"
+        try:
+            if handler is None:
+                raise ValueError(f"No handler registered for task kind: {task['kind']}")
+            handler(task_id, task["payload"], task["cursor"])
+            self.store.complete(task_id)
+        except Exception as e:
+            print(f"Background task {task_id} ({task['kind']}) attempt {task['attempts']} failed: {e}")
+            status = self.store.retry_or_fail(task_id, str(e))
+            outcome = "retried" if status == "queued" else "failed"
+            if status == "failed":
+                on_failed = self._failure_handlers.get(task["kind"])
+                if on_failed is not None:
+                    on_failed(task_id, str(e))
+        finally:
+            task_seconds.labels(kind=task["kind"], outcome=outcome).observe(time.perf_counter() - started)
+            done.set()
+            with self._lock:
+                self._active -= 1
+            task_workers.labels(state="active").dec()
+
+    def _heartbeat(self, task_id: str, done: threading.Event) -> None:
+        while not done.wait(self.lease_seconds / 3):
+            try:
+                self.store.renew_lease(task_id, self._owner, self.lease_seconds)
+            except Exception:
+                pass
+
+
+task_scheduler = TaskScheduler(
+    store=task_queue,
+    max_workers=settings.INFERENCE_WORKERS,
+    max_queue_size=settings.TASK_QUEUE_SIZE
+)
@@ -1,6 +1,7 @@
 import os
 from supabase.client import create_client, Client
 from app.core.config import settings
+from app.core.metrics import instrument_httpx_client
 import vecs
 from typing import List, Dict, Any
 
@@ -12,3 +13,7 @@ if not url or not anon_key or not service_key:
 
 supabase_anon: Client = create_client(url, anon_key)
 supabase_service: Client = create_client(url, service_key)
+
+# Time every PostgREST call by table or RPC for /metrics
+for _client in (supabase_anon, supabase_service):
+    instrument_httpx_client(getattr(getattr(_client, "postgrest", None), "session", None))
@@ -0,0 +1,72 @@
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+from app.core.task_queue import TaskQueue, task_queue
+
+# How often a stream checks the local task store, the longest silence before a keep-alive
+# comment (so proxies keep the connection open), and results sent per event
+POLL_INTERVAL_SECONDS: float = 0.5
+HEARTBEAT_SECONDS: float = 15.0
+RESULTS_PER_EVENT: int = 500
+FINAL_STATUSES = ("completed", "failed")
+
+
+def format_event(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    """Encode one Server-Sent Event."""
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def task_event_stream(
+    task_id: str,
+    since: int = 0,
+    store: Optional[TaskQueue] = None,
+    poll_interval: float = POLL_INTERVAL_SECONDS
+) -> AsyncIterator[str]:
+    """
+    Server-Sent Events with the progress of one background task, read from the local task store.
+
+    Events:
+        results: {"results": [...]} - items recorded after `since`, each with its seq
+        progress: the task summary (as task-status, without results), whenever it changes
+        end: {"status": ...} - sent once the task completed or failed and all results were sent
+
+    Every event carries the seq of the last result sent as its id, so an EventSource
+    that reconnects resumes from there through the Last-Event-ID header. The store is
+    read locally, so each stream costs one small SQLite query per poll and nothing on
+    background_tasks, whichever process runs the task.
+    """
+    store = store or task_queue
+    last_summary: Optional[Dict[str, Any]] = None
+    last_sent = time.monotonic()
+
+    while True:
+        summary = await asyncio.to_thread(store.get_task_summary, task_id)
+        if summary is None:
+            yield format_event("error", {"detail": "Task not found"})
+            return
+
+        while since < summary["results_seq"]:
+            results = await asyncio.to_thread(store.get_results, task_id, since, RESULTS_PER_EVENT)
+            if not results:
+                break
+            since = results[-1]["seq"]
+            yield format_event("results", {"results": results}, since)
+            last_sent = time.monotonic()
+
+        if summary != last_summary:
+            yield format_event("progress", summary, since)
+            last_summary = summary
+            last_sent = time.monotonic()
+
+        if summary["status"] in FINAL_STATUSES:
+            yield format_event("end", {"status": summary["status"]}, since)
+            return
+
+        if time.monotonic() - last_sent >= HEARTBEAT_SECONDS:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+        await asyncio.sleep(poll_interval)
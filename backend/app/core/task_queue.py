@@ -0,0 +1,323 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from app.core.config import settings
+from app.core.metrics import task_items
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress INTEGER NOT NULL DEFAULT 0,
+    total_items INTEGER NOT NULL DEFAULT 0,
+    completed_items INTEGER NOT NULL DEFAULT 0,
+    failed_items INTEGER NOT NULL DEFAULT 0,
+    cursor INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    lease_owner TEXT,
+    lease_expires_at REAL,
+    next_run_at REAL NOT NULL,
+    error_message TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_claim ON tasks (status, next_run_at);
+CREATE TABLE IF NOT EXISTS task_results (
+    task_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    user_id TEXT,
+    status INTEGER NOT NULL,
+    error TEXT,
+    PRIMARY KEY (task_id, seq)
+);
+"""
+
+
+class TaskQueue:
+    """
+    Durable background job queue backed by a local SQLite file.
+
+    Jobs are claimed with a time-limited lease. A worker that dies (or a uvicorn
+    restart) simply stops renewing its lease, and once it expires the job becomes
+    claimable again and resumes from the last checkpointed item (`cursor`).
+    Failed attempts are retried with exponential backoff up to `max_attempts`.
+    Per-item results are stored as rows, so appending one never rewrites the
+    results written before it.
+    """
+
+    def __init__(self, db_path: str, max_attempts: int = 3, retry_backoff: float = 5.0):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], total_items: int, task_id: Optional[str] = None) -> str:
+        task_id = task_id or str(uuid.uuid4())
+        now = datetime.now().isoformat()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO tasks (task_id, kind, payload, status, total_items, max_attempts, next_run_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?, ?, ?)",
+                (task_id, kind, json.dumps(payload), total_items, self.max_attempts, time.time(), now, now)
+            )
+        return task_id
+
+    def record_finished(self, kind: str, task_id: str, total_items: int = 0) -> None:
+        """Record a job that had nothing to do as completed right away (never claimed by a worker)."""
+        now = datetime.now().isoformat()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO tasks (task_id, kind, payload, status, progress, total_items, max_attempts, "
+                "next_run_at, created_at, updated_at) VALUES (?, ?, '{}', 'completed', 100, ?, ?, ?, ?, ?)",
+                (task_id, kind, total_items, self.max_attempts, time.time(), now, now)
+            )
+
+    def count_pending(self) -> int:
+        with self._connect() as conn:
+            row = conn.execute("SELECT COUNT(*) FROM tasks WHERE status = 'queued'").fetchone()
+        return row[0]
+
+    def claim(self, owner: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """Lease the oldest runnable job (queued and due, or processing with an expired lease)."""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT * FROM tasks "
+                "WHERE (status = 'queued' AND next_run_at <= ?) OR (status = 'processing' AND lease_expires_at < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (now, now)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE tasks SET status = 'processing', lease_owner = ?, lease_expires_at = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE task_id = ?",
+                (owner, now + lease_seconds, datetime.now().isoformat(), row["task_id"])
+            )
+        task = dict(row)
+        task["payload"] = json.loads(task["payload"])
+        task["attempts"] += 1
+        return task
+
+    def renew_lease(self, task_id: str, owner: str, lease_seconds: float) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET lease_expires_at = ? WHERE task_id = ? AND lease_owner = ? AND status = 'processing'",
+                (time.time() + lease_seconds, task_id, owner)
+            )
+        return cursor.rowcount > 0
+
+    def append_results(self, task_id: str, results: List[Dict[str, Any]], cursor: int, progress: int) -> None:
+        """Append a batch of item results and move the checkpoint past them in one transaction."""
+        completed = sum(1 for r in results if r["status"])
+        with self._transaction() as conn:
+            seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM task_results WHERE task_id = ?", (task_id,)
+            ).fetchone()[0]
+            conn.executemany(
+                "INSERT INTO task_results (task_id, seq, user_id, status, error) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (task_id, seq + i + 1, r["user_id"], 1 if r["status"] else 0, r.get("error"))
+                    for i, r in enumerate(results)
+                ]
+            )
+            conn.execute(
+                "UPDATE tasks SET completed_items = completed_items + ?, failed_items = failed_items + ?, "
+                "cursor = ?, progress = ?, updated_at = ? WHERE task_id = ?",
+                (completed, len(results) - completed, cursor, progress, datetime.now().isoformat(), task_id)
+            )
+
+    def complete(self, task_id: str) -> None:
+        self._finish(task_id, "completed", None)
+
+    def retry_or_fail(self, task_id: str, error_message: str) -> str:
+        """
+        Requeue a failed attempt with exponential backoff, or fail the job for good.
+
+        Returns:
+            The new status, "queued" or "failed"
+        """
+        with self._transaction() as conn:
+            row = conn.execute("SELECT attempts, max_attempts FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+            if row is None:
+                return "failed"
+            if row["attempts"] >= row["max_attempts"]:
+                status = "failed"
+                next_run_at = time.time()
+            else:
+                status = "queued"
+                next_run_at = time.time() + self.retry_backoff * (2 ** (row["attempts"] - 1))
+            conn.execute(
+                "UPDATE tasks SET status = ?, error_message = ?, next_run_at = ?, lease_owner = NULL, "
+                "lease_expires_at = NULL, updated_at = ? WHERE task_id = ?",
+                (status, error_message, next_run_at, datetime.now().isoformat(), task_id)
+            )
+        return status
+
+    def fail(self, task_id: str, error_message: str) -> None:
+        self._finish(task_id, "failed", error_message)
+
+    def _finish(self, task_id: str, status: str, error_message: Optional[str]) -> None:
+        # A job that already reached a final state keeps it
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = ?, error_message = COALESCE(?, error_message), lease_owner = NULL, "
+                "lease_expires_at = NULL, updated_at = ? WHERE task_id = ? AND status IN ('queued', 'processing')",
+                (status, error_message, datetime.now().isoformat(), task_id)
+            )
+
+    def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Return the task summary in the background_tasks row format, including its results."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT task_id, status, progress, total_items, completed_items, failed_items, error_message, "
+                "created_at, updated_at FROM tasks WHERE task_id = ?",
+                (task_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            results = conn.execute(
+                "SELECT user_id, status, error FROM task_results WHERE task_id = ? ORDER BY seq", (task_id,)
+            ).fetchall()
+        task = dict(row)
+        task["results"] = [
+            {"user_id": r["user_id"], "status": bool(r["status"]), "error": r["error"]} for r in results
+        ]
+        return task
+
+    def get_task_summary(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Return the task summary without its results, plus `results_seq`, the seq of its latest result."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT task_id, status, progress, total_items, completed_items, failed_items, error_message, "
+                "created_at, updated_at, "
+                "(SELECT COALESCE(MAX(seq), 0) FROM task_results WHERE task_results.task_id = tasks.task_id) AS results_seq "
+                "FROM tasks WHERE task_id = ?",
+                (task_id,)
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def get_results(self, task_id: str, after_seq: int = 0, limit: int = 500) -> List[Dict[str, Any]]:
+        """Return up to `limit` results recorded after `after_seq`, oldest first, each with its `seq`."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT seq, user_id, status, error FROM task_results WHERE task_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (task_id, after_seq, limit)
+            ).fetchall()
+        return [
+            {"seq": r["seq"], "user_id": r["user_id"], "status": bool(r["status"]), "error": r["error"]} for r in rows
+        ]
+
+
+class TaskProgress:
+    """
+    Buffers per-item results of one running task and writes them out in batches.
+
+    Results are flushed every `flush_every` items or `flush_interval` seconds,
+    whichever comes first. A flush is one TaskQueue transaction (results and
+    checkpoint together, so a resumed task never repeats or skips an item)
+    followed by one `on_flush(summary)` call, which the caller uses to mirror
+    the counters elsewhere. Only the counters are kept in memory and passed on:
+    results live in task_results alone, so no flush re-sends the ones before it.
+    """
+
+    def __init__(
+        self,
+        task_id: str,
+        total_items: int,
+        start_index: int = 0,
+        store: Optional[TaskQueue] = None,
+        on_flush: Optional[Callable[[Dict[str, Any]], None]] = None,
+        flush_every: int = 25,
+        flush_interval: float = 2.0
+    ):
+        self.task_id = task_id
+        self.total_items = total_items
+        self.store = store or task_queue
+        self.on_flush = on_flush
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.cursor = start_index
+        self._pending: List[Dict[str, Any]] = []
+        self._last_flush = time.time()
+        self._lock = threading.Lock()
+
+        existing = self.store.get_task_summary(task_id) if start_index > 0 else None
+        self.completed_items: int = existing["completed_items"] if existing else 0
+        self.failed_items: int = existing["failed_items"] if existing else 0
+
+    @property
+    def progress(self) -> int:
+        return int((self.cursor / self.total_items) * 100) if self.total_items else 100
+
+    def record(self, user_id: str, status: bool, error: Optional[str] = None) -> None:
+        """Record the outcome of the next item."""
+        with self._lock:
+            self._pending.append({"user_id": user_id, "status": status, "error": error})
+            task_items.labels(status="completed" if status else "failed").inc()
+            self.cursor += 1
+            if status:
+                self.completed_items += 1
+            else:
+                self.failed_items += 1
+            due = (
+                len(self._pending) >= self.flush_every
+                or time.time() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._last_flush = time.time()
+            if not pending:
+                return
+            self.store.append_results(self.task_id, pending, self.cursor, self.progress)
+            summary = {
+                "progress": self.progress,
+                "completed_items": self.completed_items,
+                "failed_items": self.failed_items
+            }
+        if self.on_flush is not None:
+            try:
+                self.on_flush(summary)
+            except Exception:
+                pass
+
+
+task_queue = TaskQueue(settings.TASK_DB_PATH)
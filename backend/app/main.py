@@ -1,9 +1,39 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import threading
+import time
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.core.deepface import inference_engine
+from app.core.scheduler import task_scheduler
+from app.core.admission import search_limiter, enrollment_limiter
+from app.core.face_index import face_index
+from app.core.embedding_cache import embedding_cache
+from app.core.http_client import http_client
+from app.core import metrics
 from app.api.api import api_router
 
+def _warm_up_inference_engine():
+    try:
+        inference_engine.load()
+    except Exception as e:
+        print(f"Inference engine failed to load: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load models off the event loop so /health can report readiness while warming up
+    threading.Thread(target=_warm_up_inference_engine, daemon=True).start()
+    if settings.FACE_INDEX_ENABLED:
+        threading.Thread(
+            target=face_index.run_refresh_loop, args=(settings.FACE_INDEX_REFRESH_SECONDS,), daemon=True
+        ).start()
+    task_scheduler.start()
+    yield
+    task_scheduler.shutdown()
+    http_client.close()
+
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.APP_NAME,
     version="1.0.0",
     description="FastAPI backend with Supabase integration",
@@ -24,13 +54,56 @@ app.add_middleware(
 # Include API router
 app.include_router(api_router)
 
+# Scrape-time readings of state shared by every worker process
+metrics.register_reading("task_queue_depth", "Background jobs waiting to run", lambda: task_scheduler.queue_depth)
+metrics.register_reading("face_index_faces", "Registered faces in the local index", lambda: face_index.size)
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Labelled by route template, so path parameters (task IDs) do not create new series
+    route = request.scope.get("route")
+    metrics.request_seconds.labels(
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=str(response.status_code)
+    ).observe(time.perf_counter() - started)
+    return response
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return Response(content=metrics.render(), headers={"Content-Type": metrics.CONTENT_TYPE})
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to FastAPI Supabase Backend"}
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "message": "Service is running"}
+    return {
+        "status": "healthy",
+        "message": "Service is running",
+        "inference": {
+            "ready": inference_engine.ready,
+            "error": inference_engine.error
+        },
+        "face_index": {
+            "ready": face_index.ready,
+            "size": face_index.size,
+            "precision": face_index.precision,
+            "memory_bytes": face_index.memory_bytes
+        },
+        "embedding_cache": embedding_cache.stats(),
+        "admission": {
+            "search": search_limiter.stats(),
+            "enrollment": enrollment_limiter.stats(),
+            "background": {
+                "max_workers": task_scheduler.max_workers,
+                "active": task_scheduler.active_workers
+            }
+        }
+    }
 
 if __name__ == "__main__":
     import uvicorn
@@ -12,9 +12,23 @@ class UploadResponse(BaseModel):
     filename: str
     mime_type: str
     message: str
+    thumbnail_url: Optional[str] = None
+    detection_url: Optional[str] = None
 
 
 class ErrorResponse(BaseModel):
     success: bool = False
     error: str
-    message: str 
\ No newline at end of file
+    message: str 
+
+class DriveFolderIngestRequest(BaseModel):
+    folder_url: str
+    event_id: Optional[int] = None
+    tag_faces: bool = False
+
+
+class DriveFolderIngestResponse(BaseModel):
+    task_id: str
+    message: str
+    total_files: int
+    tagging_task_id: Optional[str] = None
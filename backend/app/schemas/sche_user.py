@@ -65,16 +65,29 @@ class BatchFaceUpdateResponse(BaseModel):
 
 class BackgroundTaskStatus(BaseModel):
     task_id: str
-    status: str  # "processing", "completed", "failed"
+    status: str  # "queued", "processing", "completed", "failed"
     progress: int  # percentage (0-100)
     total_items: int
     completed_items: int
     failed_items: int
-    results: Optional[List[dict]] = None
+    results: Optional[List[dict]] = None  # only with include_results, see TaskResultsPage
+    results_seq: Optional[int] = None  # seq of the latest result, the cursor to fetch up to
     error_message: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
+class TaskResult(BaseModel):
+    seq: int
+    user_id: Optional[str] = None
+    status: bool
+    error: Optional[str] = None
+
+class TaskResultsPage(BaseModel):
+    task_id: str
+    results: List[TaskResult]
+    next_cursor: int  # pass as `since` to get the results recorded after this page
+    has_more: bool
+
 class UserFaceSearchRequest(BaseModel):
     image_url: str
 
@@ -94,6 +107,15 @@ class FaceTaggingResponse(BaseModel):
     message: str
     image_id: int
 
+class BulkFaceTaggingRequest(BaseModel):
+    event_id: Optional[int] = None
+    image_ids: Optional[List[int]] = None
+
+class BulkFaceTaggingResponse(BaseModel):
+    task_id: str
+    message: str
+    total_images: int
+
 class FaceTaggingResult(BaseModel):
     image_id: int
     detected_faces: int
@@ -0,0 +1,166 @@
+from app.core.config import settings
+from app.core.http_client import http_client
+from app.core.scheduler import task_scheduler
+from app.core.supabase import supabase_service
+from app.schemas.sche_images import DriveFolderIngestRequest
+from app.schemas.sche_user import BulkFaceTaggingRequest
+from app.services.srv_users import UserService, BULK_QUERY_SIZE, _chunks
+from app.utils.drive_utils import ingest_drive_file
+from typing import Dict, Any, List, Optional, Tuple
+import uuid
+
+
+class EventImageService:
+    def __init__(self):
+        self.user_service = UserService()
+
+    def drive_folder_ingest_background(
+        self, request: DriveFolderIngestRequest, files: List[Dict[str, str]], bucket_name: str = "images"
+    ) -> Tuple[str, Optional[str]]:
+        """
+        Start copying the listed Drive folder files into Storage as one background task.
+
+        Returns:
+            (task_id, tagging_task_id) - the tagging task ID is reserved up front and exists
+            once ingestion finished, if tagging was requested (completed with no items when
+            no image was new)
+        """
+        if not files:
+            raise ValueError("The folder has no files")
+        tagging_task_id = str(uuid.uuid4()) if request.tag_faces else None
+        task_id = self.user_service._start_background_task(
+            "drive_folder_ingest",
+            len(files),
+            {
+                "files": files,
+                "bucket_name": bucket_name,
+                "event_id": request.event_id,
+                "tagging_task_id": tagging_task_id
+            }
+        )
+        return task_id, tagging_task_id
+
+    def _process_drive_folder_ingest(self, task_id: str, payload: Dict[str, Any], start_index: int = 0):
+        """
+        Copy Drive files into Storage, DRIVE_INGEST_CONCURRENCY at a time, deduplicated by content hash.
+
+        With an event_id, new images are added to event_images after every window; with a tagging
+        task ID they are then face-tagged in one bulk tagging task.
+        """
+        files: List[Dict[str, str]] = payload["files"]
+        event_id: Optional[int] = payload.get("event_id")
+        progress = self.user_service._task_progress(task_id, len(files), start_index)
+        image_ids: List[int] = []
+
+        for window in _chunks(files[start_index:], settings.DRIVE_INGEST_CONCURRENCY):
+            transfers = [
+                http_client.run(lambda client, file_id=file["id"]: ingest_drive_file(client, file_id, payload["bucket_name"]))
+                for file in window
+            ]
+            outcomes: List[Tuple[Dict[str, str], Any]] = []
+            new_images: List[Tuple[str, Optional[Dict[str, Any]]]] = []
+            for file, transfer in zip(window, transfers):
+                try:
+                    outcome = transfer.result()
+                except Exception as e:
+                    outcome = e
+                else:
+                    public_url, mime_type, _, derivatives = outcome
+                    if mime_type.startswith("image/"):
+                        new_images.append((public_url, derivatives))
+                outcomes.append((file, outcome))
+
+            # Rows are added before the window is recorded, so a resumed task never skips them
+            if event_id is not None:
+                image_ids.extend(self._add_event_images(event_id, new_images))
+            for file, outcome in outcomes:
+                if isinstance(outcome, Exception):
+                    progress.record(file["name"], False, str(outcome))
+                else:
+                    public_url, _, created, _ = outcome
+                    progress.record(file["name"], True, f"{'Uploaded' if created else 'Already stored'}: {public_url}")
+        progress.flush()
+
+        if payload.get("tagging_task_id"):
+            self._start_tagging(payload["tagging_task_id"], event_id, image_ids, resumed=start_index > 0)
+        self.user_service._update_task_status(task_id, "completed")
+
+    def _start_tagging(self, tagging_task_id: str, event_id: Optional[int], image_ids: List[int], resumed: bool):
+        """Start the reserved bulk tagging task, or complete it with no items when there is nothing new to tag"""
+        # A resumed ingest no longer knows the images added before it stopped, so it tags the whole event
+        # (images tagged before are served from the embedding cache)
+        if resumed and event_id is not None:
+            request = BulkFaceTaggingRequest(event_id=event_id)
+        elif image_ids:
+            request = BulkFaceTaggingRequest(image_ids=image_ids)
+        else:
+            request = None
+        if request is not None:
+            try:
+                self.user_service.bulk_face_tagging_background(request, task_id=tagging_task_id)
+                return
+            except ValueError:
+                pass
+        self.user_service._complete_empty_task("bulk_face_tagging", tagging_task_id)
+
+    def _add_event_images(self, event_id: int, images: List[Tuple[str, Optional[Dict[str, Any]]]]) -> List[int]:
+        """
+        Insert event_images rows for the (URL, derivatives) pairs the event does not have yet, returning the new row IDs.
+
+        Derivatives are recorded as metadata["derivatives"], where face tagging and the gallery pick them up.
+        Photos that were already stored come without derivatives, and reuse the ones recorded for their URL.
+        """
+        derivatives_by_url = dict(images)
+        image_urls = list(derivatives_by_url)
+        existing = set()
+        for chunk in _chunks(image_urls, BULK_QUERY_SIZE):
+            response = supabase_service.table('event_images').select('raw_image_url').eq(
+                'event_id', event_id
+            ).in_('raw_image_url', chunk).execute()
+            existing.update(row['raw_image_url'] for row in response.data or [])
+
+        missing = [url for url in image_urls if url not in existing and not derivatives_by_url[url]]
+        derivatives_by_url.update(self._recorded_derivatives(missing))
+
+        new_rows = [
+            {
+                "event_id": event_id,
+                "raw_image_url": url,
+                "metadata": {"derivatives": derivatives_by_url[url]} if derivatives_by_url[url] else None
+            }
+            for url in image_urls if url not in existing
+        ]
+        image_ids: List[int] = []
+        for chunk in _chunks(new_rows, BULK_QUERY_SIZE):
+            response = supabase_service.table('event_images').insert(chunk).execute()
+            image_ids.extend(row['id'] for row in response.data or [])
+        return image_ids
+
+
+    def _recorded_derivatives(self, image_urls: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Derivatives already recorded in event_images (of any event) for the given raw image URLs"""
+        recorded: Dict[str, Dict[str, Any]] = {}
+        for chunk in _chunks(image_urls, BULK_QUERY_SIZE):
+            response = supabase_service.table('event_images').select('raw_image_url, metadata').in_(
+                'raw_image_url', chunk
+            ).execute()
+            for row in response.data or []:
+                derivatives = (row.get('metadata') or {}).get('derivatives')
+                if derivatives:
+                    recorded[row['raw_image_url']] = derivatives
+        return recorded
+
+
+def _register_task_handlers():
+    service = EventImageService()
+
+    def on_failed(task_id: str, error_message: str):
+        service.user_service._update_task_status(task_id, "failed", error_message)
+
+    task_scheduler.register(
+        "drive_folder_ingest",
+        lambda task_id, payload, start_index: service._process_drive_folder_ingest(task_id, payload, start_index),
+        on_failed
+    )
+
+_register_task_handlers()
@@ -1,22 +1,46 @@
-from app.core.deepface import process_faces_image
+from app.core.deepface import (
+    process_faces_image, process_faces_images, fetch_image_bytes, detect_image_faces, embed_detections
+)
 from app.core.supabase import supabase_anon, supabase_service
+from app.core.scheduler import task_scheduler, QueueFullError
+from app.core.task_queue import task_queue, TaskProgress
+from app.core.face_index import face_index, parse_embedding
+from app.core.face_store import event_face_store
+from app.core.coalescer import CoalescingWorker
+from app.core.config import settings
+from app.core.metrics import observe_stage
 from app.schemas.sche_user import *
 import json
 import uuid
 import requests
 import numpy as np
 import cv2
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable, Iterator, Sequence, Tuple
+from concurrent.futures import ThreadPoolExecutor, Future
 from datetime import datetime
 import asyncio
-import threading
 import time
 
+# Items per embedding batch / bulk write, and ids per in_() filter (bounded by URL length)
+BULK_CHUNK_SIZE = 50
+BULK_QUERY_SIZE = 200
+BULK_PAGE_SIZE = 1000
+MATCH_THRESHOLD = 0.6
+
+# Bulk face tagging: images per embed/match/write chunk, and concurrency of the download and detect stages
+TAGGING_CHUNK_SIZE = 16
+TAGGING_FETCH_WORKERS = 8
+TAGGING_DETECT_WORKERS = 2
+
+def _chunks(items: List[Any], size: int) -> Iterator[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
 class UserService:
     def __init__(self):
         pass
 
-    def face_register(self, request: UserFaceRegisterRequest) -> UserFaceRegisterResponse:
+    def face_register(self, request: UserFaceRegisterRequest, image_bytes: Optional[bytes] = None) -> UserFaceRegisterResponse:
         try:
             user = supabase_anon.table('users').select('id').eq('id', request.user_id).execute()
             if not user.data:
@@ -25,12 +49,18 @@ class UserService:
             user_in_user_faces = supabase_service.table('user_faces').select('id').eq('user_id', user_id).execute()
             if user_in_user_faces.data:
                 raise ValueError("User already has a face")
-            face_data = process_faces_image(request.avatar_image_url, include_embedding=True, single_face_only=True)
-            response = supabase_service.table('user_faces').insert({
-                'user_id': user_id,
-                'face_embedding': face_data["embedding"] if isinstance(face_data, dict) and "embedding" in face_data else []
-            }).execute()
+            face_data = process_faces_image(
+                request.avatar_image_url, include_embedding=True, single_face_only=True, image_bytes=image_bytes
+            )
+            embedding = face_data["embedding"] if isinstance(face_data, dict) and "embedding" in face_data else np.empty(0, np.float32)
+            with observe_stage("db_write"):
+                response = supabase_service.table('user_faces').insert({
+                    'user_id': user_id,
+                    'face_embedding': embedding.tolist()
+                }).execute()
             if response.data:
+                face_index.upsert(user_id, embedding)
+                self._queue_retagging([user_id])
                 return UserFaceRegisterResponse(status=True)
             else:
                 raise ValueError("Failed to save face to database")
@@ -39,7 +69,7 @@ class UserService:
         except Exception as e:
             raise ValueError(f"Error saving face: {str(e)}")
    
-    def face_update(self, request: UserFaceUpdateRequest ) -> UserFaceUpdateResponse:
+    def face_update(self, request: UserFaceUpdateRequest, image_bytes: Optional[bytes] = None) -> UserFaceUpdateResponse:
         try:
             user = supabase_anon.table('users').select('id').eq('id', request.user_id).execute()
             if not user.data:
@@ -48,11 +78,17 @@ class UserService:
             user_in_user_faces = supabase_service.table('user_faces').select('id').eq('user_id', user_id).execute()
             if not user_in_user_faces.data:
                 raise ValueError("User does not have a face")
-            face_data = process_faces_image(request.avatar_image_url, include_embedding=True, single_face_only=True)
-            response = supabase_service.table('user_faces').update({
-                'face_embedding': face_data["embedding"] if isinstance(face_data, dict) and "embedding" in face_data else []
-            }).eq('id', user_in_user_faces.data[0]['id']).execute()
+            face_data = process_faces_image(
+                request.avatar_image_url, include_embedding=True, single_face_only=True, image_bytes=image_bytes
+            )
+            embedding = face_data["embedding"] if isinstance(face_data, dict) and "embedding" in face_data else np.empty(0, np.float32)
+            with observe_stage("db_write"):
+                response = supabase_service.table('user_faces').update({
+                    'face_embedding': embedding.tolist()
+                }).eq('id', user_in_user_faces.data[0]['id']).execute()
             if response.data:
+                face_index.upsert(user_id, embedding)
+                self._queue_retagging([user_id])
                 return UserFaceUpdateResponse(status=True)
             else:
                 raise ValueError("Failed to update face in database")
@@ -61,40 +97,36 @@ class UserService:
     
     def face_delete(self, request: UserFaceDeleteRequest) -> UserFaceDeleteResponse:
         try:
+            errors = self._bulk_delete_faces(request.user_ids)
+            self._queue_retagging([user_id for user_id in request.user_ids if user_id not in errors])
             status_list = []
             for user_id in request.user_ids:
-                user_in_user_faces = supabase_service.table('user_faces').select('id').eq('user_id', user_id).execute()
-                if not user_in_user_faces.data:
+                if user_id in errors:
                     status_list.append({
                         "user_id": user_id,
                         "status": False,
-                        "error": "User does not have a face"
-                    })
-                    continue
-                response = supabase_service.table('user_faces').delete().eq('id', user_in_user_faces.data[0]['id']).execute()
-                if response.data:
-                    status_list.append({
-                        "user_id": user_id,
-                        "status": True
+                        "error": errors[user_id]
                     })
                 else:
                     status_list.append({
                         "user_id": user_id,
-                        "status": False,
-                        "error": "Failed to delete face"
+                        "status": True
                     })
             return UserFaceDeleteResponse(status=status_list)
         except Exception as e:
             raise ValueError(f"Error deleting face: {str(e)}")
 
-    def batch_face_register_background(self, request: BatchFaceRegisterRequest) -> str:
-        task_id = str(uuid.uuid4())
+    def _start_background_task(
+        self, kind: str, total_items: int, payload: Dict[str, Any], task_id: Optional[str] = None
+    ) -> str:
+        """Create the background_tasks row and queue a persistent job of the given kind on the task scheduler"""
+        task_id = task_id or str(uuid.uuid4())
         
         task_data = {
             "task_id": task_id,
             "status": "processing",
             "progress": 0,
-            "total_items": len(request.users),
+            "total_items": total_items,
             "completed_items": 0,
             "failed_items": 0,
             "results": [],
@@ -108,222 +140,306 @@ class UserService:
         except Exception:
             pass
         
-        thread = threading.Thread(
-            target=self._process_batch_face_register,
-            args=(task_id, request.users)
-        )
-        thread.daemon = True
-        thread.start()
-        
-        return task_id
-
-    def _process_batch_face_register(self, task_id: str, users: List[UserFaceRegisterRequest]):
         try:
-            for i, user_request in enumerate(users):
-                try:
-                    user = supabase_anon.table('users').select('id').eq('id', user_request.user_id).execute()
-                    if not user.data:
-                        self._update_task_result(task_id, user_request.user_id, False, "User not found")
-                        self._update_task_progress(task_id, i + 1, len(users))
-                        continue
-                    
-                    user_id = user.data[0]['id']
-                    
-                    user_in_user_faces = supabase_service.table('user_faces').select('id').eq('user_id', user_id).execute()
-                    if user_in_user_faces.data:
-                        self._update_task_result(task_id, user_request.user_id, False, "User already has a face")
-                        self._update_task_progress(task_id, i + 1, len(users))
-                        continue
-                    
-                    face_data = process_faces_image(user_request.avatar_image_url, include_embedding=True, single_face_only=True)
-                    
-                    response = supabase_service.table('user_faces').insert({
-                        'user_id': user_id,
-                        'face_embedding': face_data["embedding"] if isinstance(face_data, dict) and "embedding" in face_data else []
-                    }).execute()
-                    
-                    if response.data:
-                        self._update_task_result(task_id, user_request.user_id, True)
-                        self._update_task_progress(task_id, i + 1, len(users))
-                    else:
-                        self._update_task_result(task_id, user_request.user_id, False, "Failed to save face to database")
-                        self._update_task_progress(task_id, i + 1, len(users))
-                        
-                except Exception as e:
-                    self._update_task_result(task_id, user_request.user_id, False, str(e))
-                    self._update_task_progress(task_id, i + 1, len(users))
-            
-            self._update_task_status(task_id, "completed")
-            
-        except Exception as e:
+            task_scheduler.submit(kind, payload, total_items, task_id=task_id)
+        except QueueFullError as e:
             self._update_task_status(task_id, "failed", str(e))
-
-    def batch_face_delete_background(self, request: BatchFaceDeleteRequest) -> str:
-        task_id = str(uuid.uuid4())
-        
-        task_data = {
-            "task_id": task_id,
-            "status": "processing",
-            "progress": 0,
-            "total_items": len(request.user_ids),
-            "completed_items": 0,
-            "failed_items": 0,
-            "results": [],
-            "error_message": None,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat()
-        }
+            raise
         
+        return task_id
+
+    def _complete_empty_task(self, kind: str, task_id: str):
+        """Create a background task that had nothing to do as already completed, so its reserved ID can be polled"""
+        now = datetime.now().isoformat()
         try:
-            supabase_service.table('background_tasks').insert(task_data).execute()
+            supabase_service.table('background_tasks').insert({
+                "task_id": task_id,
+                "status": "completed",
+                "progress": 100,
+                "total_items": 0,
+                "completed_items": 0,
+                "failed_items": 0,
+                "results": [],
+                "error_message": None,
+                "created_at": now,
+                "updated_at": now
+            }).execute()
         except Exception:
             pass
-        
-        thread = threading.Thread(
-            target=self._process_batch_face_delete,
-            args=(task_id, request.user_ids)
+        task_queue.record_finished(kind, task_id)
+
+    def batch_face_register_background(self, request: BatchFaceRegisterRequest) -> str:
+        return self._start_background_task(
+            "batch_face_register", len(request.users), {"users": [user.model_dump() for user in request.users]}
         )
-        thread.daemon = True
-        thread.start()
-        
-        return task_id
+
+    def _process_batch_face_register(self, task_id: str, users: List[UserFaceRegisterRequest], start_index: int = 0):
+        self._register_faces_in_bulk(
+            task_id,
+            [(user.user_id, user.user_id, user.avatar_image_url) for user in users],
+            start_index,
+            check_users_exist=True,
+            duplicate_error="User already has a face"
+        )
+
+    def batch_face_delete_background(self, request: BatchFaceDeleteRequest) -> str:
+        return self._start_background_task("batch_face_delete", len(request.user_ids), {"user_ids": request.user_ids})
 
     def batch_face_update_background(self, request: BatchFaceUpdateRequest) -> str:
-        task_id = str(uuid.uuid4())
-        
-        task_data = {
-            "task_id": task_id,
-            "status": "processing",
-            "progress": 0,
-            "total_items": len(request.users),
-            "completed_items": 0,
-            "failed_items": 0,
-            "results": [],
-            "error_message": None,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat()
-        }
-        
-        try:
-            supabase_service.table('background_tasks').insert(task_data).execute()
-        except Exception:
-            pass
-        
-        thread = threading.Thread(
-            target=self._process_batch_face_update,
-            args=(task_id, request.users)
+        return self._start_background_task(
+            "batch_face_update", len(request.users), {"users": [user.model_dump() for user in request.users]}
         )
-        thread.daemon = True
-        thread.start()
+
+    def _process_batch_face_delete(self, task_id: str, user_ids: List[str], start_index: int = 0):
+        progress = self._task_progress(task_id, len(user_ids), start_index)
+        deleted: List[str] = []
+        for chunk in _chunks(user_ids[start_index:], BULK_CHUNK_SIZE):
+            errors = self._bulk_delete_faces(chunk)
+            for user_id in chunk:
+                progress.record(user_id, user_id not in errors, errors.get(user_id))
+            deleted.extend(user_id for user_id in chunk if user_id not in errors)
         
-        return task_id
+        progress.flush()
+        self._queue_retagging(deleted)
+        self._update_task_status(task_id, "completed")
 
-    def _process_batch_face_delete(self, task_id: str, user_ids: List[str]):
-        try:
-            for i, user_id in enumerate(user_ids):
-                try:
-                    user_in_user_faces = supabase_service.table('user_faces').select('id').eq('user_id', user_id).execute()
-                    if not user_in_user_faces.data:
-                        self._update_task_result(task_id, user_id, False, "User does not have a face")
-                        self._update_task_progress(task_id, i + 1, len(user_ids))
-                        continue
-                    
-                    response = supabase_service.table('user_faces').delete().eq('id', user_in_user_faces.data[0]['id']).execute()
-                    
-                    if response.data:
-                        self._update_task_result(task_id, user_id, True)
-                        self._update_task_progress(task_id, i + 1, len(user_ids))
-                    else:
-                        self._update_task_result(task_id, user_id, False, "Failed to delete face")
-                        self._update_task_progress(task_id, i + 1, len(user_ids))
-                        
-                except Exception as e:
-                    self._update_task_result(task_id, user_id, False, str(e))
-                    self._update_task_progress(task_id, i + 1, len(user_ids))
+    def _process_batch_face_update(self, task_id: str, users: List[UserFaceUpdateRequest], start_index: int = 0):
+        progress = self._task_progress(task_id, len(users), start_index)
+        pending = users[start_index:]
+        user_ids = [user.user_id for user in pending]
+        existing_users = self._fetch_existing_user_ids(user_ids)
+        face_ids = self._fetch_face_ids(user_ids)
+        changed: List[str] = []
+        
+        for chunk in _chunks(pending, BULK_CHUNK_SIZE):
+            errors: Dict[int, str] = {}
+            to_embed: List[int] = []
+            for idx, user_request in enumerate(chunk):
+                if user_request.user_id not in existing_users:
+                    errors[idx] = "User not found"
+                else:
+                    to_embed.append(idx)
             
-            self._update_task_status(task_id, "completed")
+            embeddings = self._compute_embeddings([chunk[idx].avatar_image_url for idx in to_embed])
+            update_rows: Dict[Any, Dict[str, Any]] = {}
+            update_indexes: List[int] = []
+            insert_rows: Dict[str, Dict[str, Any]] = {}
+            insert_indexes: List[int] = []
+            for idx, embedding in zip(to_embed, embeddings):
+                if isinstance(embedding, Exception):
+                    errors[idx] = str(embedding)
+                    continue
+                user_id = chunk[idx].user_id
+                if user_id in face_ids:
+                    # Update existing face record, the last occurrence of a user in the chunk wins
+                    # (an upsert may not touch the same row twice)
+                    update_rows[face_ids[user_id]] = {'id': face_ids[user_id], 'user_id': user_id, 'face_embedding': embedding.tolist()}
+                    update_indexes.append(idx)
+                else:
+                    # Insert new face record, the last occurrence of a user in the chunk wins
+                    insert_rows[user_id] = {'user_id': user_id, 'face_embedding': embedding.tolist()}
+                    insert_indexes.append(idx)
             
-        except Exception as e:
-            self._update_task_status(task_id, "failed", str(e))
+            if update_rows:
+                write_errors = self._write_faces(
+                    lambda: supabase_service.table('user_faces').upsert(list(update_rows.values()), on_conflict='id').execute(),
+                    update_indexes, "Failed to update face in database"
+                )
+                errors.update(write_errors)
+                if not write_errors:
+                    self._index_faces(list(update_rows.values()))
+                    changed.extend(row['user_id'] for row in update_rows.values())
+            if insert_rows:
+                inserted: List[Dict[str, Any]] = []
+                write_errors = self._write_faces(
+                    lambda: supabase_service.table('user_faces').insert(list(insert_rows.values())).execute(),
+                    insert_indexes, "Failed to update face in database", inserted
+                )
+                errors.update(write_errors)
+                if not write_errors:
+                    self._index_faces(list(insert_rows.values()))
+                    changed.extend(insert_rows)
+                # Later occurrences of the same user update the row that was just created
+                face_ids.update({row['user_id']: row['id'] for row in inserted})
+            
+            for idx, user_request in enumerate(chunk):
+                progress.record(user_request.user_id, idx not in errors, errors.get(idx))
+        
+        progress.flush()
+        self._queue_retagging(changed)
+        self._update_task_status(task_id, "completed")
 
-    def _process_batch_face_update(self, task_id: str, users: List[UserFaceUpdateRequest]):
-        try:
-            for i, user_request in enumerate(users):
-                try:
-                    user = supabase_anon.table('users').select('id').eq('id', user_request.user_id).execute()
-                    if not user.data:
-                        self._update_task_result(task_id, user_request.user_id, False, "User not found")
-                        self._update_task_progress(task_id, i + 1, len(users))
-                        continue
-                    
-                    user_id = user.data[0]['id']
-                    
-                    user_in_user_faces = supabase_service.table('user_faces').select('id').eq('user_id', user_id).execute()
-                    face_data = process_faces_image(user_request.avatar_image_url, include_embedding=True, single_face_only=True)
-                    print(f"FACE DATA: {face_data}")
-                    
-                    if user_in_user_faces.data:
-                        # Update existing face record
-                        response = supabase_service.table('user_faces').update({
-                            'face_embedding': face_data["embedding"] if isinstance(face_data, dict) and "embedding" in face_data else []
-                        }).eq('id', user_in_user_faces.data[0]['id']).execute()
-                    else:
-                        # Insert new face record
-                        response = supabase_service.table('user_faces').insert({
-                            'user_id': user_id,
-                            'face_embedding': face_data["embedding"] if isinstance(face_data, dict) and "embedding" in face_data else []
-                        }).execute()
-                    
-                    if response.data:
-                        self._update_task_result(task_id, user_request.user_id, True)
-                        self._update_task_progress(task_id, i + 1, len(users))
-                    else:
-                        self._update_task_result(task_id, user_request.user_id, False, "Failed to update face in database")
-                        self._update_task_progress(task_id, i + 1, len(users))
-                        
-                except Exception as e:
-                    self._update_task_result(task_id, user_request.user_id, False, str(e))
-                    self._update_task_progress(task_id, i + 1, len(users))
+    def _register_faces_in_bulk(
+        self,
+        task_id: str,
+        items: List[tuple],
+        start_index: int,
+        check_users_exist: bool,
+        duplicate_error: str
+    ):
+        """
+        Register faces for (result_id, user_id, avatar_image_url) items with set-based queries:
+        existing users and faces are fetched up front, embeddings are computed and inserted per chunk
+        """
+        progress = self._task_progress(task_id, len(items), start_index)
+        pending = items[start_index:]
+        user_ids = [user_id for _, user_id, _ in pending]
+        existing_users = self._fetch_existing_user_ids(user_ids) if check_users_exist else set(user_ids)
+        users_with_faces = set(self._fetch_face_ids(user_ids))
+        registered: List[str] = []
+        
+        for chunk in _chunks(pending, BULK_CHUNK_SIZE):
+            errors: Dict[int, str] = {}
+            to_embed: List[int] = []
+            # A user repeated within the chunk waits for the outcome of its first occurrence
+            first_in_chunk: Dict[str, int] = {}
+            repeats: Dict[int, int] = {}
+            for idx, (_, user_id, _) in enumerate(chunk):
+                if user_id not in existing_users:
+                    errors[idx] = "User not found"
+                elif user_id in users_with_faces:
+                    errors[idx] = duplicate_error
+                elif user_id in first_in_chunk:
+                    repeats[idx] = first_in_chunk[user_id]
+                else:
+                    to_embed.append(idx)
+                    first_in_chunk[user_id] = idx
             
-            self._update_task_status(task_id, "completed")
+            embeddings = self._compute_embeddings([chunk[idx][2] for idx in to_embed])
+            rows: List[Dict[str, Any]] = []
+            row_indexes: List[int] = []
+            for idx, embedding in zip(to_embed, embeddings):
+                if isinstance(embedding, Exception):
+                    errors[idx] = str(embedding)
+                    continue
+                rows.append({'user_id': chunk[idx][1], 'face_embedding': embedding.tolist()})
+                row_indexes.append(idx)
+            
+            if rows:
+                write_errors = self._write_faces(
+                    lambda: supabase_service.table('user_faces').insert(rows).execute(),
+                    row_indexes, "Failed to save face to database"
+                )
+                errors.update(write_errors)
+                if not write_errors:
+                    self._index_faces(rows)
+                    registered.extend(row['user_id'] for row in rows)
+                    # Only faces that were written count as existing, a failed item can be retried later in the batch
+                    users_with_faces.update(row['user_id'] for row in rows)
+            for idx, first_idx in repeats.items():
+                errors[idx] = errors.get(first_idx, duplicate_error)
             
+            for idx, (result_id, _, _) in enumerate(chunk):
+                progress.record(result_id, idx not in errors, errors.get(idx))
+        
+        progress.flush()
+        self._queue_retagging(registered)
+        self._update_task_status(task_id, "completed")
+
+    def _fetch_existing_user_ids(self, user_ids: List[str]) -> set:
+        existing = set()
+        for chunk in _chunks(list(dict.fromkeys(user_ids)), BULK_QUERY_SIZE):
+            response = supabase_anon.table('users').select('id').in_('id', chunk).execute()
+            existing.update(row['id'] for row in response.data or [])
+        return existing
+
+    def _fetch_face_ids(self, user_ids: List[str]) -> Dict[str, Any]:
+        """Map user_id -> user_faces.id for the given users that already have a face"""
+        face_ids: Dict[str, Any] = {}
+        for chunk in _chunks(list(dict.fromkeys(user_ids)), BULK_QUERY_SIZE):
+            response = supabase_service.table('user_faces').select('id, user_id').in_('user_id', chunk).execute()
+            for row in response.data or []:
+                face_ids[row['user_id']] = row['id']
+        return face_ids
+
+    def _compute_embeddings(self, image_urls: List[str]) -> List[Any]:
+        """Embedding (or the exception raised) for the first face of each image, batched across images"""
+        if not image_urls:
+            return []
+        return [
+            face_data if isinstance(face_data, Exception)
+            else face_data["embedding"] if "embedding" in face_data else np.empty(0, np.float32)
+            for face_data in process_faces_images(image_urls, include_embedding=True, single_face_only=True)
+        ]
+
+    def _write_faces(
+        self,
+        write: Callable[[], Any],
+        indexes: List[int],
+        failure_message: str,
+        written_rows: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[int, str]:
+        """Run one bulk user_faces write and map its failure, if any, onto every item it covered"""
+        try:
+            with observe_stage("db_write"):
+                response = write()
         except Exception as e:
-            self._update_task_status(task_id, "failed", str(e))
+            return {idx: f"{failure_message}: {str(e)}" for idx in indexes}
+        if not response.data:
+            return {idx: failure_message for idx in indexes}
+        if written_rows is not None:
+            written_rows.extend(response.data)
+        return {}
+
+    def _index_faces(self, rows: List[Dict[str, Any]]):
+        """Apply successfully written user_faces rows to the local face index"""
+        for row in rows:
+            face_index.upsert(row['user_id'], row['face_embedding'])
 
-    def _update_task_result(self, task_id: str, user_id: str, status: bool, error: Optional[str] = None):
+    def _bulk_delete_faces(self, user_ids: List[str]) -> Dict[str, str]:
+        """Delete the faces of the given users with one query, returning an error per user that failed"""
+        face_ids = self._fetch_face_ids(user_ids)
+        errors = {user_id: "User does not have a face" for user_id in user_ids if user_id not in face_ids}
+        if not face_ids:
+            return errors
         try:
-            task = supabase_service.table('background_tasks').select('*').eq('task_id', task_id).execute()
-            if task.data:
-                current_task = task.data[0]
-                results = current_task.get('results', [])
-                results.append({
-                    "user_id": user_id,
-                    "status": status,
-                    "error": error
-                })
-                
-                update_data = {
-                    "results": results,
-                    "completed_items": current_task.get('completed_items', 0) + (1 if status else 0),
-                    "failed_items": current_task.get('failed_items', 0) + (0 if status else 1),
-                    "updated_at": datetime.now().isoformat()
-                }
-                
-                supabase_service.table('background_tasks').update(update_data).eq('task_id', task_id).execute()
-        except Exception:
-            pass
+            with observe_stage("db_write"):
+                response = supabase_service.table('user_faces').delete().in_('user_id', list(face_ids)).execute()
+            deleted = {row['user_id'] for row in response.data or []}
+        except Exception as e:
+            deleted = set()
+            errors.update({user_id: f"Failed to delete face: {str(e)}" for user_id in face_ids})
+        for user_id in face_ids:
+            if user_id not in deleted:
+                errors.setdefault(user_id, "Failed to delete face")
+            else:
+                face_index.remove(user_id)
+        return errors
 
-    def _update_task_progress(self, task_id: str, completed: int, total: int):
+    def _fetch_face_embeddings(self, user_ids: List[str]) -> Optional[np.ndarray]:
+        """Current face embeddings of the given users (users without a face are skipped)"""
+        embeddings = []
+        for chunk in _chunks(list(dict.fromkeys(user_ids)), BULK_QUERY_SIZE):
+            response = supabase_service.table('user_faces').select('user_id, face_embedding').in_('user_id', chunk).execute()
+            for row in response.data or []:
+                embedding = parse_embedding(row.get('face_embedding'))
+                if embedding is not None:
+                    embeddings.append(embedding)
+        return np.stack(embeddings) if embeddings else None
+
+    def _task_progress(self, task_id: str, total_items: int, start_index: int = 0) -> TaskProgress:
+        """Buffered progress recorder for a task, whose counters are mirrored to its background_tasks row on every flush"""
+        return TaskProgress(
+            task_id,
+            total_items,
+            start_index,
+            on_flush=lambda summary: self._mirror_task_progress(task_id, summary)
+        )
+
+    def _mirror_task_progress(self, task_id: str, summary: Dict[str, Any]):
         try:
-            progress = int((completed / total) * 100)
             supabase_service.table('background_tasks').update({
-                "progress": progress,
+                **summary,
                 "updated_at": datetime.now().isoformat()
             }).eq('task_id', task_id).execute()
         except Exception:
             pass
 
     def _update_task_status(self, task_id: str, status: str, error_message: Optional[str] = None):
+        if status == "completed":
+            task_queue.complete(task_id)
+        elif status == "failed":
+            task_queue.fail(task_id, error_message or "")
         try:
             update_data = {
                 "status": status,
@@ -336,215 +452,530 @@ class UserService:
         except Exception:
             pass
 
-    def get_background_task_status(self, task_id: str) -> BackgroundTaskStatus:
+    def get_background_task_status(self, task_id: str, include_results: bool = False) -> BackgroundTaskStatus:
+        """Task counters, with `results_seq` as the cursor of its latest result; the results themselves only when asked for"""
+        task_data = task_queue.get_task(task_id) if include_results else task_queue.get_task_summary(task_id)
+        if task_data is not None:
+            if include_results:
+                task_data["results_seq"] = len(task_data["results"])
+            return BackgroundTaskStatus(**task_data)
+        
+        task_data = self._fetch_legacy_task(task_id)
+        results = task_data.get("results") or []
+        task_data["results"] = results if include_results else None
+        task_data["results_seq"] = len(results)
+        return BackgroundTaskStatus(**task_data)
+
+    def get_background_task_results(self, task_id: str, since: int = 0, limit: int = 500) -> TaskResultsPage:
+        """One page of a task's per-item results, the `limit` oldest recorded after the `since` cursor"""
+        if task_queue.get_task_summary(task_id) is not None:
+            results = task_queue.get_results(task_id, since, limit + 1)
+        else:
+            # Results of a legacy task are one array; its positions (from 1) stand in for seq
+            legacy_results = self._fetch_legacy_task(task_id).get("results") or []
+            results = [
+                {"seq": seq, **result}
+                for seq, result in enumerate(legacy_results[since:since + limit + 1], start=since + 1)
+            ]
+        
+        page = results[:limit]
+        return TaskResultsPage(
+            task_id=task_id,
+            results=page,
+            next_cursor=page[-1]["seq"] if page else since,
+            has_more=len(results) > limit
+        )
+
+    def _fetch_legacy_task(self, task_id: str) -> Dict[str, Any]:
+        # Tasks started before the local task store existed only have a background_tasks row
         try:
             task = supabase_service.table('background_tasks').select('*').eq('task_id', task_id).execute()
-            if not task.data:
-                raise ValueError("Task not found")
-            
-            task_data = task.data[0]
-            return BackgroundTaskStatus(**task_data)
         except Exception:
             raise ValueError("Task not found")
+        if not task.data:
+            raise ValueError("Task not found")
+        return task.data[0]
+
+    def _match_faces(self, embeddings: Sequence[np.ndarray], match_count: int) -> List[List[Dict[str, Any]]]:
+        """Registered users matching each embedding ({"user_id", "similarity"}, best first), from the local index when it is ready"""
+        with observe_stage("match"):
+            if face_index.ready:
+                return face_index.search(embeddings, match_count, MATCH_THRESHOLD)
+            
+            matches = []
+            for embedding in embeddings:
+                response = supabase_service.rpc('match_user_faces', {
+                    'query_embedding': np.asarray(embedding, dtype=np.float32).tolist(),
+                    'match_threshold': MATCH_THRESHOLD,
+                    'match_count': match_count
+                }).execute()
+                matches.append(response.data or [])
+            return matches
 
-    def face_search(self, request: UserFaceSearchRequest) -> UserFaceSearchResponse:
+    def face_search(self, request: UserFaceSearchRequest, image_bytes: Optional[bytes] = None) -> UserFaceSearchResponse:
         try:
-            face_data = process_faces_image(request.image_url, include_embedding=True, single_face_only=False)
+            face_data = process_faces_image(
+                request.image_url, include_embedding=True, single_face_only=False, image_bytes=image_bytes
+            )
+            
+            faces = [face for face in face_data if isinstance(face, dict) and 'embedding' in face]
+            face_matches = self._match_faces([face['embedding'] for face in faces], match_count=10)
             
             results = []
-            for face in face_data:
-                if isinstance(face, dict) and 'embedding' in face:
-                    embedding = face['embedding']
-                    
-                    response = supabase_service.rpc('match_user_faces', {
-                        'query_embedding': embedding,
-                        'match_threshold': 0.6,
-                        'match_count': 10
-                    }).execute()
-                    
-                    if response.data:
-                        for match in response.data:
-                            bounding_box = []
-                            if 'facial_area' in face and isinstance(face['facial_area'], dict):
-                                facial_area = face['facial_area']
-                                if facial_area.get('x') is not None and facial_area.get('w') is not None and facial_area.get('h') is not None:
-                                    x = facial_area.get('x', 0)
-                                    y = facial_area.get('y', 0)
-                                    w = facial_area.get('w', 0)
-                                    h = facial_area.get('h', 0)
-                                    bounding_box = [
-                                        {"x": x, "y": y},
-                                        {"x": x + w, "y": y},
-                                        {"x": x + w, "y": y + h},
-                                        {"x": x, "y": y + h}
-                                    ]
-                            
-                            results.append(UserFaceRecognitionResult(
-                                user_id=match['user_id'],
-                                confidence=match['similarity'],
-                                bounding_box=bounding_box
-                            ))
+            for face, matches in zip(faces, face_matches):
+                if matches:
+                    for match in matches:
+                        bounding_box = []
+                        if 'facial_area' in face and isinstance(face['facial_area'], dict):
+                            facial_area = face['facial_area']
+                            if facial_area.get('x') is not None and facial_area.get('w') is not None and facial_area.get('h') is not None:
+                                x = facial_area.get('x', 0)
+                                y = facial_area.get('y', 0)
+                                w = facial_area.get('w', 0)
+                                h = facial_area.get('h', 0)
+                                bounding_box = [
+                                    {"x": x, "y": y},
+                                    {"x": x + w, "y": y},
+                                    {"x": x + w, "y": y + h},
+                                    {"x": x, "y": y + h}
+                                ]
+                        
+                        results.append(UserFaceRecognitionResult(
+                            user_id=match['user_id'],
+                            confidence=match['similarity'],
+                            bounding_box=bounding_box
+                        ))
             
             return UserFaceSearchResponse(results=results)
         except Exception as e:
             raise ValueError(f"Error searching for face: {str(e)}")
 
     def face_tagging_background(self, request: FaceTaggingRequest) -> str:
-        task_id = str(uuid.uuid4())
-        
-        task_data = {
-            "task_id": task_id,
-            "status": "processing",
-            "progress": 0,
-            "total_items": 1,
-            "completed_items": 0,
-            "failed_items": 0,
-            "results": [],
-            "error_message": None,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat()
-        }
-        
-        try:
-            supabase_service.table('background_tasks').insert(task_data).execute()
-        except Exception:
-            pass
-        
-        thread = threading.Thread(
-            target=self._process_face_tagging,
-            args=(task_id, request)
-        )
-        thread.daemon = True
-        thread.start()
-        
-        return task_id
+        return self._start_background_task("face_tagging", 1, request.model_dump())
 
     def _start_face_registration_background(self, users_for_face_registration: List[dict]) -> str:
         """Start face registration background task for existing users"""
-        task_id = str(uuid.uuid4())
-        
-        task_data = {
-            "task_id": task_id,
-            "status": "processing",
-            "progress": 0,
-            "total_items": len(users_for_face_registration),
-            "completed_items": 0,
-            "failed_items": 0,
-            "results": [],
-            "error_message": None,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat()
-        }
-        
-        try:
-            supabase_service.table('background_tasks').insert(task_data).execute()
-        except Exception:
-            pass
-        
-        thread = threading.Thread(
-            target=self._process_face_registration_only,
-            args=(task_id, users_for_face_registration)
+        return self._start_background_task(
+            "face_registration_only", len(users_for_face_registration), {"users": users_for_face_registration}
         )
-        thread.daemon = True
-        thread.start()
-        
-        return task_id
 
-    def _process_face_registration_only(self, task_id: str, users: List[dict]):
+    def _process_face_registration_only(self, task_id: str, users: List[dict], start_index: int = 0):
         """Process face registration for users that already exist"""
-        try:
-            for i, user_data in enumerate(users):
-                try:
-                    user_id = user_data["user_id"]
-                    avatar_image_url = user_data["avatar_image_url"]
-                    email = user_data["email"]
-                    
-                    # Check if user already has a face
-                    existing_face = supabase_service.table('user_faces').select('id').eq('user_id', user_id).execute()
-                    
-                    if existing_face.data:
-                        self._update_task_result(task_id, email, False, "User already has a face registered")
-                        self._update_task_progress(task_id, i + 1, len(users))
-                        continue
-                    
-                    # Process face image and create face entry
-                    face_data = process_faces_image(avatar_image_url, include_embedding=True, single_face_only=True)
-                    
-                    face_response = supabase_service.table('user_faces').insert({
-                        'user_id': user_id,
-                        'face_embedding': face_data["embedding"] if isinstance(face_data, dict) and "embedding" in face_data else []
-                    }).execute()
-                    
-                    if face_response.data:
-                        self._update_task_result(task_id, email, True)
-                        self._update_task_progress(task_id, i + 1, len(users))
-                    else:
-                        self._update_task_result(task_id, email, False, "Failed to save face to database")
-                        self._update_task_progress(task_id, i + 1, len(users))
-                        
-                except Exception as e:
-                    self._update_task_result(task_id, user_data.get("email", "unknown"), False, str(e))
-                    self._update_task_progress(task_id, i + 1, len(users))
-            
-            self._update_task_status(task_id, "completed")
-            
-        except Exception as e:
-            self._update_task_status(task_id, "failed", str(e))
+        self._register_faces_in_bulk(
+            task_id,
+            [(user.get("email", "unknown"), user["user_id"], user["avatar_image_url"]) for user in users],
+            start_index,
+            check_users_exist=False,
+            duplicate_error="User already has a face registered"
+        )
 
     def _process_face_tagging(self, task_id: str, request: FaceTaggingRequest):
         start_time = time.time()
+        progress = self._task_progress(task_id, 1)
         try:
             # Fetch image URL from database using image_id
-            image_response = supabase_service.table('event_images').select('raw_image_url').eq('id', request.image_id).execute()
+            image_response = supabase_service.table('event_images').select('event_id, raw_image_url, metadata').eq('id', request.image_id).execute()
             if not image_response.data:
                 raise ValueError(f"Image with ID {request.image_id} not found")
             
-            image_url = image_response.data[0]['raw_image_url']
+            image = self._event_image({"id": request.image_id, **image_response.data[0]})
             
-            face_data = process_faces_image(image_url, include_embedding=True, single_face_only=False)
+            face_data = process_faces_image(image['raw_image_url'], include_embedding=True, single_face_only=False)
             
-            recognized_users = []
-            detected_faces = 0
-            
-            for face in face_data:
-                if isinstance(face, dict) and 'embedding' in face:
-                    detected_faces += 1
-                    embedding = face['embedding']
-                    
-                    response = supabase_service.rpc('match_user_faces', {
-                        'query_embedding': embedding,
-                        'match_threshold': 0.6,
-                        'match_count': 1
-                    }).execute()
-                    
-                    if response.data and len(response.data) > 0:
-                        match = response.data[0]
-                        if match['similarity'] >= 0.6:
-                            recognized_users.append({
-                                "user_id": match['user_id'],
-                                "similarity": match['similarity']
-                            })
+            embeddings = [face['embedding'] for face in face_data if isinstance(face, dict) and 'embedding' in face]
+            detected_faces = len(embeddings)
+            face_matches = self._match_faces(embeddings, match_count=1)
+            recognized_users = self._recognized_users(face_matches)
             
             processing_time = time.time() - start_time
             
-            metadata = {
-                "detected_faces": detected_faces,
-                "recognized_users": recognized_users,
-                "processing_time": processing_time,
-                "face_tagging_task_id": task_id
-            }
+            metadata = self._tagging_metadata(
+                image, task_id, [face['facial_area'] for face in face_data], recognized_users, processing_time
+            )
             
-            supabase_service.table('event_images').update({
-                "metadata": metadata,
-                "updated_at": datetime.now().isoformat()
-            }).eq('id', request.image_id).execute()
+            with observe_stage("db_write"):
+                supabase_service.table('event_images').update({
+                    "metadata": metadata,
+                    "updated_at": datetime.now().isoformat()
+                }).eq('id', request.image_id).execute()
+            self._store_tagged_faces([(
+                image,
+                metadata,
+                (embeddings, self._matched_user_ids(face_matches))
+            )])
             
-            self._update_task_result(task_id, str(request.image_id), True, f"Processed {detected_faces} faces, found {len(recognized_users)} users")
-            self._update_task_progress(task_id, 1, 1)
+            progress.record(str(request.image_id), True, f"Processed {detected_faces} faces, found {len(recognized_users)} users")
+            progress.flush()
             self._update_task_status(task_id, "completed")
             
         except Exception as e:
             processing_time = time.time() - start_time
-            self._update_task_result(task_id, str(request.image_id), False, str(e))
-            self._update_task_progress(task_id, 1, 1)
-            self._update_task_status(task_id, "failed", str(e))
\ No newline at end of file
+            progress.record(str(request.image_id), False, str(e))
+            progress.flush()
+            self._update_task_status(task_id, "failed", str(e))
+
+    def _recognized_users(self, face_matches: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Best match of every face that has one, in the event_images metadata format"""
+        recognized_users = []
+        for matches in face_matches:
+            if matches:
+                match = matches[0]
+                if match['similarity'] >= MATCH_THRESHOLD:
+                    recognized_users.append({
+                        "user_id": match['user_id'],
+                        "similarity": match['similarity']
+                    })
+        return recognized_users
+
+    def _matched_user_ids(self, face_matches: List[List[Dict[str, Any]]]) -> List[Optional[str]]:
+        """Best matching user of each face, or None, in face order"""
+        return [
+            matches[0]['user_id'] if matches and matches[0]['similarity'] >= MATCH_THRESHOLD else None
+            for matches in face_matches
+        ]
+
+    def bulk_face_tagging_background(
+        self, request: BulkFaceTaggingRequest, task_id: Optional[str] = None
+    ) -> Tuple[str, int]:
+        """Start tagging every image of an event (or the given event_images IDs) as a single background task"""
+        images = self._fetch_event_images(request)
+        if not images:
+            raise ValueError("No images to tag")
+        task_id = self._start_background_task("bulk_face_tagging", len(images), {"images": images}, task_id=task_id)
+        return task_id, len(images)
+
+    def _fetch_event_images(self, request: BulkFaceTaggingRequest) -> List[Dict[str, Any]]:
+        images: List[Dict[str, Any]] = []
+        if request.event_id is not None:
+            offset = 0
+            while True:
+                response = supabase_service.table('event_images').select('id, event_id, raw_image_url, metadata').eq(
+                    'event_id', request.event_id
+                ).order('id').range(offset, offset + BULK_PAGE_SIZE - 1).execute()
+                images.extend(self._event_image(row) for row in response.data or [])
+                if len(response.data or []) < BULK_PAGE_SIZE:
+                    break
+                offset += BULK_PAGE_SIZE
+        if request.image_ids:
+            found: Dict[int, Dict[str, Any]] = {}
+            for chunk in _chunks(list(dict.fromkeys(request.image_ids)), BULK_QUERY_SIZE):
+                response = supabase_service.table('event_images').select('id, event_id, raw_image_url, metadata').in_('id', chunk).execute()
+                found.update({row['id']: self._event_image(row) for row in response.data or []})
+            known = {image['id'] for image in images}
+            for image_id in dict.fromkeys(request.image_ids):
+                if image_id not in known:
+                    # Unknown IDs are kept so they are reported as failed items
+                    images.append(found.get(image_id, {"id": image_id, "event_id": None, "raw_image_url": None}))
+        return images
+
+    def _event_image(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """An event_images row as tagging needs it: the image's derivatives are kept, the rest of its metadata is not"""
+        derivatives = (row.get('metadata') or {}).get('derivatives')
+        image = {"id": row['id'], "event_id": row.get('event_id'), "raw_image_url": row.get('raw_image_url')}
+        if derivatives:
+            image["derivatives"] = derivatives
+        return image
+
+    def _tagging_metadata(
+        self,
+        image: Dict[str, Any],
+        task_id: str,
+        facial_areas: List[Dict[str, Any]],
+        recognized_users: List[Dict[str, Any]],
+        processing_time: float
+    ) -> Dict[str, Any]:
+        """event_images metadata of a tagged image, with face boxes in original image coordinates"""
+        metadata = {
+            "detected_faces": len(facial_areas),
+            "recognized_users": recognized_users,
+            "face_areas": facial_areas,
+            "processing_time": processing_time,
+            "face_tagging_task_id": task_id
+        }
+        if image.get('derivatives'):
+            metadata["derivatives"] = image['derivatives']
+        return metadata
+
+    def _process_bulk_face_tagging(self, task_id: str, images: List[Dict[str, Any]], start_index: int = 0):
+        """
+        Tag many event images with a pipelined download -> decode -> detect -> embed -> match -> write-back flow.
+        
+        Images are handled in chunks of TAGGING_CHUNK_SIZE: while one chunk is being detected, embedded
+        (one batch for all of its faces) and matched (one index query), the next chunk is already downloading
+        and the previous chunk's metadata is being written back.
+        """
+        progress = self._task_progress(task_id, len(images), start_index)
+        chunks = list(_chunks(images[start_index:], TAGGING_CHUNK_SIZE))
+        
+        with ThreadPoolExecutor(max_workers=TAGGING_FETCH_WORKERS) as fetch_pool, \
+                ThreadPoolExecutor(max_workers=TAGGING_DETECT_WORKERS) as detect_pool, \
+                ThreadPoolExecutor(max_workers=1) as write_pool:
+            
+            def fetch(chunk: List[Dict[str, Any]]) -> List[Future]:
+                return [fetch_pool.submit(self._load_event_image, image) for image in chunk]
+            
+            fetches = fetch(chunks[0]) if chunks else []
+            pending_write: Optional[Future] = None
+            
+            for i, chunk in enumerate(chunks):
+                next_fetches = fetch(chunks[i + 1]) if i + 1 < len(chunks) else []
+                
+                detections = [
+                    detect_pool.submit(self._detect_event_image, image, fetched)
+                    for image, fetched in zip(chunk, fetches)
+                ]
+                outcomes = self._embed_and_match_chunk(task_id, chunk, [d.result() for d in detections])
+                
+                # Results are recorded only once their metadata is written, so a resumed task redoes unwritten images
+                if pending_write is not None:
+                    self._record_tagging_outcomes(progress, pending_write.result())
+                pending_write = write_pool.submit(self._save_tagging_outcomes, outcomes)
+                fetches = next_fetches
+            
+            if pending_write is not None:
+                self._record_tagging_outcomes(progress, pending_write.result())
+        
+        progress.flush()
+        self._update_task_status(task_id, "completed")
+
+    def _load_event_image(self, image: Dict[str, Any]) -> Tuple[Any, float]:
+        started = time.time()
+        if not image.get('raw_image_url'):
+            return ValueError(f"Image with ID {image['id']} not found"), 0.0
+        try:
+            # Always the original: detection downscales internally, embeddings need full-resolution pixels
+            return fetch_image_bytes(image['raw_image_url']), time.time() - started
+        except Exception as e:
+            return e, time.time() - started
+
+    def _detect_event_image(self, image: Dict[str, Any], fetched: Future) -> Tuple[Any, float]:
+        loaded, elapsed = fetched.result()
+        if isinstance(loaded, Exception):
+            return loaded, elapsed
+        started = time.time()
+        try:
+            # Images seen before (by content) come back from the embedding cache without detection
+            return detect_image_faces(loaded, image['raw_image_url'], decode=False), elapsed + time.time() - started
+        except Exception as e:
+            return e, elapsed + time.time() - started
+
+    def _embed_and_match_chunk(
+        self,
+        task_id: str,
+        chunk: List[Dict[str, Any]],
+        detections: List[Tuple[Any, float]]
+    ) -> List[Tuple[Dict[str, Any], Any, Any]]:
+        """
+        Embed all faces of a chunk in one batch and match them in one query,
+        returning (image, metadata or error, (face embeddings, matched user IDs))
+        """
+        started = time.time()
+        detected = [detection for detection, _ in detections if not isinstance(detection, Exception)]
+        # Faces of cached images are not embedded again
+        embed_detections(detected)
+        faces = [embedding for detection in detected for embedding in detection.embeddings]
+        face_matches: List[List[Dict[str, Any]]] = []
+        if faces:
+            face_matches = self._match_faces(faces, match_count=1)
+        shared_time = (time.time() - started) / max(len(chunk), 1)
+        
+        outcomes: List[Tuple[Dict[str, Any], Any, Any]] = []
+        offset = 0
+        for image, (detection, elapsed) in zip(chunk, detections):
+            if isinstance(detection, Exception):
+                outcomes.append((image, detection, None))
+                continue
+            face_count = len(detection.face_objs)
+            matches = face_matches[offset:offset + face_count]
+            offset += face_count
+            outcomes.append((image, self._tagging_metadata(
+                image,
+                task_id,
+                [face_obj["facial_area"] for face_obj in detection.face_objs],
+                self._recognized_users(matches),
+                elapsed + shared_time
+            ), (detection.embeddings, self._matched_user_ids(matches))))
+        return outcomes
+
+    def _save_tagging_outcomes(self, outcomes: List[Tuple[Dict[str, Any], Any, Any]]) -> List[Tuple[Dict[str, Any], Any, Any]]:
+        written = self._write_tagging_metadata(outcomes)
+        self._store_tagged_faces(written)
+        return written
+
+    def _write_tagging_metadata(self, outcomes: List[Tuple[Dict[str, Any], Any, Any]]) -> List[Tuple[Dict[str, Any], Any, Any]]:
+        """
+        Write the metadata of every tagged image in the chunk, one update per image.
+        
+        Only `metadata` and `updated_at` are written, and only to rows that still exist: an image
+        deleted while the task ran fails with LookupError instead of being recreated, and columns
+        edited since the task was queued are left alone.
+        """
+        now = datetime.now().isoformat()
+        written = []
+        for image, metadata, faces in outcomes:
+            if not isinstance(metadata, Exception):
+                try:
+                    with observe_stage("db_write"):
+                        response = supabase_service.table('event_images').update({
+                            "metadata": metadata,
+                            "updated_at": now
+                        }).eq('id', image['id']).execute()
+                    if not response.data:
+                        metadata = LookupError(f"Image with ID {image['id']} no longer exists")
+                except Exception as e:
+                    metadata = e
+            written.append((image, metadata, faces))
+        return written
+
+    def _store_tagged_faces(self, outcomes: List[Tuple[Dict[str, Any], Any, Any]]):
+        """Keep the face embeddings of successfully tagged images, so registry changes can re-match them without re-detection"""
+        images = []
+        for image, metadata, faces in outcomes:
+            if isinstance(metadata, Exception):
+                continue
+            embeddings, matched_user_ids = faces
+            images.append({
+                "image_id": image['id'],
+                "event_id": image['event_id'],
+                "raw_image_url": image['raw_image_url'],
+                "metadata": metadata,
+                "embeddings": embeddings,
+                "matched_user_ids": matched_user_ids
+            })
+        try:
+            event_face_store.save_images(images)
+        except Exception as e:
+            print(f"Failed to store tagged faces: {e}")
+
+    def _queue_retagging(self, user_ids: List[str]):
+        """
+        Queue a re-match of already tagged event images after the faces of the given users changed.
+        
+        Changes are coalesced into one pass on the low-priority re-tag worker, outside the task scheduler,
+        so a burst of registrations never fills the queue the batch endpoints use.
+        """
+        if not user_ids or not event_face_store.has_faces():
+            return
+        retag_worker.submit(user_ids)
+
+    def _process_face_retagging(self, task_id: Optional[str], user_ids: List[str]):
+        """
+        Re-match the stored faces of tagged event images after the faces of `user_ids` changed.
+        
+        Only images with a stored face similar to one of the users' current embeddings, or currently
+        tagged with one of them, are re-matched (against the whole registry). Nothing is downloaded
+        or detected again. Only `recognized_users` and `retagged_at` are merged into each row's current
+        metadata; images deleted from event_images since they were tagged are dropped from the store.
+        """
+        if not event_face_store.has_faces():
+            return
+        affected = event_face_store.find_affected_images(
+            user_ids, self._fetch_face_embeddings(user_ids), MATCH_THRESHOLD
+        )
+        now = datetime.now().isoformat()
+        for chunk in _chunks(affected, BULK_CHUNK_SIZE):
+            current_metadata = self._current_image_metadata(chunk)
+            deleted = [image_id for image_id in chunk if image_id not in current_metadata]
+            images = [image for image in event_face_store.load_images(chunk) if image["image_id"] in current_metadata]
+            faces = [embedding for image in images for embedding in image["embeddings"]]
+            face_matches = self._match_faces(faces, match_count=1) if faces else []
+            
+            outcomes: List[Tuple[Dict[str, Any], Any, Any]] = []
+            offset = 0
+            for image in images:
+                face_count = len(image["matched_user_ids"])
+                matches = face_matches[offset:offset + face_count]
+                offset += face_count
+                outcomes.append((
+                    {"id": image["image_id"], "event_id": image["event_id"], "raw_image_url": image["raw_image_url"]},
+                    {
+                        **current_metadata[image["image_id"]],
+                        "recognized_users": self._recognized_users(matches),
+                        "retagged_at": now
+                    },
+                    (image["embeddings"], self._matched_user_ids(matches))
+                ))
+            written = self._save_tagging_outcomes(outcomes)
+            deleted += [image['id'] for image, metadata, _ in written if isinstance(metadata, LookupError)]
+            event_face_store.delete_images(deleted)
+        print(f"Re-tagged {len(affected)} event images after face changes of {len(user_ids)} users")
+
+    def _current_image_metadata(self, image_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Current metadata of the event_images rows that still exist, by ID"""
+        response = supabase_service.table('event_images').select('id, metadata').in_('id', image_ids).execute()
+        return {row['id']: row.get('metadata') or {} for row in response.data or []}
+
+    def _record_tagging_outcomes(self, progress: TaskProgress, outcomes: List[Tuple[Dict[str, Any], Any, Any]]):
+        for image, metadata, _ in outcomes:
+            if isinstance(metadata, Exception):
+                progress.record(str(image['id']), False, str(metadata))
+            else:
+                progress.record(
+                    str(image['id']), True,
+                    f"Processed {metadata['detected_faces']} faces, found {len(metadata['recognized_users'])} users"
+                )
+
+
+def _register_task_handlers():
+    """Map persisted job kinds to UserService handlers, so queued jobs can run (or resume) after a restart"""
+    service = UserService()
+    
+    def on_failed(task_id: str, error_message: str):
+        service._update_task_status(task_id, "failed", error_message)
+    
+    task_scheduler.register(
+        "batch_face_register",
+        lambda task_id, payload, start_index: service._process_batch_face_register(
+            task_id, [UserFaceRegisterRequest(**user) for user in payload["users"]], start_index
+        ),
+        on_failed
+    )
+    task_scheduler.register(
+        "batch_face_update",
+        lambda task_id, payload, start_index: service._process_batch_face_update(
+            task_id, [UserFaceUpdateRequest(**user) for user in payload["users"]], start_index
+        ),
+        on_failed
+    )
+    task_scheduler.register(
+        "batch_face_delete",
+        lambda task_id, payload, start_index: service._process_batch_face_delete(
+            task_id, payload["user_ids"], start_index
+        ),
+        on_failed
+    )
+    task_scheduler.register(
+        "face_registration_only",
+        lambda task_id, payload, start_index: service._process_face_registration_only(
+            task_id, payload["users"], start_index
+        ),
+        on_failed
+    )
+    task_scheduler.register(
+        "bulk_face_tagging",
+        lambda task_id, payload, start_index: service._process_bulk_face_tagging(
+            task_id, payload["images"], start_index
+        ),
+        on_failed
+    )
+    # Re-tagging runs on retag_worker now; jobs of this kind may still be queued from before
+    task_scheduler.register(
+        "face_retagging",
+        lambda task_id, payload, start_index: service._process_face_retagging(task_id, payload["user_ids"])
+    )
+    task_scheduler.register(
+        "face_tagging",
+        lambda task_id, payload, start_index: service._process_face_tagging(
+            task_id, FaceTaggingRequest(**payload)
+        ),
+        on_failed
+    )
+
+_register_task_handlers()
+
+retag_worker = CoalescingWorker(
+    "face-retagging",
+    lambda user_ids: UserService()._process_face_retagging(None, user_ids),
+    delay=settings.RETAG_DELAY_SECONDS,
+    max_delay=settings.RETAG_MAX_DELAY_SECONDS
+)
@@ -1,8 +1,27 @@
 import re
+import html
+import asyncio
+import hashlib
 import httpx
 import mimetypes
-from typing import Optional, Tuple
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from io import BytesIO
+from urllib.parse import urlencode
+from app.core.config import settings
+from app.core.http_client import http_client
+from app.utils.image_utils import make_image_derivatives
+from app.utils.storage_utils import (
+    RESUMABLE_CHUNK_SIZE, StorageObjectExistsError, generate_unique_filename, get_public_url_from_supabase,
+    read_spooled, stream_upload_to_supabase, upload_image_derivatives
+)
+
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+DRIVE_FOLDER_VIEW_URL = "https://drive.google.com/embeddedfolderview?id={folder_id}"
+DRIVE_API_FILES_URL = "https://www.googleapis.com/drive/v3/files"
+DRIVE_FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
 
 
 def extract_file_id_from_drive_url(url: str) -> Optional[str]:
@@ -11,12 +30,26 @@ def extract_file_id_from_drive_url(url: str) -> Optional[str]:
         r'[?&]id=([a-zA-Z0-9-_]+)',
         r'/uc\?id=([a-zA-Z0-9-_]+)'
     ]
-    
+
+    for pattern in patterns:
+        match = re.search(pattern, url)
+        if match:
+            return match.group(1)
+
+    return None
+
+
+def extract_folder_id_from_drive_url(url: str) -> Optional[str]:
+    patterns = [
+        r'/folders/([a-zA-Z0-9-_]+)',
+        r'[?&]id=([a-zA-Z0-9-_]+)'
+    ]
+
     for pattern in patterns:
         match = re.search(pattern, url)
         if match:
             return match.group(1)
-    
+
     return None
 
 
@@ -24,34 +57,247 @@ def get_drive_download_url(file_id: str) -> str:
     return f"https://drive.google.com/uc?export=download&id={file_id}"
 
 
-async def download_file_from_drive(url: str) -> Tuple[bytes, str, str]:
+def get_drive_file_url(file_id: str) -> str:
+    return f"https://drive.google.com/file/d/{file_id}/view"
+
+
+class DriveFile:
+    """An open Google Drive download: the streamed response plus the file's name, type and size."""
+
+    def __init__(self, response: httpx.Response, file_id: str):
+        self.response = response
+        self.filename, self.mime_type = _file_info(response, file_id)
+        content_length = response.headers.get('content-length', '')
+        # A compressed transfer decodes to a different length
+        known = content_length.isdigit() and 'content-encoding' not in response.headers
+        self.size: Optional[int] = int(content_length) if known else None
+
+    def chunks(self) -> AsyncIterator[bytes]:
+        return self.response.aiter_bytes(DOWNLOAD_CHUNK_SIZE)
+
+
+def _file_info(response: httpx.Response, file_id: str) -> Tuple[str, str]:
+    content_disposition = response.headers.get('content-disposition', '')
+    filename = file_id
+
+    if 'filename=' in content_disposition:
+        filename_match = re.search(r'filename[^;=\n]*=(([\'"]).*?\2|[^;\n]*)', content_disposition)
+        if filename_match:
+            filename = filename_match.group(1).strip('"\'')
+
+    mime_type = response.headers.get('content-type', 'application/octet-stream')
+    if mime_type == 'application/octet-stream' and filename:
+        guessed_type, _ = mimetypes.guess_type(filename)
+        if guessed_type:
+            mime_type = guessed_type
+
+    if filename == file_id and mime_type:
+        extension = mimetypes.guess_extension(mime_type)
+        if extension:
+            filename = f"{file_id}{extension}"
+
+    return filename, mime_type
+
+
+def _is_confirmation_page(response: httpx.Response) -> bool:
+    # Files too large for Drive's virus scan are served behind an HTML "download anyway" page
+    return (
+        response.headers.get('content-type', '').startswith('text/html')
+        and 'attachment' not in response.headers.get('content-disposition', '')
+    )
+
+
+def _confirmation_url(page: str, response: httpx.Response) -> Optional[str]:
+    """URL behind the "download anyway" button of Drive's confirmation page, if the page has one"""
+    form = re.search(r'<form[^>]*id="download-form"[^>]*action="([^"]+)"(.*?)</form>', page, re.S)
+    if form:
+        inputs = re.findall(r'<input[^>]*name="([^"]+)"[^>]*value="([^"]*)"', form.group(2))
+        if inputs:
+            return f"{html.unescape(form.group(1))}?{urlencode([(name, html.unescape(value)) for name, value in inputs])}"
+
+    link = re.search(r'href="(/uc\?export=download[^"]*confirm=[^"]+)"', page)
+    if link:
+        return str(response.url.join(html.unescape(link.group(1))))
+
+    for name, value in response.cookies.items():
+        if name.startswith('download_warning'):
+            return str(response.url.copy_merge_params({'confirm': value}))
+    return None
+
+
+@asynccontextmanager
+async def open_drive_file(client: httpx.AsyncClient, url: str) -> AsyncIterator[DriveFile]:
+    """Open a streamed download of a shared Drive file, going through the large-file confirmation page if needed"""
     file_id = extract_file_id_from_drive_url(url)
     if not file_id:
         raise ValueError("Invalid Google Drive URL format")
-    
-    download_url = get_drive_download_url(file_id)
-    
-    async with httpx.AsyncClient(follow_redirects=True) as client:
-        response = await client.get(download_url)
+
+    async with client.stream("GET", get_drive_download_url(file_id)) as response:
+        response.raise_for_status()
+        if not _is_confirmation_page(response):
+            yield DriveFile(response, file_id)
+            return
+        page = (await http_client.read_limited(response)).decode('utf-8', errors='ignore')
+        confirm_url = _confirmation_url(page, response)
+
+    if confirm_url is None:
+        raise ValueError("Google Drive returned a web page instead of the file, check that it is shared publicly")
+
+    async with client.stream("GET", confirm_url) as response:
         response.raise_for_status()
-        
-        content_disposition = response.headers.get('content-disposition', '')
-        filename = file_id
-        
-        if 'filename=' in content_disposition:
-            filename_match = re.search(r'filename[^;=\n]*=(([\'"]).*?\2|[^;\n]*)', content_disposition)
-            if filename_match:
-                filename = filename_match.group(1).strip('"\'')
-        
-        mime_type = response.headers.get('content-type', 'application/octet-stream')
-        if mime_type == 'application/octet-stream' and filename:
-            guessed_type, _ = mimetypes.guess_type(filename)
-            if guessed_type:
-                mime_type = guessed_type
-        
-        if filename == file_id and mime_type:
-            extension = mimetypes.guess_extension(mime_type)
-            if extension:
-                filename = f"{file_id}{extension}"
-        
-        return response.content, filename, mime_type 
\ No newline at end of file
+        if _is_confirmation_page(response):
+            raise ValueError("Google Drive did not accept the download confirmation")
+        yield DriveFile(response, file_id)
+
+
+async def _store_derivatives(
+    client: httpx.AsyncClient, content: bytes, object_name: str, bucket_name: str
+) -> Optional[Dict[str, Any]]:
+    """Generate and upload the thumbnail and detection copy of an image; a failure only costs the derivatives"""
+    try:
+        # Decoding and resizing are CPU work, kept off the HTTP client's event loop
+        derivatives = await asyncio.to_thread(make_image_derivatives, content)
+        if derivatives is None:
+            return None
+        return await upload_image_derivatives(client, object_name, derivatives, bucket_name)
+    except Exception as e:
+        print(f"Failed to store derivatives of {object_name}: {e}")
+        return None
+
+
+async def transfer_drive_file_to_supabase(
+    url: str, bucket_name: str = "images"
+) -> Tuple[str, str, str, Optional[Dict[str, Any]]]:
+    """
+    Pipe a Drive file into Supabase Storage chunk by chunk, without holding the whole file in memory.
+
+    Images up to MAX_DOWNLOAD_MB are also kept while they stream, to generate their derivatives.
+
+    Returns:
+        (public_url, filename, mime_type, derivatives) - derivatives is the record made by
+        upload_image_derivatives, or None for files that are not images
+    """
+    async def transfer(client: httpx.AsyncClient) -> Tuple[str, str, str, Optional[Dict[str, Any]]]:
+        async with open_drive_file(client, url) as drive_file:
+            object_name = generate_unique_filename(drive_file.filename)
+            content: Optional[bytearray] = bytearray() if drive_file.mime_type.startswith("image/") else None
+
+            async def chunks() -> AsyncIterator[bytes]:
+                nonlocal content
+                async for chunk in drive_file.chunks():
+                    if content is not None:
+                        if len(content) + len(chunk) > http_client.max_download_bytes:
+                            content = None
+                        else:
+                            content.extend(chunk)
+                    yield chunk
+
+            public_url = await stream_upload_to_supabase(
+                client,
+                chunks(),
+                drive_file.filename,
+                bucket_name=bucket_name,
+                mime_type=drive_file.mime_type,
+                size=drive_file.size,
+                object_name=object_name
+            )
+
+        derivatives = None
+        if content is not None:
+            derivatives = await _store_derivatives(client, bytes(content), object_name, bucket_name)
+        return public_url, drive_file.filename, drive_file.mime_type, derivatives
+
+    return await http_client.arun(transfer)
+
+
+async def list_drive_folder(url: str) -> List[Dict[str, str]]:
+    """
+    List the files ({"id", "name"}) directly inside a shared Drive folder.
+
+    Uses the Drive API when GOOGLE_API_KEY is set, otherwise the folder's public embedded view.
+    """
+    folder_id = extract_folder_id_from_drive_url(url)
+    if not folder_id:
+        raise ValueError("Invalid Google Drive folder URL format")
+
+    async def list_files(client: httpx.AsyncClient) -> List[Dict[str, str]]:
+        if settings.GOOGLE_API_KEY:
+            return await _list_folder_with_api(client, folder_id)
+        response = await client.get(DRIVE_FOLDER_VIEW_URL.format(folder_id=folder_id))
+        response.raise_for_status()
+        entries = re.findall(
+            r'href="https://drive\.google\.com/file/d/([a-zA-Z0-9-_]+)/view[^"]*".*?class="flip-entry-title">([^<]*)<',
+            response.text,
+            re.S
+        )
+        return [{"id": file_id, "name": html.unescape(name)} for file_id, name in entries]
+
+    return await http_client.arun(list_files)
+
+
+async def _list_folder_with_api(client: httpx.AsyncClient, folder_id: str) -> List[Dict[str, str]]:
+    files: List[Dict[str, str]] = []
+    page_token: Optional[str] = None
+    while True:
+        params = {
+            "q": f"'{folder_id}' in parents and trashed = false",
+            "fields": "nextPageToken, files(id, name, mimeType)",
+            "pageSize": "1000",
+            "key": settings.GOOGLE_API_KEY
+        }
+        if page_token:
+            params["pageToken"] = page_token
+        response = await client.get(DRIVE_API_FILES_URL, params=params)
+        response.raise_for_status()
+        data = response.json()
+        files.extend(
+            {"id": item["id"], "name": item.get("name", item["id"])}
+            for item in data.get("files", []) if item.get("mimeType") != DRIVE_FOLDER_MIME_TYPE
+        )
+        page_token = data.get("nextPageToken")
+        if not page_token:
+            return files
+
+
+async def ingest_drive_file(
+    client: httpx.AsyncClient, file_id: str, bucket_name: str = "images"
+) -> Tuple[str, str, bool, Optional[Dict[str, Any]]]:
+    """
+    Copy a Drive file into Storage under the SHA-256 of its content, so the same photo is stored once.
+
+    The file is hashed while it is spooled to a temporary file (in memory up to one upload chunk), then
+    uploaded from the spool, so files of any size are copied in bounded memory. Newly stored images up to
+    MAX_DOWNLOAD_MB are read back to get their derivatives stored next to them. A photo that was already
+    stored is recognised before any derivative work, and keeps the derivatives made when it was first stored.
+
+    Returns:
+        (public_url, mime_type, created, derivatives) - created is False when identical content was already
+        in the bucket, derivatives is None for files that are not images and for already stored ones
+    """
+    with tempfile.SpooledTemporaryFile(max_size=RESUMABLE_CHUNK_SIZE) as spool:
+        digest = hashlib.sha256()
+        async with open_drive_file(client, get_drive_file_url(file_id)) as drive_file:
+            filename, mime_type = drive_file.filename, drive_file.mime_type
+            async for chunk in drive_file.chunks():
+                digest.update(chunk)
+                spool.write(chunk)
+        size = spool.tell()
+
+        extension = mimetypes.guess_extension(mime_type) or os.path.splitext(filename)[1].lower()
+        object_name = f"{digest.hexdigest()}{extension}"
+
+        try:
+            spool.seek(0)
+            public_url = await stream_upload_to_supabase(
+                client, read_spooled(spool), filename, bucket_name=bucket_name,
+                mime_type=mime_type, size=size, object_name=object_name
+            )
+            created = True
+        except StorageObjectExistsError:
+            public_url, created = get_public_url_from_supabase(bucket_name, object_name), False
+
+        derivatives = None
+        if created and mime_type.startswith("image/") and size <= http_client.max_download_bytes:
+            spool.seek(0)
+            derivatives = await _store_derivatives(client, spool.read(), object_name, bucket_name)
+    return public_url, mime_type, created, derivatives
@@ -0,0 +1,71 @@
+import cv2
+import numpy as np
+from typing import Optional, Tuple
+from app.core.config import settings
+
+THUMBNAIL_WEBP_QUALITY = 80
+DETECTION_JPEG_QUALITY = 90
+
+
+class ImageDerivatives:
+    """Smaller encodings of an uploaded photo: a gallery thumbnail and, for large photos, a detection-sized copy."""
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        thumbnail: bytes,
+        thumbnail_mime_type: str,
+        detection: Optional[bytes],
+        detection_scale: float
+    ):
+        self.width = width
+        self.height = height
+        self.thumbnail = thumbnail
+        self.thumbnail_mime_type = thumbnail_mime_type
+        # None when the original is already small enough to detect on
+        self.detection = detection
+        # Original pixels per detection image pixel, to map face boxes back
+        self.detection_scale = detection_scale
+
+
+def _resize_to_max_side(image: np.ndarray, max_side: int) -> Tuple[np.ndarray, float]:
+    height, width = image.shape[:2]
+    scale = max(height, width) / max_side
+    if scale <= 1:
+        return image, 1.0
+    size = (max(1, round(width / scale)), max(1, round(height / scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA), scale
+
+
+def make_image_derivatives(content: bytes) -> Optional[ImageDerivatives]:
+    """
+    Decode an uploaded image and encode its thumbnail (WebP, JPEG if WebP is unavailable) and detection copy.
+
+    Returns:
+        The derivatives, or None if the content is not a decodable image
+    """
+    image = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+    height, width = image.shape[:2]
+
+    thumbnail, _ = _resize_to_max_side(image, settings.THUMBNAIL_MAX_SIDE)
+    encoded, buffer = cv2.imencode(".webp", thumbnail, [cv2.IMWRITE_WEBP_QUALITY, THUMBNAIL_WEBP_QUALITY])
+    thumbnail_mime_type = "image/webp"
+    if not encoded:
+        encoded, buffer = cv2.imencode(".jpg", thumbnail, [cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_WEBP_QUALITY])
+        thumbnail_mime_type = "image/jpeg"
+    if not encoded:
+        return None
+
+    detection, detection_scale = _resize_to_max_side(image, settings.DETECTION_IMAGE_MAX_SIDE)
+    detection_bytes: Optional[bytes] = None
+    if detection_scale > 1:
+        encoded, detection_buffer = cv2.imencode(".jpg", detection, [cv2.IMWRITE_JPEG_QUALITY, DETECTION_JPEG_QUALITY])
+        if encoded:
+            detection_bytes = detection_buffer.tobytes()
+        else:
+            detection_scale = 1.0
+
+    return ImageDerivatives(width, height, buffer.tobytes(), thumbnail_mime_type, detection_bytes, detection_scale)
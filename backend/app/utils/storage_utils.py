@@ -1,8 +1,20 @@
 import uuid
-from typing import Optional
+import base64
+import tempfile
+import httpx
+from typing import Any, AsyncIterator, Dict, Optional
+from app.core.config import settings
 from app.core.supabase import supabase_service
+from app.utils.image_utils import ImageDerivatives
 import os
 
+# Supabase Storage resumable (TUS) uploads must be sent in chunks of exactly 6 MB, except the last one
+RESUMABLE_CHUNK_SIZE = 6 * 1024 * 1024
+
+
+class StorageObjectExistsError(Exception):
+    """Raised when an upload targets an object path that already exists in the bucket."""
+
 
 def generate_unique_filename(original_filename: str) -> str:
     file_extension = os.path.splitext(original_filename)[1]
@@ -10,26 +22,158 @@ def generate_unique_filename(original_filename: str) -> str:
     return f"{unique_id}{file_extension}"
 
 
-async def upload_file_to_supabase(
-    file_content: bytes, 
-    filename: str, 
+async def stream_upload_to_supabase(
+    client: httpx.AsyncClient,
+    chunks: AsyncIterator[bytes],
+    filename: str,
     bucket_name: str = "images",
-    mime_type: str = "application/octet-stream"
+    mime_type: str = "application/octet-stream",
+    size: Optional[int] = None,
+    object_name: Optional[str] = None
 ) -> str:
-    unique_filename = generate_unique_filename(filename)
+    """
+    Upload a stream to Supabase Storage with the resumable (TUS) protocol, holding at most one chunk in memory.
+    
+    When the size is not known up front, the stream is first spooled to a temporary file.
+    The object is stored under `object_name`, or a unique name derived from `filename`.
+    
+    Raises:
+        StorageObjectExistsError: If `object_name` is already taken
+    """
+    unique_filename = object_name or generate_unique_filename(filename)
+    spool = None
     
     try:
-        result = supabase_service.storage.from_(bucket_name).upload(
-            file=file_content,
-            path=unique_filename
+        if size is None:
+            spool = tempfile.SpooledTemporaryFile(max_size=RESUMABLE_CHUNK_SIZE)
+            async for chunk in chunks:
+                spool.write(chunk)
+            size = spool.tell()
+            spool.seek(0)
+            chunks = read_spooled(spool)
+        
+        headers = {**_storage_headers(), "Tus-Resumable": "1.0.0"}
+        create_response = await client.post(
+            f"{settings.SUPABASE_URL}/storage/v1/upload/resumable",
+            headers={
+                **headers,
+                "Upload-Length": str(size),
+                "Upload-Metadata": _tus_metadata(
+                    bucketName=bucket_name, objectName=unique_filename, contentType=mime_type, cacheControl="3600"
+                ),
+                "x-upsert": "false"
+            }
         )
+        if create_response.status_code == 409:
+            raise StorageObjectExistsError(f"{bucket_name}/{unique_filename} already exists")
+        create_response.raise_for_status()
+        upload_url = create_response.url.join(create_response.headers["location"])
         
-        public_url_response = supabase_service.storage.from_(bucket_name).get_public_url(unique_filename)
+        offset = 0
+        buffer = bytearray()
+        async for chunk in chunks:
+            buffer.extend(chunk)
+            while len(buffer) >= RESUMABLE_CHUNK_SIZE:
+                offset = await _upload_chunk(client, upload_url, headers, offset, bytes(buffer[:RESUMABLE_CHUNK_SIZE]))
+                del buffer[:RESUMABLE_CHUNK_SIZE]
+        if buffer or offset < size:
+            offset = await _upload_chunk(client, upload_url, headers, offset, bytes(buffer))
+        if offset != size:
+            raise ValueError(f"Uploaded {offset} of {size} bytes")
         
-        return public_url_response
+        return supabase_service.storage.from_(bucket_name).get_public_url(unique_filename)
         
+    except StorageObjectExistsError:
+        raise
     except Exception as e:
         raise Exception(f"Failed to upload file to Supabase: {str(e)}")
+    finally:
+        if spool is not None:
+            spool.close()
+
+
+async def upload_image_derivatives(
+    client: httpx.AsyncClient,
+    object_name: str,
+    derivatives: ImageDerivatives,
+    bucket_name: str = "images"
+) -> Dict[str, Any]:
+    """
+    Store the thumbnail and detection copy of an image under derivatives/, named after its object.
+    
+    Returns:
+        The event_images metadata "derivatives" record: their public URLs (detection_url is None when the
+        original is detected on directly), the original's size and the detection copy's scale
+    """
+    stem = os.path.splitext(object_name)[0]
+    extension = ".webp" if derivatives.thumbnail_mime_type == "image/webp" else ".jpg"
+    thumbnail_name = f"derivatives/{stem}_thumb{extension}"
+    await _put_object(client, bucket_name, thumbnail_name, derivatives.thumbnail, derivatives.thumbnail_mime_type, upsert=True)
+    
+    detection_url: Optional[str] = None
+    if derivatives.detection is not None:
+        detection_name = f"derivatives/{stem}_detect.jpg"
+        await _put_object(client, bucket_name, detection_name, derivatives.detection, "image/jpeg", upsert=True)
+        detection_url = get_public_url_from_supabase(bucket_name, detection_name)
+    
+    return {
+        "thumbnail_url": get_public_url_from_supabase(bucket_name, thumbnail_name),
+        "detection_url": detection_url,
+        "width": derivatives.width,
+        "height": derivatives.height,
+        "detection_scale": derivatives.detection_scale
+    }
+
+
+async def _put_object(
+    client: httpx.AsyncClient,
+    bucket_name: str,
+    object_name: str,
+    content: bytes,
+    mime_type: str,
+    upsert: bool = False
+) -> None:
+    response = await client.post(
+        f"{settings.SUPABASE_URL}/storage/v1/object/{bucket_name}/{object_name}",
+        headers={
+            **_storage_headers(),
+            "Content-Type": mime_type,
+            "Cache-Control": "max-age=3600",
+            "x-upsert": "true" if upsert else "false"
+        },
+        content=content
+    )
+    response.raise_for_status()
+
+
+async def _upload_chunk(client: httpx.AsyncClient, upload_url: httpx.URL, headers: dict, offset: int, chunk: bytes) -> int:
+    response = await client.patch(
+        upload_url,
+        headers={**headers, "Upload-Offset": str(offset), "Content-Type": "application/offset+octet-stream"},
+        content=chunk
+    )
+    response.raise_for_status()
+    return int(response.headers.get("upload-offset", offset + len(chunk)))
+
+
+async def read_spooled(spool) -> AsyncIterator[bytes]:
+    """Read a spooled temporary file back from its current position, one upload chunk at a time"""
+    while True:
+        chunk = spool.read(RESUMABLE_CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _storage_headers() -> dict:
+    return {
+        "Authorization": f"Bearer {settings.SUPABASE_SERVICE_KEY}",
+        "apikey": settings.SUPABASE_SERVICE_KEY or ""
+    }
+
+
+def _tus_metadata(**values: str) -> str:
+    return ",".join(f"{key} {base64.b64encode(value.encode()).decode()}" for key, value in values.items())
 
 
 def get_public_url_from_supabase(bucket_name: str, file_path: str) -> str:
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark of downscale-then-refine face detection on a folder of local photos
+
+Every image is detected at full resolution once (the reference), then at each
+max detection side. For each setting the script reports the mean detection time
+and the recall: the share of reference faces found again with an IoU of at
+least --iou.
+
+Usage:
+    python benchmark_detection.py path/to/photos --max-sides 800 1280 1600 2400
+"""
+
+import argparse
+import os
+import time
+from typing import Dict, List, Tuple
+
+from app.core.deepface import box_iou, detect_faces, inference_engine, load_image
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def timed_detection(image, max_side: int) -> Tuple[List[Dict[str, int]], float]:
+    """Detect faces at the given max side, returning their boxes and the time taken"""
+    started = time.perf_counter()
+    try:
+        face_objs = detect_faces(image, max_side=max_side)
+    except ValueError:
+        face_objs = []
+    return [face_obj["facial_area"] for face_obj in face_objs], time.perf_counter() - started
+
+
+def matched_faces(reference: List[Dict[str, int]], found: List[Dict[str, int]], iou: float) -> int:
+    """Number of reference boxes that have a found box overlapping them by at least iou"""
+    return sum(1 for box in reference if any(box_iou(box, other) >= iou for other in found))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fixtures", help="Folder of images to detect faces in")
+    parser.add_argument("--max-sides", type=int, nargs="+", default=[800, 1280, 1600, 2400])
+    parser.add_argument("--iou", type=float, default=0.5, help="Overlap for a face to count as found again")
+    args = parser.parse_args()
+
+    paths = sorted(
+        os.path.join(args.fixtures, name) for name in os.listdir(args.fixtures)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    if not paths:
+        parser.error(f"No images in {args.fixtures}")
+
+    inference_engine.load()
+    images = [load_image(path) for path in paths]
+    print(f"{len(images)} images, largest {max(max(image.shape[:2]) for image in images)}px")
+
+    references = [timed_detection(image, 0) for image in images]
+    reference_faces = sum(len(boxes) for boxes, _ in references)
+    reference_time = sum(elapsed for _, elapsed in references) / len(images)
+
+    print(f"\n{'max side':>10} {'ms/image':>10} {'speed-up':>10} {'faces':>8} {'recall':>8}")
+    print(f"{'full':>10} {reference_time * 1000:>10.1f} {1.0:>10.2f} {reference_faces:>8} {1.0:>8.3f}")
+    for max_side in args.max_sides:
+        results = [timed_detection(image, max_side) for image in images]
+        elapsed = sum(elapsed for _, elapsed in results) / len(images)
+        found = sum(len(boxes) for boxes, _ in results)
+        matched = sum(
+            matched_faces(reference, boxes, args.iou)
+            for (reference, _), (boxes, _) in zip(references, results)
+        )
+        recall = matched / reference_faces if reference_faces else 1.0
+        print(f"{max_side:>10} {elapsed * 1000:>10.1f} {reference_time / elapsed:>10.2f} {found:>8} {recall:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
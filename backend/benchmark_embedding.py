@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Batched embedding against DeepFace.represent on a folder of local photos
+
+Detects the faces of every image, then embeds all of them twice:
+- with embed_faces(), in batched forward passes
+- with one DeepFace.represent call per face, given the same aligned crop
+
+It reports the time per face of both, and the cosine similarity between the two
+embeddings of each face. The script exits with status 1 if any face is below
+--min-cosine, so it can run as a check after touching the embedding
+preprocessing (channel order, resize, normalization).
+
+Usage:
+    python benchmark_embedding.py path/to/photos
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import List
+
+import numpy as np
+from deepface import DeepFace
+
+from app.core.deepface import detect_faces, embed_faces, inference_engine, load_image
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def represent_face(aligned_face: np.ndarray) -> np.ndarray:
+    """Embed one aligned RGB face the reference way: DeepFace.represent on its BGR pixels, detection skipped"""
+    bgr = np.clip(aligned_face[:, :, ::-1] * 255.0, 0, 255).astype(np.uint8)
+    result = DeepFace.represent(
+        img_path=bgr, model_name=inference_engine.embedding_model_name, detector_backend="skip"
+    )
+    return np.asarray(result[0]["embedding"], dtype=np.float32)
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fixtures", help="Folder of images with faces")
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="Lowest accepted similarity to DeepFace.represent")
+    args = parser.parse_args()
+
+    paths = sorted(
+        os.path.join(args.fixtures, name) for name in os.listdir(args.fixtures)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    if not paths:
+        parser.error(f"No images in {args.fixtures}")
+
+    inference_engine.load()
+    faces: List[np.ndarray] = []
+    for path in paths:
+        try:
+            faces.extend(face_obj["face"] for face_obj in detect_faces(load_image(path)))
+        except ValueError:
+            pass
+    if not faces:
+        parser.error(f"No faces detected in {args.fixtures}")
+
+    started = time.perf_counter()
+    batched = embed_faces(faces)
+    batched_time = (time.perf_counter() - started) / len(faces)
+
+    started = time.perf_counter()
+    reference = [represent_face(face) for face in faces]
+    reference_time = (time.perf_counter() - started) / len(faces)
+
+    similarities = np.array([cosine(a, b) for a, b in zip(batched, reference)])
+    print(f"{len(faces)} faces from {len(paths)} images\n")
+    print(f"{'':>20} {'ms/face':>10}")
+    print(f"{'embed_faces':>20} {batched_time * 1000:>10.2f}")
+    print(f"{'DeepFace.represent':>20} {reference_time * 1000:>10.2f}")
+    print(f"\ncosine to DeepFace.represent: min {similarities.min():.5f}, mean {similarities.mean():.5f}")
+
+    if similarities.min() < args.min_cosine:
+        print(f"\n{int(np.sum(similarities < args.min_cosine))} faces below {args.min_cosine}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Memory and recall of the face index at each embedding precision
+
+Builds an EmbeddingMatrix of --faces registered embeddings (random unit vectors, or
+the rows of --embeddings, an .npy file of real ones) at float32, float16 and int8.
+It then matches noisy copies of registered faces (genuine queries, cosine around 0.7)
+and unrelated vectors (impostors). Against float32 it reports:
+- the memory used
+- top-1 recall
+- the agreement of the match/no-match decision at the 0.6 threshold
+- the largest similarity error
+
+The script exits with status 1 if a precision loses more than --tolerance of
+recall, so it can run as a check before changing EMBEDDING_PRECISION.
+
+Usage:
+    python benchmark_quantization.py --faces 100000 --queries 2000
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from app.core.face_index import EMBEDDING_DIM, EmbeddingMatrix
+from app.core.quantization import PRECISIONS, decode_embedding, encode_embedding
+
+MATCH_THRESHOLD = 0.6
+
+
+def unit_rows(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faces", type=int, default=100000, help="Registered faces")
+    parser.add_argument("--queries", type=int, default=2000, help="Genuine queries (as many impostors are added)")
+    parser.add_argument("--embeddings", help="Optional .npy file of real embeddings to register instead of random ones")
+    parser.add_argument("--noise", type=float, default=1.0, help="Noise added to genuine queries, relative to their norm")
+    parser.add_argument("--tolerance", type=float, default=0.005, help="Largest accepted loss of top-1 recall")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.embeddings:
+        registry = unit_rows(np.load(args.embeddings).astype(np.float32))
+    else:
+        registry = unit_rows(rng.standard_normal((args.faces, EMBEDDING_DIM), dtype=np.float32))
+    user_ids = [str(i) for i in range(len(registry))]
+    dim = registry.shape[1]
+
+    targets = rng.choice(len(registry), size=min(args.queries, len(registry)), replace=False)
+    genuine = unit_rows(
+        registry[targets] + args.noise * unit_rows(rng.standard_normal((len(targets), dim), dtype=np.float32))
+    )
+    impostors = unit_rows(rng.standard_normal((len(targets), dim), dtype=np.float32))
+    queries = np.concatenate([genuine, impostors])
+    expected = [str(i) for i in targets] + [None] * len(impostors)
+
+    print(f"{len(registry)} registered faces, {len(genuine)} genuine and {len(impostors)} impostor queries\n")
+    print(f"{'precision':>10} {'MB':>8} {'ms/query':>9} {'recall@1':>9} {'decisions':>10} {'max err':>9} {'blob B':>7}")
+
+    reference = None
+    failed = False
+    for precision in PRECISIONS:
+        matrix = EmbeddingMatrix(dim, precision)
+        matrix.build(user_ids, list(registry))
+
+        started = time.perf_counter()
+        matches = matrix.search(queries, match_count=1, match_threshold=-1.0)
+        elapsed = (time.perf_counter() - started) / len(queries)
+
+        top_ids = [face_matches[0]["user_id"] for face_matches in matches]
+        similarities = np.array([face_matches[0]["similarity"] for face_matches in matches])
+        recall = np.mean([top == target for top, target in zip(top_ids[:len(genuine)], expected)])
+        decisions = np.array([
+            top if similarity >= MATCH_THRESHOLD else None for top, similarity in zip(top_ids, similarities)
+        ], dtype=object)
+        if reference is None:
+            reference = (recall, decisions, similarities)
+        agreement = np.mean(decisions == reference[1])
+        max_error = np.max(np.abs(similarities - reference[2]))
+
+        blob = encode_embedding(registry[0], precision)
+        assert np.allclose(decode_embedding(blob, dim), registry[0], atol=0.02)
+
+        print(
+            f"{precision:>10} {matrix.nbytes / 2 ** 20:>8.1f} {elapsed * 1000:>9.3f} {recall:>9.4f} "
+            f"{agreement:>10.4f} {max_error:>9.5f} {len(blob):>7}"
+        )
+        if reference[0] - recall > args.tolerance:
+            failed = True
+
+    if failed:
+        print(f"\nRecall dropped by more than {args.tolerance}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
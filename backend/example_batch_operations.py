@@ -81,6 +81,24 @@ def get_task_status(task_id: str) -> dict:
     
     return response.json()
 
+def get_task_results(task_id: str, since: int = 0, limit: int = 500) -> dict:
+    """
+    Get one page of the results of a background task
+    
+    Args:
+        task_id: Task ID to get results for
+        since: Cursor, the next_cursor of the previous page (0 for the first page)
+        limit: Results per page
+    
+    Returns:
+        Page with results, next_cursor and has_more
+    """
+    url = f"{FACES_ENDPOINT}/task-status/{task_id}/results"
+    response = requests.get(url, params={"since": since, "limit": limit})
+    response.raise_for_status()
+    
+    return response.json()
+
 def monitor_task(task_id: str, check_interval: int = 2) -> dict:
     """
     Monitor a background task until completion
@@ -90,10 +108,11 @@ def monitor_task(task_id: str, check_interval: int = 2) -> dict:
         check_interval: Seconds between status checks
     
     Returns:
-        Final task status
+        Final task status (without results, which are printed as they arrive)
     """
     print(f"Monitoring task {task_id}...")
     
+    since = 0
     while True:
         status = get_task_status(task_id)
         
@@ -102,18 +121,58 @@ def monitor_task(task_id: str, check_interval: int = 2) -> dict:
         print(f"Completed: {status['completed_items']}/{status['total_items']}")
         print(f"Failed: {status['failed_items']}")
         
+        # Only fetch the results recorded since the previous check
+        while since < (status.get('results_seq') or 0):
+            page = get_task_results(task_id, since)
+            for result in page['results']:
+                print(f"  User {result['user_id']}: {'✓' if result['status'] else '✗'}")
+                if not result['status'] and result.get('error'):
+                    print(f"    Error: {result['error']}")
+            since = page['next_cursor']
+            if not page['has_more']:
+                break
+        
         if status['status'] in ['completed', 'failed']:
             print(f"Task finished with status: {status['status']}")
-            if status['results']:
-                print("Results:")
-                for result in status['results']:
-                    print(f"  User {result['user_id']}: {'✓' if result['status'] else '✗'}")
-                    if not result['status'] and 'error' in result:
-                        print(f"    Error: {result['error']}")
             return status
         
         time.sleep(check_interval)
 
+def stream_task(task_id: str) -> dict:
+    """
+    Follow a background task over Server-Sent Events until completion, instead of polling
+    
+    Args:
+        task_id: Task ID to follow
+    
+    Returns:
+        Final task status (without results, which are printed as they arrive)
+    """
+    print(f"Streaming task {task_id}...")
+    
+    status = {}
+    event = None
+    with requests.get(f"{FACES_ENDPOINT}/task-status/{task_id}/stream", stream=True) as response:
+        response.raise_for_status()
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                data = json.loads(line[len("data:"):])
+                if event == "results":
+                    for result in data["results"]:
+                        print(f"  User {result['user_id']}: {'✓' if result['status'] else '✗'}")
+                        if not result['status'] and result.get('error'):
+                            print(f"    Error: {result['error']}")
+                elif event == "progress":
+                    status = data
+                    print(f"Progress: {status['progress']}% "
+                          f"({status['completed_items']} completed, {status['failed_items']} failed of {status['total_items']})")
+                elif event == "end":
+                    print(f"Task finished with status: {data['status']}")
+                    return status
+    return status
+
 def main():
     """Example usage of batch operations"""
     
@@ -140,8 +199,8 @@ def main():
         # Start batch registration
         register_task_id = batch_register_faces(users_to_register)
         
-        # Monitor the task
-        final_status = monitor_task(register_task_id)
+        # Follow the task (monitor_task() polls task-status instead)
+        final_status = stream_task(register_task_id)
         
     except requests.exceptions.RequestException as e:
         print(f"Error during batch registration: {e}")
@@ -157,8 +216,8 @@ def main():
         # Start batch deletion
         delete_task_id = batch_delete_faces(users_to_delete)
         
-        # Monitor the task
-        final_status = monitor_task(delete_task_id)
+        # Follow the task
+        final_status = stream_task(delete_task_id)
         
     except requests.exceptions.RequestException as e:
         print(f"Error during batch deletion: {e}")
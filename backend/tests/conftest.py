@@ -0,0 +1,13 @@
+import os
+import tempfile
+
+# Settings are read when app.core.config is first imported: keep every local store of the
+# app out of the working tree, and give the Supabase clients placeholder credentials
+_STATE_DIR = tempfile.mkdtemp(prefix="face-backend-tests-")
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test-anon-key")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test-service-key")
+os.environ.setdefault("TASK_DB_PATH", os.path.join(_STATE_DIR, "tasks.sqlite3"))
+os.environ.setdefault("FACE_STORE_PATH", os.path.join(_STATE_DIR, "event_faces.sqlite3"))
+os.environ.setdefault("EMBEDDING_CACHE_DIR", os.path.join(_STATE_DIR, "embedding_cache"))
+os.environ.setdefault("FACE_INDEX_ENABLED", "False")
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from app.core.admission import AdmissionLimiter, OverloadedError
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def _request(limiter, log, name, download=0.0, work=0.05):
+    """One request: download outside the slot, then hold a slot for `work` seconds."""
+    try:
+        async with limiter.admit() as acquire_slot:
+            log.append(("download", name))
+            await asyncio.sleep(download)
+            await acquire_slot()
+            log.append(("start", name))
+            await asyncio.sleep(work)
+            return 200
+    except OverloadedError as e:
+        log.append((e.status_code, name))
+        return e
+
+
+def test_runs_at_most_max_concurrent_in_arrival_order():
+    limiter = AdmissionLimiter("test", "test", max_concurrent=2, max_waiting=4, wait_timeout=5)
+    log = []
+
+    async def scenario():
+        running = 0
+        peak = 0
+
+        async def request(name):
+            nonlocal running, peak
+            async with limiter.admit() as acquire_slot:
+                await acquire_slot()
+                log.append(name)
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.02)
+                running -= 1
+
+        await asyncio.gather(*(request(i) for i in range(6)))
+        return peak
+
+    assert _run(scenario()) == 2
+    assert log == list(range(6))
+    assert limiter.stats()["admitted"] == 6
+
+
+def test_full_queue_is_rejected_before_the_download():
+    limiter = AdmissionLimiter("test", "test", max_concurrent=1, max_waiting=1, wait_timeout=5)
+    log = []
+
+    async def scenario():
+        return await asyncio.gather(*(_request(limiter, log, i, download=0.01) for i in range(4)))
+
+    results = _run(scenario())
+
+    assert results[:2] == [200, 200]
+    for error in results[2:]:
+        assert error.status_code == 429
+        assert error.retry_after >= 1
+    assert [name for event, name in log if event == "download"] == [0, 1]
+    assert limiter.stats()["rejected"] == 2
+
+
+def test_downloads_do_not_hold_a_slot():
+    limiter = AdmissionLimiter("test", "test", max_concurrent=1, max_waiting=2, wait_timeout=5)
+    log = []
+
+    async def scenario():
+        slow = asyncio.ensure_future(_request(limiter, log, "slow download", download=0.2, work=0.01))
+        await asyncio.sleep(0.01)
+        await _request(limiter, log, "fast", work=0.01)
+        await slow
+
+    _run(scenario())
+
+    assert [name for event, name in log if event == "start"] == ["fast", "slow download"]
+
+
+def test_wait_past_the_deadline_is_rejected_with_503():
+    limiter = AdmissionLimiter("test", "test", max_concurrent=1, max_waiting=1, wait_timeout=0.05)
+    log = []
+
+    async def scenario():
+        return await asyncio.gather(_request(limiter, log, "first", work=0.2), _request(limiter, log, "second"))
+
+    first, second = _run(scenario())
+
+    assert first == 200
+    assert second.status_code == 503
+    assert ("start", "second") not in log
+    stats = limiter.stats()
+    assert (stats["timed_out"], stats["active"], stats["waiting"]) == (1, 0, 0)
+
+
+def test_failing_request_frees_its_place():
+    limiter = AdmissionLimiter("test", "test", max_concurrent=1, max_waiting=0, wait_timeout=1)
+
+    async def failing(acquire):
+        async with limiter.admit() as acquire_slot:
+            if acquire:
+                await acquire_slot()
+            raise RuntimeError("download failed")
+
+    async def scenario():
+        for acquire in (False, True):
+            with pytest.raises(RuntimeError):
+                await failing(acquire)
+        return await _request(limiter, [], "next")
+
+    assert _run(scenario()) == 200
+    stats = limiter.stats()
+    assert (stats["active"], stats["waiting"], stats["rejected"]) == (0, 0, 0)
@@ -0,0 +1,129 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("deepface")
+pytest.importorskip("cv2")
+
+from app.core import deepface as face_pipeline
+from app.core.deepface import box_iou, non_max_suppression
+
+
+def _box(x, y, w, h):
+    return {"x": x, "y": y, "w": w, "h": h}
+
+
+def _detected(x, y, w, h, confidence=0.99):
+    return {"face": np.zeros((4, 4, 3), dtype=np.float32), "facial_area": _box(x, y, w, h), "confidence": confidence}
+
+
+def test_box_iou():
+    assert box_iou(_box(0, 0, 10, 10), _box(0, 0, 10, 10)) == 1.0
+    assert box_iou(_box(0, 0, 10, 10), _box(20, 20, 10, 10)) == 0.0
+    # Touching edges do not overlap
+    assert box_iou(_box(0, 0, 10, 10), _box(10, 0, 10, 10)) == 0.0
+    # Half of each box overlaps: 50 / (100 + 100 - 50)
+    assert box_iou(_box(0, 0, 10, 10), _box(5, 0, 10, 10)) == pytest.approx(1 / 3)
+    assert box_iou(_box(0, 0, 0, 0), _box(0, 0, 0, 0)) == 0.0
+
+
+def test_refine_face_maps_the_refined_face_to_image_coordinates(monkeypatch):
+    image = np.zeros((400, 400, 3), dtype=np.uint8)
+    box = _box(100, 100, 40, 40)
+    # The crop starts REFINE_MARGIN * 40 = 20 pixels before the box
+    monkeypatch.setattr(face_pipeline.DeepFace, "extract_faces", lambda **kwargs: [_detected(22, 18, 38, 42)])
+
+    face_obj = face_pipeline._refine_face(image, box, confidence=0.9)
+
+    assert face_obj["facial_area"] == _box(102, 98, 38, 42)
+    assert face_obj["confidence"] == 0.99
+
+
+def test_refine_face_ignores_a_neighbouring_face_in_the_margin(monkeypatch):
+    image = np.full((400, 400, 3), 255, dtype=np.uint8)
+    box = _box(100, 100, 40, 40)
+    # Only a face at the edge of the crop was found; it barely overlaps the coarse box
+    monkeypatch.setattr(face_pipeline.DeepFace, "extract_faces", lambda **kwargs: [_detected(50, 0, 30, 30)])
+
+    face_obj = face_pipeline._refine_face(image, box, confidence=0.9)
+
+    assert face_obj["facial_area"] == box
+    assert face_obj["confidence"] == 0.9
+    assert face_obj["face"].shape == (40, 40, 3)
+    assert face_obj["face"].max() == 1.0
+
+
+def test_refine_face_falls_back_to_the_coarse_crop_on_a_miss(monkeypatch):
+    image = np.zeros((400, 400, 3), dtype=np.uint8)
+    box = _box(100, 100, 40, 40)
+    # Without enforce_detection a miss is the whole crop with confidence 0
+    monkeypatch.setattr(face_pipeline.DeepFace, "extract_faces", lambda **kwargs: [_detected(0, 0, 80, 80, 0)])
+
+    face_obj = face_pipeline._refine_face(image, box, confidence=0.9)
+
+    assert face_obj["facial_area"] == box
+    assert face_obj["confidence"] == 0.9
+
+
+def test_non_max_suppression_keeps_the_most_confident_of_overlapping_faces():
+    weaker = _detected(0, 0, 100, 100, 0.8)
+    stronger = _detected(5, 5, 100, 100, 0.95)
+    elsewhere = _detected(300, 300, 100, 100, 0.5)
+
+    kept = non_max_suppression([weaker, elsewhere, stronger])
+
+    assert kept == [stronger, elsewhere]
+
+
+def test_non_max_suppression_keeps_faces_below_the_threshold():
+    left = _detected(0, 0, 100, 100, 0.9)
+    # IoU 4000 / 16000 = 0.25: two faces next to each other
+    right = _detected(60, 0, 100, 100, 0.9)
+
+    assert len(non_max_suppression([left, right])) == 2
+    assert len(non_max_suppression([left, right], iou_threshold=0.1)) == 1
+
+
+def test_non_max_suppression_treats_missing_confidence_as_lowest():
+    unscored = _detected(0, 0, 100, 100, None)
+    scored = _detected(2, 2, 100, 100, 0.6)
+
+    assert non_max_suppression([unscored, scored]) == [scored]
+
+
+def _find_bright_region(img_path, **kwargs):
+    """Stand-in detector: the one face is the bright region of the image, possibly cut by its edges"""
+    ys, xs = np.nonzero(img_path[:, :, 0] > 127)
+    if not len(xs):
+        return [_detected(0, 0, img_path.shape[1], img_path.shape[0], 0)]
+    x, y = int(xs.min()), int(ys.min())
+    return [_detected(x, y, int(xs.max()) + 1 - x, int(ys.max()) + 1 - y)]
+
+
+@pytest.fixture
+def bright_region_detector(monkeypatch):
+    monkeypatch.setattr(face_pipeline.DeepFace, "extract_faces", _find_bright_region)
+    monkeypatch.setattr(face_pipeline.inference_engine, "load", lambda: None)
+    monkeypatch.setattr(type(face_pipeline.inference_engine), "ready", property(lambda self: True))
+
+
+def _image_with_face(width, height, box):
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+    image[box["y"]:box["y"] + box["h"], box["x"]:box["x"] + box["w"]] = 255
+    return image
+
+
+def test_tiled_detection_keeps_a_large_face_across_a_seam(bright_region_detector):
+    # Tiles start at x = 0, 1200 and 1400: the face crosses an inner edge of every one of them
+    face = _box(1100, 700, 600, 600)
+
+    face_objs = face_pipeline.detect_faces_tiled(_image_with_face(3000, 2000, face), tile_size=1600, overlap=0.25)
+
+    assert [face_obj["facial_area"] for face_obj in face_objs] == [face]
+
+
+def test_tiled_detection_finds_a_small_face_once(bright_region_detector):
+    face = _box(1450, 300, 100, 120)
+
+    face_objs = face_pipeline.detect_faces_tiled(_image_with_face(3000, 2000, face), tile_size=1600, overlap=0.25)
+
+    assert [face_obj["facial_area"] for face_obj in face_objs] == [face]
@@ -0,0 +1,97 @@
+import asyncio
+import hashlib
+
+import pytest
+
+pytest.importorskip("supabase")
+pytest.importorskip("vecs")
+
+import httpx
+
+from app.core.http_client import http_client
+from app.utils import drive_utils, storage_utils
+from app.utils.storage_utils import RESUMABLE_CHUNK_SIZE
+
+# Larger than one upload chunk, so the spool goes to disk and the upload takes several requests
+CONTENT = bytes(range(256)) * (RESUMABLE_CHUNK_SIZE // 256 + 1000)
+OBJECT_NAME = f"{hashlib.sha256(CONTENT).hexdigest()}.jpg"
+
+
+class FakeStorage:
+    """Drive download plus Supabase Storage resumable uploads, over httpx.MockTransport"""
+
+    def __init__(self):
+        self.objects = {}
+        self._uploads = {}
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        if request.url.host == "drive.google.com":
+            return httpx.Response(200, headers={"content-type": "image/jpeg"}, content=CONTENT)
+        if request.method == "POST":
+            name = request.headers["upload-metadata"]
+            if name in self.objects:
+                return httpx.Response(409)
+            self._uploads[name] = bytearray()
+            return httpx.Response(201, headers={"location": f"/upload/{len(self._uploads)}"}, request=request)
+        name = list(self._uploads)[int(request.url.path.rsplit("/", 1)[1]) - 1]
+        upload = self._uploads[name]
+        upload.extend(request.content)
+        if len(upload) == len(CONTENT):
+            self.objects[name] = bytes(upload)
+        return httpx.Response(204, headers={"upload-offset": str(len(upload))})
+
+
+class FakeBucket:
+    def get_public_url(self, path):
+        return f"https://storage.example.com/{path}"
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    storage = FakeStorage()
+    derivatives = []
+
+    async def store_derivatives(client, content, object_name, bucket_name):
+        derivatives.append((object_name, len(content)))
+        return {"thumbnail_url": "thumb"}
+
+    fake_supabase = type("Supabase", (), {"storage": type("Storage", (), {"from_": lambda self, bucket: FakeBucket()})()})()
+    monkeypatch.setattr(storage_utils, "supabase_service", fake_supabase)
+    monkeypatch.setattr(drive_utils, "get_public_url_from_supabase", lambda bucket, path: FakeBucket().get_public_url(path))
+    monkeypatch.setattr(drive_utils, "_store_derivatives", store_derivatives)
+    storage.derivatives = derivatives
+    return storage
+
+
+def _ingest(storage):
+    async def ingest():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(storage.handle)) as client:
+            return await drive_utils.ingest_drive_file(client, "file-1")
+    return asyncio.run(ingest())
+
+
+def test_ingest_streams_through_a_spool_under_the_content_hash(storage, monkeypatch):
+    monkeypatch.setattr(http_client, "max_download_bytes", len(CONTENT))
+
+    public_url, mime_type, created, derivatives = _ingest(storage)
+
+    assert created and mime_type == "image/jpeg"
+    assert public_url.endswith(OBJECT_NAME)
+    assert list(storage.objects.values()) == [CONTENT]
+    assert storage.derivatives == [(OBJECT_NAME, len(CONTENT))]
+
+    # The same content again is recognised as stored, without derivative work
+    public_url, _, created, derivatives = _ingest(storage)
+    assert not created and derivatives is None
+    assert public_url.endswith(OBJECT_NAME)
+    assert len(storage.derivatives) == 1
+
+
+def test_files_over_the_download_limit_are_stored_without_derivatives(storage, monkeypatch):
+    monkeypatch.setattr(http_client, "max_download_bytes", 1024)
+
+    public_url, _, created, derivatives = _ingest(storage)
+
+    assert created and derivatives is None
+    assert list(storage.objects.values()) == [CONTENT]
+    assert storage.derivatives == []
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("supabase")
+pytest.importorskip("vecs")
+
+from app.core.face_index import EmbeddingMatrix
+
+DIM = 512
+
+
+@pytest.fixture
+def registry():
+    rng = np.random.default_rng(1)
+    user_ids = [f"user-{i}" for i in range(300)]
+    embeddings = list(rng.normal(size=(len(user_ids), DIM)).astype(np.float32))
+    # Each query is a registered face seen again with some noise
+    queries = np.stack(embeddings[:50]) + rng.normal(scale=0.02, size=(50, DIM)).astype(np.float32)
+    return user_ids, embeddings, queries
+
+
+def _matcher(precision, user_ids, embeddings):
+    matcher = EmbeddingMatrix(DIM, precision)
+    matcher.build(user_ids, embeddings)
+    return matcher
+
+
+@pytest.mark.parametrize("precision", ["float16", "int8"])
+def test_quantized_matches_agree_with_float32(registry, precision):
+    user_ids, embeddings, queries = registry
+    exact = _matcher("float32", user_ids, embeddings).search(queries, match_count=5, match_threshold=-1.0)
+
+    matches = _matcher(precision, user_ids, embeddings).search(queries, match_count=5, match_threshold=-1.0)
+
+    for i, (face_matches, exact_matches) in enumerate(zip(matches, exact)):
+        assert face_matches[0]["user_id"] == f"user-{i}"
+        for match, exact_match in zip(face_matches, exact_matches):
+            assert match["similarity"] == pytest.approx(exact_match["similarity"], abs=0.01)
+            assert match["similarity"] <= 1.0
+
+
+@pytest.mark.parametrize("precision", ["float32", "float16", "int8"])
+def test_threshold_drops_unrelated_faces(registry, precision):
+    user_ids, embeddings, queries = registry
+
+    matches = _matcher(precision, user_ids, embeddings).search(queries, match_count=5, match_threshold=0.6)
+
+    assert [[match["user_id"] for match in face_matches] for face_matches in matches] == [
+        [f"user-{i}"] for i in range(len(queries))
+    ]
+
+
+def test_int8_upsert_and_remove(registry):
+    user_ids, embeddings, _ = registry
+    matcher = _matcher("int8", user_ids[:2], embeddings[:2])
+
+    # Past the initial capacity, so the quantized rows and their scales grow together
+    for user_id, embedding in zip(user_ids[2:], embeddings[2:]):
+        matcher.upsert(user_id, embedding)
+    matcher.remove("user-0")
+    matcher.upsert("user-1", embeddings[7])
+
+    assert len(matcher) == len(user_ids) - 1
+    top = matcher.search(np.stack([embeddings[0], embeddings[299], embeddings[7]]), 2, 0.6)
+    assert top[0] == []
+    assert [match["user_id"] for match in top[1]] == ["user-299"]
+    assert sorted(match["user_id"] for match in top[2]) == ["user-1", "user-7"]
@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("deepface")
+pytest.importorskip("supabase")
+pytest.importorskip("vecs")
+
+import httpx
+from fastapi import FastAPI
+
+from app.api.routers import faces
+from app.core.admission import AdmissionLimiter
+from app.services.srv_users import UserService
+
+
+def test_overloaded_search_is_rejected_without_downloading(monkeypatch):
+    downloads = []
+
+    async def fetch_request_image(image_url):
+        downloads.append(image_url)
+        return b"image"
+
+    def face_search(self, request, image_bytes):
+        time.sleep(0.2)
+        return {"success": True, "faces": []}
+
+    monkeypatch.setattr(faces, "fetch_request_image", fetch_request_image)
+    monkeypatch.setattr(faces, "search_limiter", AdmissionLimiter("search", "search", 1, 0, 5))
+    monkeypatch.setattr(UserService, "face_search", face_search)
+    app = FastAPI()
+    app.include_router(faces.router, prefix="/faces")
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            first = asyncio.ensure_future(client.post("/faces/search", json={"image_url": "https://example.com/1.jpg"}))
+            await asyncio.sleep(0.05)
+            second = await client.post("/faces/search", json={"image_url": "https://example.com/2.jpg"})
+            return await first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert int(second.headers["Retry-After"]) >= 1
+    assert downloads == ["https://example.com/1.jpg"]
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from app.core.quantization import check_precision, decode_embedding, dequantize, encode_embedding, quantize
+
+DIM = 512
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(32, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_check_precision_rejects_unknown_precision():
+    assert check_precision("int8") == "int8"
+    with pytest.raises(ValueError):
+        check_precision("int4")
+
+
+def test_float32_is_stored_as_is(vectors):
+    codes, scales = quantize(vectors, "float32")
+
+    assert scales is None
+    np.testing.assert_array_equal(codes, vectors)
+
+
+def test_float16_round_trip(vectors):
+    codes, scales = quantize(vectors, "float16")
+
+    assert codes.dtype == np.float16 and scales is None
+    np.testing.assert_allclose(dequantize(codes, scales), vectors, atol=1e-3)
+
+
+def test_int8_round_trip_is_within_half_a_step(vectors):
+    codes, scales = quantize(vectors, "int8")
+
+    assert codes.dtype == np.int8 and scales.shape == (len(vectors),)
+    assert np.abs(codes).max() == 127
+    error = np.abs(dequantize(codes, scales) - vectors)
+    assert np.all(error <= scales[:, np.newaxis] / 2 + 1e-7)
+
+
+def test_int8_zero_vector():
+    codes, scales = quantize(np.zeros((1, DIM), dtype=np.float32), "int8")
+
+    assert scales[0] == 1.0
+    assert not codes.any()
+
+
+@pytest.mark.parametrize("precision, size", [("float32", DIM * 4), ("float16", DIM * 2), ("int8", DIM + 4)])
+def test_encoded_embedding_round_trip(vectors, precision, size):
+    data = encode_embedding(vectors[0], precision)
+
+    assert len(data) == size
+    np.testing.assert_allclose(decode_embedding(data, DIM), vectors[0], atol=0.01)
+
+
+def test_decode_embedding_rejects_a_wrong_length():
+    with pytest.raises(ValueError):
+        decode_embedding(b"\0" * 100, DIM)
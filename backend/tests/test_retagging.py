@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("deepface")
+pytest.importorskip("supabase")
+pytest.importorskip("vecs")
+
+from app.core.face_store import EventFaceStore
+from app.services import srv_users
+from app.services.srv_users import UserService
+
+
+class FakeEventImages:
+    """event_images with the select/update chains re-tagging uses"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.updates = []
+
+    def select(self, columns):
+        self._action = "select"
+        return self
+
+    def update(self, values):
+        self._action, self._values = "update", values
+        return self
+
+    def upsert(self, *args, **kwargs):
+        raise AssertionError("re-tagging must not upsert")
+
+    def in_(self, column, values):
+        self._ids = list(values)
+        return self
+
+    def eq(self, column, value):
+        self._ids = [value]
+        return self
+
+    def execute(self):
+        found = [self.rows[image_id] for image_id in self._ids if image_id in self.rows]
+        if self._action == "update":
+            for row in found:
+                row.update(self._values)
+                self.updates.append(row["id"])
+        return type("Response", (), {"data": found})()
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = EventFaceStore(str(tmp_path / "faces.sqlite3"), dim=4)
+    monkeypatch.setattr(srv_users, "event_face_store", store)
+    return store
+
+
+def _tagged(image_id, user_id):
+    return {
+        "image_id": image_id, "event_id": 1, "raw_image_url": f"https://example.com/{image_id}.jpg",
+        "metadata": {"detected_faces": 1, "recognized_users": []},
+        "embeddings": np.eye(4, dtype=np.float32)[:1], "matched_user_ids": [user_id]
+    }
+
+
+def test_retagging_merges_into_current_metadata_and_forgets_deleted_images(store, monkeypatch):
+    store.save_images([_tagged(1, "old-user"), _tagged(2, "old-user")])
+    # Image 2 was deleted after tagging; image 1 got a caption
+    table = FakeEventImages({1: {"id": 1, "metadata": {"detected_faces": 1, "caption": "Opening"}}})
+    monkeypatch.setattr(srv_users.supabase_service, "table", lambda name: table)
+    monkeypatch.setattr(UserService, "_fetch_face_embeddings", lambda self, user_ids: None)
+    queried = []
+
+    def match_faces(self, embeddings, match_count):
+        queried.extend(embeddings)
+        return [[{"user_id": "new-user", "similarity": 0.9}] for _ in embeddings]
+
+    monkeypatch.setattr(UserService, "_match_faces", match_faces)
+    monkeypatch.setattr(UserService, "_recognized_users", lambda self, matches: [m[0]["user_id"] for m in matches])
+
+    UserService()._process_face_retagging(None, ["old-user"])
+
+    # Stored embeddings are matched as float32 arrays, not JSON lists
+    assert [embedding.dtype for embedding in queried] == [np.float32]
+    assert table.updates == [1]
+    metadata = table.rows[1]["metadata"]
+    assert metadata["caption"] == "Opening"
+    assert metadata["recognized_users"] == ["new-user"]
+    assert "retagged_at" in metadata
+    assert [image["image_id"] for image in store.load_images([1, 2])] == [1]
+    assert store.load_images([1])[0]["matched_user_ids"] == ["new-user"]
@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+from app.core.scheduler import TaskScheduler
+from app.core.task_queue import TaskQueue
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    scheduler = TaskScheduler(
+        TaskQueue(str(tmp_path / "tasks.sqlite3"), max_attempts=1), max_workers=1, max_queue_size=10,
+        poll_interval=0.01
+    )
+    yield scheduler
+    scheduler.shutdown()
+
+
+def test_worker_survives_a_failing_failure_callback(scheduler):
+    ran = threading.Event()
+
+    def fail(task_id, payload, start_index):
+        raise RuntimeError("boom")
+
+    def on_failed(task_id, error_message):
+        raise RuntimeError("callback failed too")
+
+    scheduler.register("failing", fail, on_failed=on_failed)
+    scheduler.register("next", lambda task_id, payload, start_index: ran.set())
+    scheduler.submit("failing", {}, total_items=1)
+    next_id = scheduler.submit("next", {}, total_items=1)
+
+    assert ran.wait(5)
+    assert scheduler.store.get_task(next_id)["status"] in ("processing", "completed")
+
+
+def test_worker_survives_a_failing_store(scheduler, monkeypatch):
+    ran = threading.Event()
+
+    def retry_or_fail(task_id, error_message):
+        raise RuntimeError("database is locked")
+
+    def fail(task_id, payload, start_index):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(scheduler.store, "retry_or_fail", retry_or_fail)
+    scheduler.register("failing", fail)
+    scheduler.register("next", lambda task_id, payload, start_index: ran.set())
+    scheduler.submit("failing", {}, total_items=1)
+    scheduler.submit("next", {}, total_items=1)
+
+    assert ran.wait(5)
@@ -0,0 +1,141 @@
+import time
+
+import pytest
+
+from app.core.task_queue import TaskQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return TaskQueue(str(tmp_path / "tasks.sqlite3"), max_attempts=3, retry_backoff=5.0)
+
+
+def _next_run_at(queue, task_id):
+    with queue._connect() as conn:
+        return conn.execute("SELECT next_run_at FROM tasks WHERE task_id = ?", (task_id,)).fetchone()[0]
+
+
+def _make_due(queue, task_id):
+    with queue._connect() as conn:
+        conn.execute("UPDATE tasks SET next_run_at = 0 WHERE task_id = ?", (task_id,))
+
+
+def test_claim_leases_oldest_queued_job(queue):
+    first = queue.enqueue("face_register", {"n": 1}, total_items=1)
+    queue.enqueue("face_register", {"n": 2}, total_items=1)
+
+    task = queue.claim("worker-a", lease_seconds=60)
+
+    assert task["task_id"] == first
+    assert task["payload"] == {"n": 1}
+    assert task["attempts"] == 1
+    assert queue.count_pending() == 1
+
+
+def test_leased_job_is_not_claimed_twice(queue):
+    queue.enqueue("face_register", {}, total_items=1)
+
+    assert queue.claim("worker-a", lease_seconds=60) is not None
+    assert queue.claim("worker-b", lease_seconds=60) is None
+
+
+def test_expired_lease_is_claimed_again_from_its_cursor(queue):
+    task_id = queue.enqueue("face_register", {}, total_items=4)
+    queue.claim("worker-a", lease_seconds=0.01)
+    queue.append_results(task_id, [{"user_id": "u1", "status": True}], cursor=1, progress=25)
+    time.sleep(0.02)
+
+    task = queue.claim("worker-b", lease_seconds=60)
+
+    assert task["task_id"] == task_id
+    assert task["cursor"] == 1
+    assert task["attempts"] == 2
+
+
+def test_only_the_lease_owner_renews(queue):
+    task_id = queue.enqueue("face_register", {}, total_items=1)
+    queue.claim("worker-a", lease_seconds=0.01)
+
+    assert not queue.renew_lease(task_id, "worker-b", lease_seconds=60)
+    assert queue.renew_lease(task_id, "worker-a", lease_seconds=60)
+    time.sleep(0.02)
+    assert queue.claim("worker-b", lease_seconds=60) is None
+
+
+def test_failed_attempt_is_requeued_with_exponential_backoff(queue):
+    task_id = queue.enqueue("face_register", {}, total_items=1)
+
+    queue.claim("worker-a", lease_seconds=60)
+    before = time.time()
+    assert queue.retry_or_fail(task_id, "boom") == "queued"
+    # Not due yet: the first retry waits retry_backoff seconds
+    assert queue.claim("worker-a", lease_seconds=60) is None
+    assert before + 5.0 <= _next_run_at(queue, task_id) <= time.time() + 5.0
+
+    _make_due(queue, task_id)
+    queue.claim("worker-a", lease_seconds=60)
+    before = time.time()
+    assert queue.retry_or_fail(task_id, "boom") == "queued"
+    assert before + 10.0 <= _next_run_at(queue, task_id) <= time.time() + 10.0
+
+
+def test_job_fails_for_good_after_max_attempts(queue):
+    task_id = queue.enqueue("face_register", {}, total_items=1)
+    for _ in range(3):
+        _make_due(queue, task_id)
+        assert queue.claim("worker-a", lease_seconds=60) is not None
+        status = queue.retry_or_fail(task_id, "boom")
+
+    assert status == "failed"
+    assert queue.claim("worker-a", lease_seconds=60) is None
+    task = queue.get_task(task_id)
+    assert task["status"] == "failed"
+    assert task["error_message"] == "boom"
+
+
+def test_final_state_is_kept(queue):
+    task_id = queue.enqueue("face_register", {}, total_items=1)
+    queue.claim("worker-a", lease_seconds=60)
+    queue.complete(task_id)
+
+    queue.fail(task_id, "late failure")
+
+    task = queue.get_task(task_id)
+    assert task["status"] == "completed"
+    assert task["error_message"] is None
+
+
+def _record(queue, task_id, user_ids, cursor):
+    queue.append_results(task_id, [{"user_id": user_id, "status": True} for user_id in user_ids], cursor, progress=0)
+
+
+def test_results_are_numbered_across_batches(queue):
+    task_id = queue.enqueue("batch_face_register", {}, total_items=5)
+    _record(queue, task_id, ["u1", "u2"], cursor=2)
+    queue.append_results(task_id, [{"user_id": "u3", "status": False, "error": "No face"}], cursor=3, progress=60)
+
+    assert [(r["seq"], r["user_id"]) for r in queue.get_results(task_id)] == [(1, "u1"), (2, "u2"), (3, "u3")]
+    assert queue.get_results(task_id)[2] == {"seq": 3, "user_id": "u3", "status": False, "error": "No face"}
+    summary = queue.get_task_summary(task_id)
+    assert summary["results_seq"] == 3
+    assert (summary["completed_items"], summary["failed_items"], summary["progress"]) == (2, 1, 60)
+
+
+def test_get_results_pages_after_a_cursor(queue):
+    task_id = queue.enqueue("batch_face_register", {}, total_items=5)
+    _record(queue, task_id, ["u1", "u2", "u3", "u4", "u5"], cursor=5)
+
+    assert [r["seq"] for r in queue.get_results(task_id, after_seq=0, limit=2)] == [1, 2]
+    assert [r["seq"] for r in queue.get_results(task_id, after_seq=2, limit=2)] == [3, 4]
+    assert [r["seq"] for r in queue.get_results(task_id, after_seq=4, limit=2)] == [5]
+    assert queue.get_results(task_id, after_seq=5) == []
+
+
+def test_results_of_other_tasks_are_not_mixed_in(queue):
+    first = queue.enqueue("batch_face_register", {}, total_items=1)
+    second = queue.enqueue("batch_face_register", {}, total_items=1)
+    _record(queue, first, ["u1"], cursor=1)
+    _record(queue, second, ["u2"], cursor=1)
+
+    assert [r["user_id"] for r in queue.get_results(second)] == ["u2"]
+    assert queue.get_results("missing") == []
@@ -0,0 +1,61 @@
+import pytest
+
+pytest.importorskip("deepface")
+pytest.importorskip("supabase")
+pytest.importorskip("vecs")
+
+from app.core.task_queue import TaskQueue
+from app.services import srv_users
+from app.services.srv_users import UserService
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    queue = TaskQueue(str(tmp_path / "tasks.sqlite3"))
+    monkeypatch.setattr(srv_users, "task_queue", queue)
+    return queue
+
+
+def _pages(service, task_id, limit):
+    pages = []
+    since = 0
+    while True:
+        page = service.get_background_task_results(task_id, since, limit)
+        pages.append(page)
+        since = page.next_cursor
+        if not page.has_more:
+            return pages
+
+
+def test_pages_walk_every_result_once(queue):
+    task_id = queue.enqueue("batch_face_register", {}, total_items=5)
+    queue.append_results(task_id, [{"user_id": f"u{i}", "status": True} for i in range(1, 6)], cursor=5, progress=100)
+
+    pages = _pages(UserService(), task_id, limit=2)
+
+    assert [[r.user_id for r in page.results] for page in pages] == [["u1", "u2"], ["u3", "u4"], ["u5"]]
+    assert [page.next_cursor for page in pages] == [2, 4, 5]
+
+
+def test_page_past_the_end_keeps_the_cursor(queue):
+    task_id = queue.enqueue("batch_face_register", {}, total_items=2)
+    queue.append_results(task_id, [{"user_id": "u1", "status": True}], cursor=1, progress=50)
+    service = UserService()
+
+    page = service.get_background_task_results(task_id, since=1, limit=10)
+    assert page.results == [] and page.next_cursor == 1 and not page.has_more
+
+    # A result recorded later shows up on the next poll with the same cursor
+    queue.append_results(task_id, [{"user_id": "u2", "status": False, "error": "No face"}], cursor=2, progress=100)
+    page = service.get_background_task_results(task_id, since=1, limit=10)
+    assert [(r.seq, r.user_id, r.status, r.error) for r in page.results] == [(2, "u2", False, "No face")]
+
+
+def test_legacy_task_results_are_paged_by_position(queue, monkeypatch):
+    legacy = {"results": [{"user_id": f"u{i}", "status": True, "error": None} for i in range(1, 4)]}
+    monkeypatch.setattr(UserService, "_fetch_legacy_task", lambda self, task_id: legacy)
+
+    pages = _pages(UserService(), "legacy-task", limit=2)
+
+    assert [[(r.seq, r.user_id) for r in page.results] for page in pages] == [[(1, "u1"), (2, "u2")], [(3, "u3")]]
+    assert pages[-1].next_cursor == 3